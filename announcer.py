@@ -0,0 +1,111 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+# ----------------------------- #
+# ระบบพูดแจ้งเตือนแบบไม่บล็อกลูปตรวจจับ
+# ----------------------------- #
+class Announcer:
+    """พูดข้อความด้วย pyttsx3 ในเธรดแยก ผู้เรียก announce() ไม่ต้องรอเสียงพูดจบ
+
+    - คิวมีขนาดจำกัด (maxsize) ข้อความที่มี key ซ้ำกับที่รออยู่จะถูกรวมเป็นข้อความล่าสุด
+    - เว้นระยะระหว่างการพูดอย่างน้อย interval วินาที (รอในเธรดพูด ไม่ใช่ในเธรดผู้เรียก)
+    - เมื่อคิวเต็ม policy="drop_oldest" ทิ้งข้อความเก่าสุด, "drop_newest" ทิ้งข้อความใหม่
+    - ถ้าเปิด pyttsx3 ไม่ได้ (ไม่ได้ติดตั้ง / ไม่มี driver) จะแจ้งครั้งเดียวแล้ว announce() ไม่ทำอะไร (error เก็บใน self.error)
+    """
+
+    POLICIES = ("drop_oldest", "drop_newest")
+
+    def __init__(self, driver=None, rate=150, interval=1.0, maxsize=4, policy="drop_oldest", echo=True):
+        if policy not in self.POLICIES:
+            raise ValueError(f"unknown drop policy: {policy!r}")
+        self.driver = driver
+        self.rate = rate
+        self.interval = interval
+        self.maxsize = maxsize
+        self.policy = policy
+        self.echo = echo  # พิมพ์ข้อความใน console ตอนพูด
+
+        self.pending = OrderedDict()  # key -> text (เรียงตามลำดับเข้าคิว)
+        self.cond = threading.Condition()
+        self.stopped = False
+        self.error = None  # สาเหตุที่เปิดเครื่องพูดไม่ได้
+        self.last_spoken = 0.0
+        self.counts = {"queued": 0, "merged": 0, "dropped": 0, "spoken": 0}
+
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def announce(self, text, key=None):
+        """ใส่ข้อความเข้าคิวแล้วคืนค่าทันที คืน False ถ้าข้อความถูกทิ้ง"""
+        key = text if key is None else key
+        with self.cond:
+            if self.stopped:
+                return False
+            if key in self.pending:
+                self.pending[key] = text  # รวมเหตุการณ์ซ้ำ เก็บข้อความล่าสุด
+                self.counts["merged"] += 1
+                return True
+            if len(self.pending) >= self.maxsize:
+                self.counts["dropped"] += 1
+                if self.policy == "drop_newest":
+                    return False
+                self.pending.popitem(last=False)
+            self.pending[key] = text
+            self.counts["queued"] += 1
+            self.cond.notify()
+        return True
+
+    def depth(self):
+        with self.cond:
+            return len(self.pending)
+
+    def _next(self):
+        with self.cond:
+            while not self.pending and not self.stopped:
+                self.cond.wait()
+            if self.stopped:
+                return None
+            # รอให้ครบช่วงเว้นระยะก่อนหยิบข้อความ ระหว่างนี้ข้อความซ้ำยังรวมกันได้
+            wait = self.last_spoken + self.interval - time.time()
+            while wait > 0 and not self.stopped:
+                self.cond.wait(wait)
+                wait = self.last_spoken + self.interval - time.time()
+            if self.stopped or not self.pending:
+                return None
+            return self.pending.popitem(last=False)[1]
+
+    def _run(self):
+        try:
+            import pyttsx3
+
+            # pyttsx3 (SAPI5/COM) ต้องสร้างและใช้งานในเธรดเดียวกัน
+            engine = pyttsx3.init(self.driver) if self.driver else pyttsx3.init()
+            engine.setProperty('rate', self.rate)
+        except Exception as e:
+            # ลูปตรวจจับทำงานต่อได้โดยไม่มีเสียง ไม่ให้คิวโตค้างไว้โดยไม่มีใครพูด
+            print("Announcer disabled:", e)
+            with self.cond:
+                self.error = e
+                self.stopped = True
+                self.pending.clear()
+                self.cond.notify_all()
+            return
+
+        while not self.stopped:
+            text = self._next()
+            if text is None:
+                continue
+            if self.echo:
+                print(text)
+            engine.say(text)
+            engine.runAndWait()
+            self.last_spoken = time.time()
+            self.counts["spoken"] += 1
+
+    def stop(self):
+        with self.cond:
+            self.stopped = True
+            self.cond.notify_all()
+        self.thread.join(timeout=1.0)
@@ -0,0 +1,288 @@
+"""
+backends.py
+เลือก backend สำหรับรัน YOLO บน CPU: PyTorch (เดิม), ONNX Runtime หรือ OpenVINO
+
+โมเดลที่ export แล้วจะถูกเก็บใน cache_dir โดยตั้งชื่อจาก hash ของไฟล์ weights,
+ขนาดภาพ และ INT8 จึง export แค่ครั้งแรก ครั้งต่อไปโหลดจาก cache ทันที
+
+  from backends import load_model
+  model = load_model("yolov8n.pt", backend="openvino", imgsz=480, int8=True)
+
+เปรียบเทียบความเร็ว/ความแม่นยำกับ PyTorch:
+  python backends.py --source video.mp4 --frames 200 --imgsz 640 --int8
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import time
+
+from ultralytics import YOLO
+
+BACKENDS = ("torch", "onnx", "openvino")
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".model_cache")
+
+
+def file_hash(path, length=12):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()[:length]
+
+
+def cache_path(weights, backend, imgsz, int8, dynamic=False, cache_dir=CACHE_DIR):
+    stem = os.path.splitext(os.path.basename(weights))[0]
+    name = f"{stem}-{file_hash(weights)}-{imgsz}{'-int8' if int8 else ''}{'-dyn' if dynamic else ''}"
+    if backend == "onnx":
+        return os.path.join(cache_dir, name + ".onnx")
+    return os.path.join(cache_dir, name + "_openvino_model")
+
+
+def _quantize_onnx(src, dst):
+    try:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+    except ImportError:
+        raise RuntimeError("ONNX INT8 needs onnxruntime: pip install onnxruntime")
+    quantize_dynamic(src, dst, weight_type=QuantType.QUInt8)
+
+
+def export_model(model, backend, imgsz, int8, target, dynamic=False, data=None):
+    """export โมเดลแล้วย้ายผลลัพธ์ไปไว้ที่ target (ไฟล์ .onnx หรือโฟลเดอร์ OpenVINO)"""
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    if backend == "onnx":
+        exported = model.export(format="onnx", imgsz=imgsz, dynamic=dynamic, simplify=True)
+        if int8:
+            # ultralytics ไม่มี INT8 สำหรับ ONNX จึง quantize น้ำหนักเองด้วย onnxruntime
+            _quantize_onnx(exported, target + ".tmp")
+            os.replace(target + ".tmp", target)
+            os.remove(exported)  # ไม่ทิ้ง .onnx ตัวกลางไว้ข้าง weights
+        else:
+            shutil.move(exported, target)
+    else:
+        kwargs = {"data": data} if int8 and data else {}
+        exported = model.export(format="openvino", imgsz=imgsz, int8=int8, dynamic=dynamic, **kwargs)
+        tmp = target + ".tmp"
+        if os.path.exists(tmp):
+            shutil.rmtree(tmp)
+        shutil.move(exported, tmp)
+        os.replace(tmp, target)
+    return target
+
+
+def export_cached(model_path="yolov8n.pt", backend="torch", imgsz=640, int8=False, dynamic=False,
+                  cache_dir=CACHE_DIR, data=None):
+    """export ถ้ายังไม่มีใน cache แล้วคืน path ที่ YOLO() โหลดได้ (torch คืน model_path เดิม)
+
+    ใช้เรียกครั้งเดียวใน process หลักก่อนเปิด process pool แล้วส่ง path ที่ได้ให้ลูก
+    ไม่อย่างนั้นทุก process จะ export พร้อมกันลงไฟล์เดียวกันข้าง weights
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"unknown backend: {backend!r} (choose from {', '.join(BACKENDS)})")
+    if backend == "torch" or model_path.rstrip("/\\").endswith((".onnx", "_openvino_model")):
+        return model_path  # export แล้ว
+    if os.path.isfile(model_path):
+        # cache key มาจาก hash ของไฟล์ weights เอง ถ้ามีใน cache แล้วไม่ต้องโหลด PyTorch เลย
+        target = cache_path(model_path, backend, imgsz, int8, dynamic, cache_dir)
+        if os.path.exists(target):
+            return target
+
+    model = YOLO(model_path)
+    # YOLO() จะดาวน์โหลด weights ให้ถ้ายังไม่มี จึงใช้ path จริงจาก ckpt_path
+    weights = getattr(model, "ckpt_path", None) or model_path
+    target = cache_path(weights, backend, imgsz, int8, dynamic, cache_dir)
+    if not os.path.exists(target):
+        print(f"⏳ export {os.path.basename(weights)} → {backend} (imgsz={imgsz}, int8={int8}) ครั้งแรก...")
+        export_model(model, backend, imgsz, int8, target, dynamic=dynamic, data=data)
+    return target
+
+
+def limit_threads(model, path, backend, threads, imgsz=640):
+    """จำกัดจำนวน thread ของ ONNX Runtime / OpenVINO (torch.set_num_threads ไม่มีผลกับสองตัวนี้)
+
+    ultralytics สร้าง session ตอน predict ครั้งแรกโดยไม่รับค่า thread จึง predict ภาพเปล่าหนึ่งครั้ง
+    แล้วสร้าง session / compiled model ใหม่แทนตัวเดิม
+    """
+    import numpy as np
+
+    model.predict(np.zeros((imgsz, imgsz, 3), dtype=np.uint8), verbose=False)
+    # ultralytics 8.4+: AutoBackend เก็บ session ไว้ที่ .backend (__getattr__ ส่งต่อแค่การอ่าน
+    # ถ้าตั้งค่าบน AutoBackend ตรง ๆ forward() ยังใช้ตัวเดิม) รุ่นเก่าเก็บไว้บน AutoBackend เอง
+    runner = model.predictor.model
+    runner = getattr(runner, "backend", runner)
+    if backend == "onnx" and getattr(runner, "session", None) is not None:
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = threads
+        options.inter_op_num_threads = 1
+        runner.session = ort.InferenceSession(path, options, providers=runner.session.get_providers())
+        # IO binding ผูกกับ session เดิม จึงกลับไปใช้ session.run() ธรรมดา
+        runner.use_io_binding = False
+        runner.io = None
+    elif backend == "openvino" and getattr(runner, "ov_compiled_model", None) is not None:
+        import functools
+
+        import openvino as ov
+
+        xml = next(os.path.join(path, f) for f in os.listdir(path) if f.endswith(".xml"))
+        core = ov.Core()
+        config = {"PERFORMANCE_HINT": "LATENCY", "INFERENCE_NUM_THREADS": threads}
+        runner.ov_compiled_model = core.compile_model(core.read_model(xml), "CPU", config=config)
+        if getattr(runner, "compile_model", None) is not None:
+            # backend คอมไพล์ใหม่เมื่อขนาดภาพเปลี่ยน ให้ใช้จำนวน thread เดียวกัน
+            runner.compile_model = functools.partial(core.compile_model, device_name="CPU", config=config)
+
+
+def load_model(model_path="yolov8n.pt", backend="torch", imgsz=640, int8=False, dynamic=False,
+               cache_dir=CACHE_DIR, data=None, task="detect", threads=None):
+    """คืน YOLO ที่ใช้งานได้เหมือนเดิม (predict / track) แต่รันด้วย backend ที่เลือก
+
+    imgsz ถูกตั้งเป็นค่าเริ่มต้นของโมเดล ไม่ต้องส่งทุกครั้งที่เรียก model(frame)
+    dynamic=True ใช้เมื่อต้องส่งภาพเป็น batch หลายภาพ (เช่น InferenceService)
+    model_path เป็นผลจาก export_cached() ก็ได้ (โหลดตรง ๆ ไม่ export ซ้ำ)
+    threads: จำกัด thread ของ ONNX Runtime / OpenVINO (เช่นเมื่อรันหลาย process พร้อมกัน)
+    """
+    path = export_cached(model_path, backend, imgsz, int8, dynamic, cache_dir, data)
+    model = YOLO(path) if backend == "torch" else YOLO(path, task=task)
+    model.overrides["imgsz"] = imgsz
+    if threads and backend != "torch":
+        limit_threads(model, path, backend, threads, imgsz)
+    return model
+
+
+# ----------------------------- #
+# รายงานเปรียบเทียบกับ PyTorch
+# ----------------------------- #
+def _iou(a, b):
+    x1, y1 = max(a[0], b[0]), max(a[1], b[1])
+    x2, y2 = min(a[2], b[2]), min(a[3], b[3])
+    inter = max(0.0, x2 - x1) * max(0.0, y2 - y1)
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+def match_detections(ref, det, min_iou=0.5):
+    """จับคู่กล่อง (x1, y1, x2, y2, cls) แบบ greedy คืน (จำนวนที่ตรงกัน, IoU รวม)"""
+    used = set()
+    matched, iou_sum = 0, 0.0
+    for r in ref:
+        best, best_j = min_iou, None
+        for j, d in enumerate(det):
+            if j in used or d[4] != r[4]:
+                continue
+            iou = _iou(r, d)
+            if iou >= best:
+                best, best_j = iou, j
+        if best_j is not None:
+            used.add(best_j)
+            matched += 1
+            iou_sum += best
+    return matched, iou_sum
+
+
+def _read_frames(source, count):
+    import cv2
+
+    cap = cv2.VideoCapture(int(source) if str(source).isdigit() else source)
+    frames = []
+    while len(frames) < count:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames
+
+
+def _run(model, frames, classes, warmup=3):
+    for frame in frames[:warmup]:
+        model.predict(frame, classes=classes, verbose=False)
+    times, outputs = [], []
+    for frame in frames:
+        t0 = time.perf_counter()
+        r = model.predict(frame, classes=classes, verbose=False)[0]
+        times.append(time.perf_counter() - t0)
+        outputs.append([(*b, c) for b, c in zip(r.boxes.xyxy.tolist(), r.boxes.cls.int().tolist())])
+    return times, outputs
+
+
+def compare(source, frames=200, imgsz=640, int8=False, backends=BACKENDS, model_path="yolov8n.pt",
+            classes=None, data=None):
+    frames = _read_frames(source, frames)
+    if not frames:
+        raise RuntimeError(f"cannot read frames from {source!r}")
+
+    report = {"source": str(source), "frames": len(frames), "imgsz": imgsz, "int8": int8, "results": []}
+    baseline = None
+    for backend in backends:
+        variants = [False] if backend == "torch" else ([False, True] if int8 else [False])
+        for q in variants:
+            model = load_model(model_path, backend, imgsz, q, data=data)
+            times, outputs = _run(model, frames, classes)
+            times.sort()
+            row = {
+                "backend": backend + ("-int8" if q else ""),
+                "mean_ms": 1000 * sum(times) / len(times),
+                "p95_ms": 1000 * times[int(0.95 * (len(times) - 1))],
+                "fps": len(times) / sum(times),
+                "detections": sum(len(o) for o in outputs),
+            }
+            if baseline is None:
+                baseline = outputs
+            else:
+                ref_total = sum(len(o) for o in baseline)
+                matched = iou_sum = 0
+                for ref, det in zip(baseline, outputs):
+                    m, s = match_detections(ref, det)
+                    matched += m
+                    iou_sum += s
+                row["recall_vs_torch"] = matched / ref_total if ref_total else 1.0
+                row["precision_vs_torch"] = matched / row["detections"] if row["detections"] else 1.0
+                row["mean_iou_vs_torch"] = iou_sum / matched if matched else 0.0
+            report["results"].append(row)
+            print(f"{row['backend']:>14}: {row['mean_ms']:.1f} ms/frame ({row['fps']:.1f} FPS)")
+    return report
+
+
+def format_report(report):
+    lines = [
+        f"# Backend comparison ({report['frames']} frames from {report['source']}, imgsz={report['imgsz']})",
+        "",
+        "| backend | mean ms | p95 ms | FPS | speedup | detections | recall | precision | mean IoU |",
+        "|---|---|---|---|---|---|---|---|---|",
+    ]
+    base = report["results"][0]["mean_ms"]
+    for r in report["results"]:
+        acc = [f"{r[k]:.3f}" if k in r else "baseline"
+               for k in ("recall_vs_torch", "precision_vs_torch", "mean_iou_vs_torch")]
+        lines.append(f"| {r['backend']} | {r['mean_ms']:.1f} | {r['p95_ms']:.1f} | {r['fps']:.1f} | "
+                     f"{base / r['mean_ms']:.2f}x | {r['detections']} | {' | '.join(acc)} |")
+    return "\n".join(lines) + "\n"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare YOLO CPU backends against the PyTorch baseline")
+    parser.add_argument("--source", default="0", help="video file or camera index used as test frames")
+    parser.add_argument("--frames", type=int, default=200)
+    parser.add_argument("--model", default="yolov8n.pt")
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--int8", action="store_true", help="also test INT8 variants")
+    parser.add_argument("--data", default=None, help="calibration dataset yaml for OpenVINO INT8")
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=list(BACKENDS))
+    parser.add_argument("--out", default="backend_report", help="output prefix (.md and .json)")
+    args = parser.parse_args()
+
+    backends = ["torch"] + [b for b in args.backends if b != "torch"]  # torch เป็น baseline เสมอ
+    report = compare(args.source, args.frames, args.imgsz, args.int8, backends, args.model, data=args.data)
+    with open(args.out + ".json", "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    with open(args.out + ".md", "w", encoding="utf-8") as f:
+        f.write(format_report(report))
+    print(format_report(report))
+
+
+if __name__ == "__main__":
+    main()
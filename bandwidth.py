@@ -0,0 +1,79 @@
+import threading
+import time
+from contextlib import contextmanager
+
+
+# ----------------------------- #
+# แบ่ง bandwidth / connection ให้ทุกงานดาวน์โหลด
+# ----------------------------- #
+class BandwidthScheduler:
+    """ตัวคุมรวมของทุกงานที่กำลังดาวน์โหลด
+
+    rate_limit: bytes/วินาที รวมทุกงาน (0 = ไม่จำกัด) ใช้ token bucket เดียวกัน
+                งานที่ใช้เกินโควตาจะถูกหน่วงใน progress hook (ซึ่งรันบน thread ที่อ่าน socket อยู่)
+    max_connections: จำนวน connection พร้อมกันสูงสุด (stream x fragment ของทุกงานรวมกัน)
+    fragments: จำนวน fragment ที่ดาวน์โหลดพร้อมกันต่อ stream ที่แต่ละงานขอ
+    parallel_streams: ดาวน์โหลดภาพและเสียงพร้อมกัน (ไม่ต้องรอภาพเสร็จก่อน)
+
+    ค่าทั้งหมดเปลี่ยนได้ระหว่างทำงานด้วย configure()
+    """
+
+    def __init__(self, rate_limit=0, max_connections=16, fragments=4, parallel_streams=True):
+        self.rate_limit = rate_limit
+        self.max_connections = max_connections
+        self.fragments = fragments
+        self.parallel_streams = parallel_streams
+        self.in_use = 0
+        self._cond = threading.Condition()
+        self._tokens = 0.0
+        self._last = time.monotonic()
+
+    def configure(self, **settings):
+        with self._cond:
+            for name, value in settings.items():
+                if not hasattr(self, name) or name.startswith("_") or name == "in_use":
+                    raise AttributeError(name)
+                setattr(self, name, value)
+            self._cond.notify_all()  # อาจมีงานที่รอ connection อยู่
+
+    # ---------- connections ----------
+    def acquire(self, want, cancel_event=None):
+        """ขอ connection want ตัว ได้คืนอย่างน้อย 1 (รอจนมีว่าง) และไม่เกินที่ว่างอยู่"""
+        with self._cond:
+            while self.in_use >= max(1, self.max_connections):
+                if cancel_event is not None and cancel_event.is_set():
+                    return 0
+                self._cond.wait(0.5)
+            granted = max(1, min(want, self.max_connections - self.in_use))
+            self.in_use += granted
+            return granted
+
+    def release(self, granted):
+        with self._cond:
+            self.in_use -= granted
+            self._cond.notify_all()
+
+    @contextmanager
+    def connections(self, want, cancel_event=None):
+        granted = self.acquire(want, cancel_event)
+        try:
+            yield granted
+        finally:
+            if granted:
+                self.release(granted)
+
+    # ---------- bandwidth ----------
+    def consume(self, nbytes):
+        """นับ bytes ที่เพิ่งอ่านมา แล้วหน่วงถ้ารวมทุกงานเกิน rate_limit"""
+        rate = self.rate_limit
+        if not rate or nbytes <= 0:
+            return
+        with self._cond:
+            now = time.monotonic()
+            # ยอมให้ burst ได้ครึ่งวินาที ไม่ให้สะสมโควตาตอนว่างไว้ใช้ทีเดียว
+            self._tokens = min(rate * 0.5, self._tokens + (now - self._last) * rate)
+            self._last = now
+            self._tokens -= nbytes
+            delay = -self._tokens / rate if self._tokens < 0 else 0.0
+        if delay > 0:
+            time.sleep(min(delay, 2.0))
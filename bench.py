@@ -0,0 +1,471 @@
+"""
+bench.py
+วัดความเร็วของ pipeline ตรวจจับแบบ headless และทำซ้ำได้ (ไม่ต้องมีกล้อง/หน้าจอ)
+
+pipeline (ใช้คลาสเดียวกับสคริปต์จริง ไม่ได้เขียนลูปแยก):
+  reitime    VehicleDetector: gate + ROI + track รถ + เหตุการณ์ แล้ววาดกรอบ (เหมือน reitime.py)
+  timestamp  เหมือน reitime + เขียน event log และส่งข้อความให้ Announcer (เหมือน timestamp.py)
+  people     PeopleCounter: track คน + TrackStore + overlay (เหมือน person.py)
+
+แหล่งภาพ:
+  synthetic  ภาพสังเคราะห์จาก seed คงที่ ได้เฟรมเหมือนเดิมทุกครั้ง YOLO ยังรันจริงทุกเฟรม
+             แต่กล่องที่ส่งต่อให้ postprocess/render มาจากตำแหน่งจริงของวัตถุสังเคราะห์
+             (YOLO ไม่รู้จักสี่เหลี่ยมสังเคราะห์ว่าเป็นรถหรือคน ไม่อย่างนั้นจะวัดได้แค่ทางที่ไม่มีวัตถุ)
+  sample     คลิปตัวอย่างใน repo (samples/bench_clip.mp4 สร้างจาก synthetic ด้วย --make-sample)
+             วัดการ decode วิดีโอจริงด้วย กล่องมาจาก samples/bench_clip.boxes.json วนคลิปซ้ำจนครบจำนวนเฟรม
+  <path>     คลิปวิดีโอที่บันทึกไว้ (อ่านเรียงทุกเฟรม ไม่ข้าม) ใช้กล่องจาก YOLO ตามจริง
+             (ถ้ามีไฟล์ <clip>.boxes.json ข้างคลิปจะใช้กล่องจากไฟล์นั้นแทน)
+
+ผลลัพธ์: p50/p95/p99 ของแต่ละขั้น (capture/inference/postprocess/render), FPS,
+RSS ช่วง steady state และจำนวนเหตุการณ์ต่อวินาที เขียนเป็น JSON พร้อม git commit
+
+  python bench.py --pipeline all --frames 300 --out bench_results.json
+  python bench.py --source sample --compare bench_results.json
+  python bench.py --source clip.mp4
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+STAGES = ("capture", "inference", "postprocess", "render")
+PIPELINES = ("reitime", "timestamp", "people")
+SAMPLE_CLIP = os.path.join(os.path.dirname(os.path.abspath(__file__)), "samples", "bench_clip.mp4")
+SAMPLE_FRAMES = 150  # สั้นพอให้เก็บใน repo ได้ (~0.7 MB) แล้ววนซ้ำตอนวัด
+
+
+# ----------------------------- #
+# แหล่งภาพ
+# ----------------------------- #
+class SyntheticVideo:
+    """ถนนสังเคราะห์: พื้นหลังคงที่ + สี่เหลี่ยมวิ่งผ่านด้วยความเร็วคงที่ (สุ่มจาก seed)"""
+
+    def __init__(self, frames=300, width=640, height=480, objects=6, seed=0):
+        self.frames = frames
+        self.width = width
+        self.height = height
+        rng = np.random.default_rng(seed)
+
+        y = np.linspace(60, 160, height, dtype=np.float32)[:, None]
+        bg = np.repeat(y, width, axis=1)
+        bg += rng.normal(0, 4, (height, width)).astype(np.float32)
+        self.background = np.clip(np.dstack([bg, bg, bg]), 0, 255).astype(np.uint8)
+
+        self.objects = []
+        for _ in range(objects):
+            w, h = int(rng.integers(60, 160)), int(rng.integers(40, 100))
+            self.objects.append({
+                "size": (w, h),
+                "y": int(rng.integers(height // 3, height - h)),
+                "start": int(rng.integers(-width, 0)),
+                "speed": float(rng.uniform(2, 8)),
+                "color": tuple(int(c) for c in rng.integers(0, 255, 3)),
+            })
+        self.index = 0
+        self.boxes = []  # [(track id, (x1, y1, x2, y2)), ...] ของเฟรมล่าสุดที่อ่าน
+
+    def read(self):
+        if self.index >= self.frames:
+            return False, None
+        frame = self.background.copy()
+        self.boxes = []
+        for k, obj in enumerate(self.objects):
+            w, h = obj["size"]
+            pos = int(obj["start"] + obj["speed"] * self.index)
+            x = pos % (self.width + w) - w
+            cv2.rectangle(frame, (x, obj["y"]), (x + w, obj["y"] + h), obj["color"], -1)
+            cv2.circle(frame, (x + w // 4, obj["y"] + h), h // 5, (20, 20, 20), -1)
+            cv2.circle(frame, (x + 3 * w // 4, obj["y"] + h), h // 5, (20, 20, 20), -1)
+            x1, x2 = max(0, x), min(self.width, x + w)
+            if x2 - x1 >= 10:
+                # วิ่งครบรอบแล้วกลับมาใหม่นับเป็นวัตถุใหม่ (id ใหม่) จึงเกิดเหตุการณ์ entered/left ด้วย
+                tid = (pos // (self.width + w) + 10) * 100 + k + 1
+                self.boxes.append((tid, (x1, obj["y"], x2, obj["y"] + h)))
+        self.index += 1
+        return True, frame
+
+    def release(self):
+        pass
+
+
+def truth_path(clip):
+    return os.path.splitext(clip)[0] + ".boxes.json"
+
+
+def make_sample(path=SAMPLE_CLIP, frames=SAMPLE_FRAMES, seed=0, fps=30):
+    """เขียนคลิปตัวอย่างจาก SyntheticVideo พร้อมกล่องจริงของทุกเฟรม (<clip>.boxes.json)"""
+    video = SyntheticVideo(frames=frames, seed=seed)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (video.width, video.height))
+    if not writer.isOpened():
+        raise RuntimeError(f"cannot write {path} (OpenCV without an mp4v encoder)")
+    truth = []
+    while True:
+        ret, frame = video.read()
+        if not ret:
+            break
+        writer.write(frame)
+        truth.append([[tid, *box] for tid, box in video.boxes])
+    writer.release()
+    with open(truth_path(path), "w", encoding="utf-8") as f:
+        json.dump({"seed": seed, "fps": fps, "frames": truth}, f, separators=(",", ":"))
+    return path
+
+
+class ClipVideo:
+    """อ่านคลิปเรียงทุกเฟรม (ไม่ใช้ FrameGrabber เพราะจะทิ้งเฟรมตามจังหวะเวลา ผลจึงไม่คงที่)
+
+    loop: อ่านจบแล้วเริ่มใหม่จนครบ frames เฟรม
+    ถ้ามี <clip>.boxes.json ข้างคลิป self.boxes คือกล่องจริงของเฟรมล่าสุด (ใช้แทนผลของ YOLO)
+    """
+
+    def __init__(self, path, frames=None, loop=False):
+        self.cap = cv2.VideoCapture(path)
+        if not self.cap.isOpened():
+            raise RuntimeError(f"cannot open {path}")
+        self.width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        self.height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        self.frames = frames
+        self.loop = loop
+        self.index = 0
+        self.pos = 0    # เฟรมที่เท่าไรของคลิป
+        self.loops = 0  # วนมาแล้วกี่รอบ
+        self.truth = None
+        self.boxes = None
+        if os.path.exists(truth_path(path)):
+            with open(truth_path(path), encoding="utf-8") as f:
+                self.truth = json.load(f)["frames"]
+            self.boxes = []
+
+    def read(self):
+        if self.frames is not None and self.index >= self.frames:
+            return False, None
+        ret, frame = self.cap.read()
+        if not ret and self.loop and self.pos > 0:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            self.pos = 0
+            self.loops += 1
+            ret, frame = self.cap.read()
+        if not ret:
+            return False, None
+        if self.truth is not None:
+            # รอบใหม่ได้ id ใหม่ ไม่อย่างนั้น tracker / เหตุการณ์จะเห็นเป็นคันเดิมที่กลับมา
+            rows = self.truth[self.pos] if self.pos < len(self.truth) else []
+            self.boxes = [(tid + self.loops * 100000, tuple(box)) for tid, *box in rows]
+        self.index += 1
+        self.pos += 1
+        return True, frame
+
+    def release(self):
+        self.cap.release()
+
+
+def open_source(source, frames, seed=0):
+    if source == "synthetic":
+        return SyntheticVideo(frames=frames, seed=seed)
+    if source == "sample":
+        return ClipVideo(SAMPLE_CLIP, frames, loop=True)
+    return ClipVideo(source, frames)
+
+
+# ----------------------------- #
+# กล่องจากภาพสังเคราะห์ (แทนผลของ YOLO)
+# ----------------------------- #
+class _Column:
+    """เลียนแบบ tensor ของ ultralytics เท่าที่ pipeline ใช้ (.int() / .tolist())"""
+
+    def __init__(self, values):
+        self.values = values
+
+    def int(self):
+        return _Column([int(v) for v in self.values])
+
+    def tolist(self):
+        return list(self.values)
+
+
+class _Boxes:
+    def __init__(self, boxes, cls):
+        self.id = _Column([tid for tid, _ in boxes]) if boxes else None
+        self.xyxy = _Column([list(map(float, box)) for _, box in boxes])
+        self.cls = _Column([cls] * len(boxes))
+        self.conf = _Column([0.9] * len(boxes))
+
+
+class _Result:
+    def __init__(self, img, boxes, cls, names):
+        self.orig_img = img
+        self.boxes = _Boxes(boxes, cls)
+        self.names = names
+        self._raw = boxes
+
+    def plot(self):
+        out = self.orig_img.copy()
+        for tid, (x1, y1, x2, y2) in self._raw:
+            cv2.rectangle(out, (int(x1), int(y1)), (int(x2), int(y2)), (0, 255, 0), 2)
+            cv2.putText(out, f"{self.names[self.boxes.cls.values[0]]} id:{tid}", (int(x1), int(y1) - 5),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 1)
+        return out
+
+
+class InjectedModel:
+    """ห่อ YOLO: รัน track จริงทุกครั้ง (เวลา inference เป็นของจริง) แต่คืนกล่องจากตำแหน่งวัตถุในภาพสังเคราะห์
+    offset: มุมบนซ้ายของภาพที่ส่งเข้ามา (เมื่อใช้ ROI ภาพถูกตัดมาจากภาพเต็ม)"""
+
+    def __init__(self, model, video, offset=(0, 0)):
+        self.model = model
+        self.video = video
+        self.offset = offset
+        self.names = model.names
+
+    def track(self, img, classes=None, **kwargs):
+        self.model.track(img, classes=classes, **kwargs)
+        ox, oy = self.offset
+        boxes = [(tid, (x1 - ox, y1 - oy, x2 - ox, y2 - oy)) for tid, (x1, y1, x2, y2) in self.video.boxes]
+        return [_Result(img, boxes, classes[0] if classes else 0, self.names)]
+
+
+# ----------------------------- #
+# pipeline ที่ใช้วัด
+# ----------------------------- #
+class VehiclePipeline:
+    """reitime / timestamp ผ่าน VehicleDetector ตัวเดียวกับสคริปต์ (gate, ROI, เหตุการณ์, sink, Announcer)"""
+
+    def __init__(self, model, gate_mode="motion", roi=None, with_events=False):
+        from event_sink import JsonlSink
+        from inference_gate import InferenceGate
+        from vehicle_detector import VehicleDetector
+
+        self.tmp = None
+        self.sink = None
+        self.announcer = None
+        announce = None
+        if with_events:
+            from announcer import Announcer
+
+            self.tmp = tempfile.TemporaryDirectory(prefix="bench_")
+            self.sink = JsonlSink(os.path.join(self.tmp.name, "events.jsonl"))
+            # driver "dummy" ของ pyttsx3: ผ่านคิวและเธรดของ Announcer ครบ แต่ไม่ออกเสียง
+            self.announcer = Announcer(driver="dummy", interval=0, echo=False)
+            announce = lambda ev: self.announcer.announce(f"vehicle {ev['id']}", key=f"vehicle-{ev['id']}")
+        self.detector = VehicleDetector(model, gate=InferenceGate(gate_mode), roi=roi, sink=self.sink,
+                                        announce=announce)
+        self.event_count = 0
+
+    def infer(self, frame):
+        return self.detector.infer(frame)
+
+    def postprocess(self, inferred):
+        new_events = self.detector.postprocess(inferred)
+        self.event_count += len(new_events)
+        return new_events
+
+    def render(self, frame, inferred, new_events):
+        return self.detector.draw(frame)
+
+    def close(self):
+        self.detector.close()
+        if self.sink is not None:
+            self.sink.close()
+        if self.announcer is not None:
+            self.announcer.stop()
+        if self.tmp is not None:
+            self.tmp.cleanup()
+
+
+class PeoplePipeline:
+    def __init__(self, model):
+        from person import PeopleCounter
+
+        self.counter = PeopleCounter(model_path=None)
+        self.counter.model = model
+        self.event_count = 0
+
+    def infer(self, frame):
+        return self.counter.model.track(frame, persist=True, classes=[0], verbose=False)[0]
+
+    def postprocess(self, result):
+        before = self.counter.total_count
+        now_th = self.counter.record(result)
+        self.event_count += self.counter.total_count - before
+        return now_th
+
+    def render(self, frame, result, now_th):
+        return self.counter.annotate(result, now_th)
+
+    def close(self):
+        pass
+
+
+# ----------------------------- #
+# วัดผล
+# ----------------------------- #
+def rss_bytes():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        import resource
+
+        # ru_maxrss เป็น KB บน Linux (ได้แค่ค่าสูงสุด ไม่ใช่ค่าปัจจุบัน)
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def percentiles(values):
+    if not values:
+        return {"p50": None, "p95": None, "p99": None, "mean": None}
+    arr = np.asarray(values) * 1000.0
+    p50, p95, p99 = np.percentile(arr, [50, 95, 99])
+    return {"p50": round(float(p50), 3), "p95": round(float(p95), 3),
+            "p99": round(float(p99), 3), "mean": round(float(arr.mean()), 3)}
+
+
+def run_pipeline(name, model, source, frames, warmup=20, render=True, seed=0, gate_mode="motion", rois=None):
+    from roi import RegionOfInterest
+
+    video = open_source(source, frames + warmup, seed)
+    roi = RegionOfInterest(rois) if rois and name != "people" else None
+    if video.boxes is not None:  # มีกล่องจริง (synthetic / คลิปที่มี .boxes.json)
+        offset = roi.union_rect((video.height, video.width, 3))[:2] if roi else (0, 0)
+        model = InjectedModel(model, video, offset)
+    if name == "people":
+        pipe = PeoplePipeline(model)
+    else:
+        pipe = VehiclePipeline(model, gate_mode, roi, with_events=(name == "timestamp"))
+
+    timings = {stage: [] for stage in STAGES}
+    rss = []
+    measured = 0
+    events_at_start = 0
+    t_start = None
+
+    index = 0
+    while True:
+        t0 = time.perf_counter()
+        ret, frame = video.read()
+        t1 = time.perf_counter()
+        if not ret:
+            break
+        result = pipe.infer(frame)
+        t2 = time.perf_counter()
+        state = pipe.postprocess(result)
+        t3 = time.perf_counter()
+        if render:
+            pipe.render(frame, result, state)
+        t4 = time.perf_counter()
+
+        index += 1
+        if index == warmup:
+            events_at_start = pipe.event_count
+            t_start = time.perf_counter()
+        if index <= warmup:
+            continue
+
+        measured += 1
+        for stage, dt in zip(STAGES, (t1 - t0, t2 - t1, t3 - t2, t4 - t3)):
+            timings[stage].append(dt)
+        if measured > frames // 2:
+            rss.append(rss_bytes())  # ครึ่งหลังของการรันถือเป็น steady state
+
+    elapsed = time.perf_counter() - t_start if t_start else 0.0
+    video.release()
+    pipe.close()
+
+    total = [sum(ts) for ts in zip(*timings.values())]
+    return {
+        "pipeline": name,
+        "frames": measured,
+        "fps": round(measured / elapsed, 2) if elapsed else None,
+        "stages_ms": {stage: percentiles(timings[stage]) for stage in STAGES},
+        "total_ms": percentiles(total),
+        "rss_mb": round(float(np.median(rss)) / 2**20, 1) if rss else None,
+        "events": pipe.event_count - events_at_start,
+        "events_per_sec": round((pipe.event_count - events_at_start) / elapsed, 3) if elapsed else None,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"],
+                                       cwd=os.path.dirname(os.path.abspath(__file__)),
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare_reports(old, new):
+    """พิมพ์ผลต่างของ total p50 / FPS ระหว่างสองรายงาน"""
+    old_rows = {r["pipeline"]: r for r in old["results"]}
+    for r in new["results"]:
+        o = old_rows.get(r["pipeline"])
+        if not o:
+            continue
+        p_old, p_new = o["total_ms"]["p50"], r["total_ms"]["p50"]
+        change = (p_new - p_old) / p_old * 100 if p_old else 0.0
+        print(f"{r['pipeline']:>10}: p50 {p_old:.2f} → {p_new:.2f} ms ({change:+.1f}%), "
+              f"FPS {o['fps']} → {r['fps']}  [{old.get('commit')} → {new.get('commit')}]")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless, reproducible benchmark of the detection pipelines")
+    parser.add_argument("--pipeline", choices=PIPELINES + ("all",), default="all")
+    parser.add_argument("--source", default="synthetic",
+                        help="'synthetic' (in memory), 'sample' (checked-in clip) or a recorded video clip")
+    parser.add_argument("--frames", type=int, default=300, help="measured frames (after warm-up)")
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--model", default="yolov8n.pt")
+    parser.add_argument("--backend", choices=["torch", "onnx", "openvino"], default="torch")
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--gate", choices=["off", "every_n", "motion", "adaptive"], default="motion",
+                        help="inference gate of the vehicle pipelines (as in reitime.py / timestamp.py)")
+    parser.add_argument("--roi", type=int, nargs=4, metavar=("X1", "Y1", "X2", "Y2"),
+                        help="road region for the vehicle pipelines (default: whole frame)")
+    parser.add_argument("--no-render", action="store_true", help="skip the render stage (headless deployments)")
+    parser.add_argument("--out", default="bench_results.json")
+    parser.add_argument("--compare", help="previous results JSON to compare against")
+    parser.add_argument("--make-sample", action="store_true",
+                        help="regenerate samples/bench_clip.mp4 and its ground-truth boxes, then exit")
+    args = parser.parse_args()
+
+    if args.make_sample:
+        print(f"saved {make_sample(seed=args.seed)}")
+        return
+
+    from backends import load_model
+
+    cv2.setNumThreads(1)  # ให้ผลคงที่ระหว่างการรัน
+    names = PIPELINES if args.pipeline == "all" else (args.pipeline,)
+    report = {
+        "commit": git_commit(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "host": {"platform": platform.platform(), "python": platform.python_version(), "cpus": os.cpu_count()},
+        "config": {k: v for k, v in vars(args).items() if k not in ("out", "compare")},
+        "results": [],
+    }
+    for name in names:
+        model = load_model(args.model, args.backend, args.imgsz)  # โมเดลใหม่ต่อ pipeline (tracker ไม่ปนกัน)
+        row = run_pipeline(name, model, args.source, args.frames, args.warmup, not args.no_render, args.seed,
+                           args.gate, [tuple(args.roi)] if args.roi else None)
+        report["results"].append(row)
+        stages = "  ".join(f"{s}={row['stages_ms'][s]['p50']}ms" for s in STAGES)
+        print(f"{name:>10}: {row['fps']} FPS  {stages}  rss={row['rss_mb']}MB  events/s={row['events_per_sec']}")
+
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"saved {args.out}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare_reports(json.load(f), report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+"""
+download_bench.py
+วัด throughput ของตัวดาวน์โหลด (youtube_downloader_gui.py) กับ HTTP server ในเครื่อง
+ไม่ต้องต่ออินเทอร์เน็ต และได้ผลเทียบกันได้ทุกครั้ง
+
+server จำลอง HLS: แต่ละ fragment ถูกจำกัดความเร็วต่อ connection (--conn-rate) และมี latency
+ต่อ request (--latency) เหมือน CDN จริง จึงเห็นผลของการดาวน์โหลดหลาย fragment พร้อมกัน
+
+กรณีที่วัด:
+  fragments  งานเดียว stream เดียว ที่ concurrent fragments ต่าง ๆ (--fragments 1 2 4 8)
+  streams    ภาพ + เสียง แบบทีละ stream เทียบกับพร้อมกัน (fetch_streams)
+  cap        หลายงานพร้อมกันภายใต้ speed limit รวม (--cap MB/s) ตรวจว่ารวมแล้วไม่เกิน
+
+  python download_bench.py
+  python download_bench.py --fragments 1 4 16 --conn-rate 2 --cap 8 --out download_bench.json
+"""
+
+import argparse
+import copy
+import json
+import os
+import platform
+import shutil
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+# ----------------------------- #
+# HTTP server จำลอง HLS
+# ----------------------------- #
+def start_server(segments=40, segment_kb=256, conn_rate_mb=4.0, latency_ms=20):
+    """เปิด server ที่ 127.0.0.1 (port สุ่ม) คืน (server, base_url)
+    path: /<stream>/index.m3u8 และ /<stream>/seg<i>.ts ใช้ชื่อ stream อะไรก็ได้"""
+    segment = bytes(range(256)) * (segment_kb * 4)
+    conn_rate = conn_rate_mb * 2**20
+    playlist = ("#EXTM3U\n#EXT-X-VERSION:3\n#EXT-X-TARGETDURATION:4\n#EXT-X-MEDIA-SEQUENCE:0\n"
+                + "".join(f"#EXTINF:4.0,\nseg{i}.ts\n" for i in range(segments))
+                + "#EXT-X-ENDLIST\n").encode()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(latency_ms / 1000.0)
+            name = self.path.rsplit("/", 1)[-1]
+            if name == "index.m3u8":
+                body, ctype = playlist, "application/vnd.apple.mpegurl"
+            elif name.startswith("seg") and name.endswith(".ts"):
+                body, ctype = segment, "video/mp2t"
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", ctype)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            # จำกัดความเร็วต่อ connection: ส่งทีละ 16 KB แล้วหน่วง
+            chunk = 16 * 1024
+            for i in range(0, len(body), chunk):
+                self.wfile.write(body[i:i + chunk])
+                if ctype == "video/mp2t":
+                    time.sleep(chunk / conn_rate)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def synthetic_info(base, video_id, split_streams=False):
+    """info dict แบบเดียวกับที่ extractor คืน (ไม่ต้องมี extractor) ชี้ไปที่ server ในเครื่อง"""
+    if split_streams:
+        formats = [
+            {"format_id": "v", "url": f"{base}/{video_id}-v/index.m3u8", "protocol": "m3u8_native",
+             "ext": "mp4", "vcodec": "avc1.4d401f", "acodec": "none", "height": 720},
+            {"format_id": "a", "url": f"{base}/{video_id}-a/index.m3u8", "protocol": "m3u8_native",
+             "ext": "m4a", "vcodec": "none", "acodec": "mp4a.40.2"},
+        ]
+    else:
+        formats = [{"format_id": "hls", "url": f"{base}/{video_id}/index.m3u8", "protocol": "m3u8_native",
+                    "ext": "mp4", "vcodec": "avc1.4d401f", "acodec": "mp4a.40.2", "height": 720}]
+    return {"id": video_id, "title": video_id, "formats": formats, "extractor": "generic",
+            "extractor_key": "Generic", "webpage_url": f"{base}/{video_id}"}
+
+
+# ----------------------------- #
+# การวัด
+# ----------------------------- #
+def bench_opts(folder, job, scheduler, fragments, fmt_spec):
+    from youtube_downloader_gui import make_ydl_opts
+
+    opts = make_ydl_opts(folder, "MP4", "best", job, scheduler, fragments=fragments)
+    # ไฟล์ทดสอบไม่ใช่วิดีโอจริง: ไม่ merge / fixup ด้วย ffmpeg และไม่บันทึก archive
+    opts.update({"format": fmt_spec, "fixup": "never", "quiet": True, "no_warnings": True,
+                 "noprogress": True, "postprocessors": []})
+    opts.pop("download_archive", None)
+    return opts
+
+
+def folder_bytes(folder):
+    return sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(folder) for f in files)
+
+
+def run_job(base, folder, video_id, scheduler, fragments, split_streams=False, parallel=False):
+    """ดาวน์โหลดหนึ่งงานด้วย hook และ scheduler ตัวเดียวกับ GUI คืนจำนวน bytes"""
+    import yt_dlp
+
+    from youtube_downloader_gui import DownloadJob, fetch_streams
+
+    job = DownloadJob(f"{base}/{video_id}", folder, "MP4", "best", video_id=video_id)
+    info = synthetic_info(base, video_id, split_streams)
+    out = os.path.join(folder, video_id)
+    os.makedirs(out)
+    spec = "v+a" if split_streams else "best"
+    with scheduler.connections((2 if split_streams else 1) * fragments) as granted, \
+            yt_dlp.YoutubeDL(bench_opts(out, job, scheduler, max(1, granted // (2 if split_streams else 1)),
+                                        spec)) as ydl:
+        if not split_streams:
+            ydl.process_ie_result(info, download=True)
+        elif parallel:
+            fetch_streams(ydl, info)
+        else:
+            # แบบเดิมของ yt-dlp: ทีละ stream
+            resolved = ydl.process_ie_result(copy.deepcopy(info), download=False)
+            root = os.path.splitext(ydl.prepare_filename(resolved))[0]
+            for f in resolved["requested_formats"]:
+                stream_info = dict(resolved)
+                del stream_info["requested_formats"]
+                stream_info.update(f)
+                ydl.dl(f"{root}.f{f['format_id']}.{f['ext']}", stream_info)
+    return folder_bytes(out)
+
+
+def measure(label, fn):
+    t0 = time.perf_counter()
+    size = fn()
+    seconds = time.perf_counter() - t0
+    row = {"case": label, "mb": round(size / 2**20, 2), "seconds": round(seconds, 3),
+           "mb_per_sec": round(size / 2**20 / seconds, 2)}
+    print(f"{label:>28}: {row['mb']:7.1f} MB in {row['seconds']:6.2f} s = {row['mb_per_sec']:7.2f} MB/s")
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local-server throughput benchmark for the downloader")
+    parser.add_argument("--fragments", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--segments", type=int, default=40, help="fragments per stream")
+    parser.add_argument("--segment-kb", type=int, default=256)
+    parser.add_argument("--conn-rate", type=float, default=4.0, help="MB/s per connection (server side)")
+    parser.add_argument("--latency", type=float, default=20, help="ms per request (server side)")
+    parser.add_argument("--cap", type=float, default=8.0, help="global MB/s limit for the 'cap' case")
+    parser.add_argument("--jobs", type=int, default=3, help="concurrent jobs in the 'cap' case")
+    parser.add_argument("--out", default="download_bench.json")
+    args = parser.parse_args()
+
+    from bandwidth import BandwidthScheduler
+
+    server, base = start_server(args.segments, args.segment_kb, args.conn_rate, args.latency)
+    tmp = tempfile.mkdtemp(prefix="download_bench_")
+    ids = iter(range(10**6))
+    results = []
+    try:
+        for n in args.fragments:
+            scheduler = BandwidthScheduler(max_connections=64, fragments=n)
+            results.append(measure(f"fragments={n}", lambda: run_job(base, tmp, f"f{next(ids)}", scheduler, n)))
+
+        n = max(args.fragments)
+        scheduler = BandwidthScheduler(max_connections=64, fragments=n)
+        for parallel in (False, True):
+            label = f"streams {'parallel' if parallel else 'sequential'} x{n}"
+            results.append(measure(label, lambda: run_job(base, tmp, f"s{next(ids)}", scheduler, n,
+                                                          split_streams=True, parallel=parallel)))
+
+        scheduler = BandwidthScheduler(rate_limit=args.cap * 2**20, max_connections=64, fragments=n)
+
+        def capped():
+            sizes = []
+            threads = [threading.Thread(target=lambda: sizes.append(run_job(base, tmp, f"c{next(ids)}", scheduler, n)))
+                       for _ in range(args.jobs)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            return sum(sizes)
+
+        row = measure(f"cap {args.cap:g} MB/s, {args.jobs} jobs", capped)
+        row["cap_mb_per_sec"] = args.cap
+        results.append(row)
+    finally:
+        server.shutdown()
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    report = {
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "host": {"platform": platform.platform(), "python": platform.python_version(), "cpus": os.cpu_count()},
+        "config": {k: v for k, v in vars(args).items() if k != "out"},
+        "results": results,
+    }
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"saved {args.out}")
+
+
+if __name__ == "__main__":
+    main()
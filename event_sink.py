@@ -0,0 +1,277 @@
+import abc
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+_STOP = object()
+
+FIELDS = ("ts", "kind", "event", "source", "track_id", "cls", "entry_ts", "exit_ts", "stay")
+
+
+def _epoch(value):
+    if value is None:
+        return None
+    return value.timestamp() if hasattr(value, "timestamp") else float(value)
+
+
+def person_event(rec, source=None):
+    """แปลง TrackRecord ของ PeopleCounter เป็นแถวเหตุการณ์ (หนึ่งแถวต่อการเข้าพื้นที่หนึ่งครั้ง)"""
+    return {
+        "ts": _epoch(rec.entry),
+        "kind": "person",
+        "event": "visit",
+        "source": source,
+        "track_id": rec.pid,
+        "cls": 0,
+        "entry_ts": _epoch(rec.entry),
+        "exit_ts": _epoch(rec.exit),
+        "stay": rec.stay,
+    }
+
+
+def vehicle_event(ev, source=None):
+    """แปลงเหตุการณ์จาก VehicleEventTracker เป็นแถวเหตุการณ์"""
+    return {
+        "ts": _epoch(ev["time"]),
+        "kind": "vehicle",
+        "event": ev["type"],
+        "source": source,
+        "track_id": ev["id"],
+        "cls": ev["cls"],
+        "entry_ts": None,
+        "exit_ts": _epoch(ev["time"]) if ev["type"] == "left" else None,
+        "stay": ev.get("duration"),
+    }
+
+
+# ----------------------------- #
+# ตัวเขียนเหตุการณ์ลงดิสก์ในเธรดแยก
+# ----------------------------- #
+class EventSink(abc.ABC):
+    """รับเหตุการณ์จากลูปตรวจจับ แล้วเขียนลงดิสก์เป็นชุด ๆ ในเธรดแยก
+
+    emit() ไม่รอดิสก์เลย จะเขียนเมื่อครบ batch_size เหตุการณ์ หรือครบ flush_interval วินาที
+    ถ้าคิวเต็ม (ดิสก์ช้ามาก) เหตุการณ์ใหม่จะถูกทิ้งและนับไว้ใน dropped
+    """
+
+    def __init__(self, batch_size=100, flush_interval=1.0, maxsize=10000):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.q = queue.Queue(maxsize=maxsize)
+        self.written = 0
+        self.dropped = 0
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def emit(self, event):
+        try:
+            self.q.put_nowait(event)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def _run(self):
+        self.open()
+        batch = []
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.time())
+            try:
+                item = self.q.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            if item is _STOP:
+                break
+            if item is not None:
+                batch.append(item)
+                if deadline is None:
+                    deadline = time.time() + self.flush_interval
+
+            if batch and (len(batch) >= self.batch_size or time.time() >= deadline):
+                self._flush(batch)
+                batch = []
+                deadline = None
+
+        if batch:
+            self._flush(batch)
+        self.close_backend()
+
+    def _flush(self, batch):
+        try:
+            self.write_batch(batch)
+            self.written += len(batch)
+        except Exception as e:
+            # ไม่ให้ปัญหาดิสก์ทำเธรดตาย แค่แจ้งแล้วนับเป็นเหตุการณ์ที่หาย
+            print("Event sink write error:", e)
+            self.dropped += len(batch)
+
+    def close(self):
+        """เขียนเหตุการณ์ที่ค้างทั้งหมดแล้วปิดไฟล์ (รอได้ จึงควรเรียกตอนจบโปรแกรม)"""
+        self.q.put(_STOP)
+        self.thread.join()
+
+    # ---- ส่วนที่ backend ต้อง implement ----
+    def open(self):
+        pass
+
+    @abc.abstractmethod
+    def write_batch(self, events):
+        """เขียนเหตุการณ์หลายแถวในครั้งเดียว (เรียกจากเธรดเขียนเท่านั้น)"""
+
+    def close_backend(self):
+        pass
+
+    @abc.abstractmethod
+    def iter_events(self, kind=None, event=None, start=None, end=None):
+        """เหตุการณ์ที่เขียนแล้วตามเงื่อนไข (dict ตาม FIELDS)"""
+
+    # ---- query ----
+    def counts_per_interval(self, interval=3600, kind=None, event=None, start=None, end=None):
+        """จำนวนเหตุการณ์ต่อช่วงเวลา คืน [(เวลาเริ่มช่วง epoch, จำนวน), ...]"""
+        counts = {}
+        for ev in self.iter_events(kind, event, start, end):
+            bucket = int(ev["ts"] // interval) * interval
+            counts[bucket] = counts.get(bucket, 0) + 1
+        return sorted(counts.items())
+
+    def average_stay(self, kind="person", start=None, end=None):
+        """เวลาอยู่เฉลี่ย (วินาที) หรือ None ถ้าไม่มีข้อมูล"""
+        stays = [ev["stay"] for ev in self.iter_events(kind, None, start, end) if ev.get("stay") is not None]
+        return sum(stays) / len(stays) if stays else None
+
+
+def _matches(ev, kind, event, start, end):
+    if kind is not None and ev.get("kind") != kind:
+        return False
+    if event is not None and ev.get("event") != event:
+        return False
+    if start is not None and ev["ts"] < start:
+        return False
+    if end is not None and ev["ts"] >= end:
+        return False
+    return True
+
+
+class JsonlSink(EventSink):
+    """เขียนเหตุการณ์ต่อท้ายไฟล์ JSONL (หนึ่งบรรทัดต่อเหตุการณ์) ไม่มีการแก้ไขย้อนหลัง"""
+
+    def __init__(self, path, **kwargs):
+        self.path = path
+        self.fp = None
+        super().__init__(**kwargs)
+
+    def open(self):
+        folder = os.path.dirname(self.path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        self.fp = open(self.path, "a", encoding="utf-8")
+
+    def write_batch(self, events):
+        self.fp.write("".join(json.dumps(ev, ensure_ascii=False) + "\n" for ev in events))
+        self.fp.flush()
+
+    def close_backend(self):
+        if self.fp is not None:
+            self.fp.close()
+
+    def iter_events(self, kind=None, event=None, start=None, end=None):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    ev = json.loads(line)
+                except ValueError:
+                    continue  # บรรทัดสุดท้ายอาจเขียนไม่ครบตอนโปรแกรมถูกปิด
+                if _matches(ev, kind, event, start, end):
+                    yield ev
+
+
+class SQLiteSink(EventSink):
+    """เก็บเหตุการณ์ในตาราง events ของ SQLite (WAL) query ได้ระหว่างที่ยังเขียนอยู่"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS events (
+            ts REAL NOT NULL,
+            kind TEXT NOT NULL,
+            event TEXT NOT NULL,
+            source TEXT,
+            track_id INTEGER,
+            cls INTEGER,
+            entry_ts REAL,
+            exit_ts REAL,
+            stay REAL
+        );
+        CREATE INDEX IF NOT EXISTS idx_events_kind_ts ON events (kind, ts);
+    """
+
+    def __init__(self, path="events.db", **kwargs):
+        self.path = path
+        self.conn = None
+        # สร้างตารางก่อนเริ่มเธรด เพื่อให้ query ได้ทันที
+        conn = sqlite3.connect(path)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(self.SCHEMA)
+        conn.close()
+        super().__init__(**kwargs)
+
+    def open(self):
+        # connection ของ sqlite3 ใช้ได้เฉพาะเธรดที่สร้าง จึงเปิดในเธรดเขียน
+        self.conn = sqlite3.connect(self.path)
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+
+    def write_batch(self, events):
+        rows = [tuple(ev.get(k) for k in FIELDS) for ev in events]
+        with self.conn:
+            self.conn.executemany(
+                f"INSERT INTO events ({', '.join(FIELDS)}) VALUES ({', '.join('?' * len(FIELDS))})", rows)
+
+    def close_backend(self):
+        if self.conn is not None:
+            self.conn.close()
+
+    def _where(self, kind, event, start, end):
+        clauses, params = [], []
+        for sql, value in (("kind = ?", kind), ("event = ?", event), ("ts >= ?", start), ("ts < ?", end)):
+            if value is not None:
+                clauses.append(sql)
+                params.append(value)
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def _query(self, sql, params):
+        conn = sqlite3.connect(self.path)
+        try:
+            return conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+
+    def iter_events(self, kind=None, event=None, start=None, end=None):
+        where, params = self._where(kind, event, start, end)
+        for row in self._query(f"SELECT {', '.join(FIELDS)} FROM events{where} ORDER BY ts", params):
+            yield dict(zip(FIELDS, row))
+
+    def counts_per_interval(self, interval=3600, kind=None, event=None, start=None, end=None):
+        where, params = self._where(kind, event, start, end)
+        sql = (f"SELECT CAST(ts / ? AS INTEGER) * ? AS bucket, COUNT(*) FROM events{where} "
+               "GROUP BY bucket ORDER BY bucket")
+        return [(int(b), n) for b, n in self._query(sql, [interval, interval] + params)]
+
+    def average_stay(self, kind="person", start=None, end=None):
+        where, params = self._where(kind, None, start, end)
+        where += (" AND" if where else " WHERE") + " stay IS NOT NULL"
+        return self._query(f"SELECT AVG(stay) FROM events{where}", params)[0][0]
+
+
+def open_sink(path, **kwargs):
+    """เลือก backend จากนามสกุลไฟล์: .db/.sqlite → SQLite, อื่น ๆ → JSONL"""
+    if path.endswith((".db", ".sqlite", ".sqlite3")):
+        return SQLiteSink(path, **kwargs)
+    return JsonlSink(path, **kwargs)
@@ -0,0 +1,108 @@
+import os
+import threading
+import time
+from collections import deque
+
+import cv2
+
+
+# ----------------------------- #
+# ตัวอ่านเฟรมจากกล้องแบบแยกเธรด
+# ----------------------------- #
+class FrameGrabber:
+    """อ่านเฟรมจากกล้อง/ไฟล์วิดีโอในเธรดแยก แล้วเก็บเฉพาะเฟรมล่าสุด
+
+    ใช้แทน cv2.VideoCapture ได้โดยตรง (read / isOpened / release)
+    เพื่อไม่ให้ YOLO ที่ช้าไปทำให้เฟรมค้างอยู่ในไดรเวอร์กล้อง
+
+    block: เมื่อ buffer เต็มให้เธรดอ่านรอผู้อ่านแทนการทิ้งเฟรม ค่าเริ่มต้น (None) เปิดเองเมื่อ source
+    เป็นไฟล์ในเครื่อง เพราะไฟล์ถูกอ่านเร็วกว่าเวลาจริงมาก ถ้าทิ้งเฟรมจะเหลือแค่ไม่กี่เฟรมของคลิป
+    กล้อง / สตรีมสดไม่ควรเปิด (เฟรมจะค้างในไดรเวอร์และภาพช้ากว่าจริง)
+    """
+
+    def __init__(self, source=0, buffer_size=1, block=None):
+        self.source = source
+        self.block = os.path.isfile(str(source)) if block is None else block
+        self.cap = cv2.VideoCapture(source)
+        self.buffer = deque(maxlen=buffer_size)  # ring buffer เก็บ (frame_id, frame)
+        self.cond = threading.Condition()
+
+        self.captured = 0  # จำนวนเฟรมที่อ่านได้ทั้งหมด
+        self.dropped = 0   # เฟรมที่ถูกทิ้งเพราะไม่มีใครมาอ่านทัน
+        self.last_id = -1  # frame_id ล่าสุดที่ส่งให้ผู้อ่าน
+        self.stopped = False
+
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        if self.cap.isOpened():
+            self.thread.start()
+        else:
+            self.stopped = True
+
+    def _run(self):
+        while not self.stopped:
+            ret, frame = self.cap.read()
+            if not ret:
+                break
+            with self.cond:
+                while self.block and len(self.buffer) == self.buffer.maxlen and not self.stopped:
+                    self.cond.wait()  # ไฟล์: รอผู้อ่านหยิบเฟรมไปก่อน ไม่ทิ้ง
+                if self.stopped:
+                    break
+                if len(self.buffer) == self.buffer.maxlen:
+                    self.dropped += 1  # เฟรมเก่าสุดหลุดออกจาก ring buffer
+                self.buffer.append((self.captured, frame))
+                self.captured += 1
+                self.cond.notify_all()
+
+        with self.cond:
+            self.stopped = True
+            self.cond.notify_all()
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def read(self, timeout=None):
+        """คืนค่า (ret, frame) ของเฟรมใหม่ล่าสุด เหมือน cv2.VideoCapture.read()
+
+        รอจนมีเฟรมที่ยังไม่เคยส่งออก ถ้ากล้องปิดแล้วและไม่มีเฟรมเหลือจะได้ (False, None)
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        with self.cond:
+            while not self.buffer or self.buffer[-1][0] <= self.last_id:
+                if self.stopped:
+                    return False, None
+                remaining = None if deadline is None else deadline - time.time()
+                if remaining is not None and remaining <= 0:
+                    return False, None
+                self.cond.wait(remaining)
+
+            frame_id, frame = self.buffer[-1]
+            # เฟรมเก่าที่ค้างใน buffer และไม่ได้ถูกอ่าน ถือว่าถูกทิ้ง
+            self.dropped += sum(1 for fid, _ in self.buffer if self.last_id < fid < frame_id)
+            self.last_id = frame_id
+            self.buffer.clear()
+            self.cond.notify_all()  # ปลุกเธรดอ่านที่รอที่ว่าง (block)
+        return True, frame
+
+    def read_all(self):
+        """คืนเฟรมทั้งหมดที่ค้างอยู่ใน buffer (เรียงจากเก่าไปใหม่) ใช้เมื่อ buffer_size > 1"""
+        with self.cond:
+            frames = [frame for frame_id, frame in self.buffer if frame_id > self.last_id]
+            if self.buffer:
+                self.last_id = self.buffer[-1][0]
+            self.buffer.clear()
+            self.cond.notify_all()
+        return frames
+
+    def stats(self):
+        with self.cond:
+            return {"captured": self.captured, "dropped": self.dropped}
+
+    def release(self):
+        with self.cond:
+            self.stopped = True
+            self.cond.notify_all()
+        # รอให้เธรดออกจาก cap.read() ก่อน ปล่อยกล้องระหว่างที่ยังอ่านอยู่ไม่ได้
+        if self.thread.is_alive():
+            self.thread.join()
+        self.cap.release()
@@ -0,0 +1,111 @@
+import math
+
+import cv2
+
+
+# ----------------------------- #
+# ตัวตัดสินใจว่าเฟรมไหนควรรัน YOLO
+# ----------------------------- #
+class InferenceGate:
+    """เลือกเฟรมที่จะส่งเข้า YOLO เพื่อลดการใช้ CPU เมื่อถนนว่าง
+
+    mode:
+      "off"      รันทุกเฟรม (พฤติกรรมเดิม)
+      "every_n"  รันทุก ๆ every_n เฟรม
+      "motion"   รันเมื่อภาพเปลี่ยน (frame differencing หรือ background subtraction)
+      "adaptive" ปรับระยะข้ามเฟรมตามเวลาที่ YOLO ใช้จริง ให้ใช้เวลาไม่เกิน cpu_budget ของแต่ละเฟรม
+
+    เฟรมที่ถูกข้ามให้ใช้กล่องจากการรันครั้งล่าสุดแทน
+    """
+
+    MODES = ("off", "every_n", "motion", "adaptive")
+
+    def __init__(self, mode="motion", every_n=5, motion_method="diff", motion_threshold=0.005,
+                 pixel_threshold=25, max_skip=30, target_fps=30.0, cpu_budget=0.5, work_width=160):
+        if mode not in self.MODES:
+            raise ValueError(f"unknown gate mode: {mode!r} (choose from {', '.join(self.MODES)})")
+        self.mode = mode
+        self.every_n = max(1, int(every_n))
+        self.motion_method = motion_method          # "diff" หรือ "mog2"
+        self.motion_threshold = motion_threshold    # สัดส่วนพิกเซลที่เปลี่ยน (0-1) ที่ถือว่ามีการเคลื่อนไหว
+        self.pixel_threshold = pixel_threshold      # ค่าความต่างต่อพิกเซลที่นับว่าเปลี่ยน
+        self.max_skip = max_skip                    # บังคับรันอย่างน้อยทุก ๆ max_skip เฟรม (0 = ไม่บังคับ)
+        self.target_fps = target_fps
+        self.cpu_budget = cpu_budget
+        self.work_width = work_width                # ย่อภาพก่อนตรวจการเคลื่อนไหวให้ถูกที่สุด
+
+        self.prev_gray = None
+        self.bg = None
+        if mode == "motion" and motion_method == "mog2":
+            self.bg = cv2.createBackgroundSubtractorMOG2(history=300, varThreshold=16, detectShadows=False)
+
+        self.infer_time = None  # ค่าเฉลี่ยเคลื่อนที่ของเวลา YOLO (วินาที)
+        self.since_last = 0
+        self.frames = 0
+        self.inferred = 0
+        self.motion_score = 0.0
+
+    def _small_gray(self, frame):
+        h, w = frame.shape[:2]
+        if w > self.work_width:
+            frame = cv2.resize(frame, (self.work_width, max(1, int(h * self.work_width / w))),
+                               interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+        return cv2.GaussianBlur(gray, (5, 5), 0)
+
+    def _has_motion(self, frame):
+        gray = self._small_gray(frame)
+        if self.bg is not None:
+            mask = self.bg.apply(gray)
+            changed = cv2.countNonZero(mask)
+        else:
+            if self.prev_gray is None or self.prev_gray.shape != gray.shape:
+                self.prev_gray = gray
+                return True
+            diff = cv2.absdiff(gray, self.prev_gray)
+            self.prev_gray = gray
+            _, mask = cv2.threshold(diff, self.pixel_threshold, 255, cv2.THRESH_BINARY)
+            changed = cv2.countNonZero(mask)
+        self.motion_score = changed / float(gray.size)
+        return self.motion_score >= self.motion_threshold
+
+    def adaptive_interval(self):
+        """จำนวนเฟรมต่อการรัน YOLO หนึ่งครั้ง ให้ YOLO ใช้เวลาไม่เกิน cpu_budget ของเวลาเฟรม"""
+        if not self.infer_time:
+            return 1
+        frame_time = 1.0 / self.target_fps
+        return max(1, math.ceil(self.infer_time / (frame_time * self.cpu_budget)))
+
+    def should_run(self, frame):
+        self.frames += 1
+        self.since_last += 1
+
+        if self.mode == "off":
+            run = True
+        elif self.mode == "every_n":
+            run = self.since_last >= self.every_n
+        elif self.mode == "adaptive":
+            run = self.since_last >= self.adaptive_interval()
+        else:
+            # ต้องอัปเดตภาพก่อนหน้าทุกเฟรม แม้ว่าจะถูกบังคับรันด้วย max_skip
+            run = self._has_motion(frame)
+
+        if not run and self.max_skip and self.since_last >= self.max_skip:
+            run = True
+        if self.inferred == 0:
+            run = True  # เฟรมแรกต้องรันเสมอ จะได้มีกล่องไว้ใช้ต่อ
+
+        if run:
+            self.since_last = 0
+            self.inferred += 1
+        return run
+
+    def record(self, seconds):
+        """บันทึกเวลาที่ YOLO ใช้จริง (ใช้ในโหมด adaptive)"""
+        if self.infer_time is None:
+            self.infer_time = seconds
+        else:
+            self.infer_time = 0.8 * self.infer_time + 0.2 * seconds
+
+    def skip_ratio(self):
+        return 1.0 - self.inferred / self.frames if self.frames else 0.0
@@ -0,0 +1,241 @@
+import argparse
+import threading
+import time
+
+import cv2
+
+from backends import load_model
+from frame_grabber import FrameGrabber
+
+VEHICLE_CLASSES = [2, 3, 5, 7]  # 2 = Car, 3 = Motorcycle, 5 = Bus, 7 = Truck
+PERSON_CLASSES = [0]
+
+
+def make_tracker(tracker_cfg="bytetrack.yaml", frame_rate=30):
+    """สร้าง tracker ของ ultralytics แยกต่อกล้อง (model.track ใช้ tracker ตัวเดียวกับทุกภาพใน batch)"""
+    from ultralytics.trackers.track import TRACKER_MAP
+    from ultralytics.utils import IterableSimpleNamespace, yaml_load
+    from ultralytics.utils.checks import check_yaml
+
+    cfg = IterableSimpleNamespace(**yaml_load(check_yaml(tracker_cfg)))
+    return TRACKER_MAP[cfg.tracker_type](args=cfg, frame_rate=frame_rate)
+
+
+def apply_tracker(tracker, result):
+    """ใส่ track id ให้ผลตรวจจับ เหมือนที่ model.track(..., persist=True) ทำ"""
+    import torch
+
+    det = result.boxes.cpu().numpy()
+    if len(det) == 0:
+        return result
+    tracks = tracker.update(det, result.orig_img)
+    if len(tracks) == 0:
+        return result[[]]
+    idx = tracks[:, -1].astype(int)
+    result = result[idx]
+    result.update(boxes=torch.as_tensor(tracks[:, :-1]))
+    return result
+
+
+class InferenceSource:
+    def __init__(self, name, source, callback, classes, track=False, buffer_size=1):
+        self.name = name
+        self.grabber = FrameGrabber(source, buffer_size=buffer_size)
+        self.callback = callback  # callback(name, frame, result)
+        self.classes = set(classes)
+        self.tracker = make_tracker() if track else None
+        self.frames = 0
+        self.latency = 0.0  # เวลาจากได้เฟรมจนส่งผลกลับ (วินาที) ของเฟรมล่าสุด
+
+    def filter(self, result):
+        keep = [i for i, c in enumerate(result.boxes.cls.tolist()) if int(c) in self.classes]
+        if len(keep) == len(result.boxes):
+            return result
+        return result[keep]
+
+
+# ----------------------------- #
+# บริการ YOLO กลางสำหรับหลายกล้อง
+# ----------------------------- #
+class InferenceService:
+    """โหลด YOLO ครั้งเดียว แล้วรวมเฟรมจากหลายกล้องเป็น batch ก่อนรันโมเดล
+
+    แต่ละกล้องอ่านเฟรมผ่าน FrameGrabber ของตัวเอง บริการจะรอเฟรมไม่เกิน
+    max_latency วินาที (หรือจนครบ max_batch) แล้วรัน forward pass เดียว
+    ผลลัพธ์จะถูกกรองคลาส / ใส่ track id ตามกล้อง แล้วส่งกลับทาง callback
+    """
+
+    def __init__(self, model_path="yolov8n.pt", max_batch=8, max_latency=0.03, imgsz=640, conf=0.25,
+                 backend="torch", int8=False):
+        # backend ที่ export แล้วต้องเป็น dynamic batch ถึงจะรับหลายภาพพร้อมกันได้
+        self.model = load_model(model_path, backend, imgsz, int8, dynamic=max_batch > 1 and backend != "torch")
+        self.max_batch = max_batch
+        self.max_latency = max_latency
+        self.imgsz = imgsz
+        self.conf = conf
+        self.sources = []
+        self.batches = 0
+        self.stopped = False
+        self.thread = None
+
+    def add_source(self, name, source, callback, classes=VEHICLE_CLASSES, track=False, buffer_size=1):
+        src = InferenceSource(name, source, callback, classes, track=track, buffer_size=buffer_size)
+        self.sources.append(src)
+        return src
+
+    def add_vehicle_source(self, name, source, callback):
+        return self.add_source(name, source, callback, classes=VEHICLE_CLASSES)
+
+    def add_person_source(self, name, source, callback):
+        return self.add_source(name, source, callback, classes=PERSON_CLASSES, track=True)
+
+    def _collect_batch(self):
+        """รวมเฟรมใหม่จากแต่ละกล้อง (กล้องละไม่เกิน 1 เฟรม) ภายในเวลา max_latency"""
+        batch = []
+        pending = [s for s in self.sources if not s.grabber.stopped]
+        deadline = None
+        while pending and len(batch) < self.max_batch and not self.stopped:
+            for src in list(pending):
+                ok, frame = src.grabber.read(timeout=0)
+                if ok:
+                    batch.append((src, frame, time.time()))
+                    pending.remove(src)
+                elif src.grabber.stopped:
+                    pending.remove(src)
+                if len(batch) >= self.max_batch:
+                    break
+
+            if batch and deadline is None:
+                deadline = batch[0][2] + self.max_latency
+            if deadline is not None and time.time() >= deadline:
+                break
+            time.sleep(0.001)
+        return batch
+
+    def step(self):
+        """รันหนึ่งรอบ: รวม batch → YOLO → ส่งผลกลับ คืนจำนวนเฟรมที่ประมวลผล"""
+        batch = self._collect_batch()
+        if not batch:
+            return 0
+
+        classes = sorted(set().union(*(src.classes for src, _, _ in batch)))
+        frames = [frame for _, frame, _ in batch]
+        results = self.model.predict(frames, classes=classes, imgsz=self.imgsz, conf=self.conf, verbose=False)
+        self.batches += 1
+
+        for (src, frame, t_in), result in zip(batch, results):
+            result = src.filter(result)
+            if src.tracker is not None:
+                result = apply_tracker(src.tracker, result)
+            src.frames += 1
+            src.latency = time.time() - t_in
+            src.callback(src.name, frame, result)
+        return len(batch)
+
+    def alive(self):
+        return any(not s.grabber.stopped for s in self.sources)
+
+    def run(self):
+        while not self.stopped and self.alive():
+            if self.step() == 0:
+                time.sleep(0.005)
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stopped = True
+        if self.thread is not None:
+            self.thread.join(timeout=2.0)
+        for src in self.sources:
+            src.grabber.release()
+
+
+def draw_vehicles(frame, result, names):
+    for box in result.boxes:
+        cls = int(box.cls[0])
+        conf = float(box.conf[0])
+        x1, y1, x2, y2 = [int(v) for v in box.xyxy[0]]
+        cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
+        cv2.putText(frame, f"{names[cls]} {conf:.2f}", (x1, y1 - 10),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
+    return frame
+
+
+def parse_source(value):
+    # "0" → เว็บแคม index 0, อย่างอื่น (rtsp://..., video.mp4) ส่งให้ OpenCV ตรง ๆ
+    return int(value) if value.isdigit() else value
+
+
+# ----------------------------- #
+# ใช้งาน: python inference_service.py --vehicle 0 --vehicle rtsp://... --person door.mp4
+# ----------------------------- #
+def main():
+    parser = argparse.ArgumentParser(description="Batched YOLO inference for many cameras")
+    parser.add_argument("--vehicle", action="append", default=[], help="vehicle camera (index, RTSP URL or file)")
+    parser.add_argument("--person", action="append", default=[], help="people counter camera (index, RTSP URL or file)")
+    parser.add_argument("--model", default="yolov8n.pt")
+    parser.add_argument("--batch", type=int, default=8, help="max frames per forward pass")
+    parser.add_argument("--latency", type=float, default=0.03, help="max seconds to wait while filling a batch")
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--backend", choices=["torch", "onnx", "openvino"], default="torch")
+    parser.add_argument("--int8", action="store_true")
+    parser.add_argument("--headless", action="store_true", help="do not open preview windows")
+    args = parser.parse_args()
+
+    from person import PeopleCounter
+
+    service = InferenceService(args.model, max_batch=args.batch, max_latency=args.latency, imgsz=args.imgsz,
+                               backend=args.backend, int8=args.int8)
+    latest = {}  # name -> ภาพล่าสุดที่วาดผลแล้ว (แสดงผลใน main thread)
+    lock = threading.Lock()
+
+    def on_vehicle(name, frame, result):
+        if args.headless:
+            return
+        frame = draw_vehicles(frame, result, service.model.names)
+        with lock:
+            latest[name] = frame
+
+    counters = {}
+
+    def on_person(name, frame, result):
+        frame = counters[name].update(result)
+        if not args.headless:
+            with lock:
+                latest[name] = frame
+
+    for i, src in enumerate(args.vehicle):
+        service.add_vehicle_source(f"vehicle-{i}", parse_source(src), on_vehicle)
+    for i, src in enumerate(args.person):
+        name = f"person-{i}"
+        counters[name] = PeopleCounter(model_path=None, headless=args.headless)
+        service.add_person_source(name, parse_source(src), on_person)
+
+    if not service.sources:
+        parser.error("at least one --vehicle or --person source is required")
+
+    service.start()
+    try:
+        while service.alive():
+            if args.headless:
+                time.sleep(1.0)
+                continue
+            with lock:
+                frames = list(latest.items())
+                latest.clear()
+            for name, frame in frames:
+                cv2.imshow(name, frame)
+            if cv2.waitKey(1) & 0xFF == ord("q"):
+                break
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.stop()
+        cv2.destroyAllWindows()
+
+
+if __name__ == "__main__":
+    main()
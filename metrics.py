@@ -0,0 +1,189 @@
+import json
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import cv2
+
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _StageTimer:
+    """จับเวลาหนึ่งขั้นตอน เก็บค่าล่าสุด window ค่า (rolling) และผลรวมสะสม"""
+
+    __slots__ = ("samples", "count", "total", "_t0")
+
+    def __init__(self, window):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+        self._t0 = 0.0
+
+    def __enter__(self):
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.observe(time.perf_counter() - self._t0)
+        return False
+
+    def observe(self, seconds):
+        self.samples.append(seconds)
+        self.count += 1
+        self.total += seconds
+
+    def quantiles(self, qs=(0.5, 0.95, 0.99)):
+        data = sorted(self.samples)
+        if not data:
+            return {q: 0.0 for q in qs}
+        return {q: data[min(len(data) - 1, int(q * len(data)))] for q in qs}
+
+
+# ----------------------------- #
+# ตัวเก็บสถิติของลูปตรวจจับ
+# ----------------------------- #
+class Metrics:
+    """จับเวลาแต่ละขั้น (capture / inference / tracking / annotation / display / events)
+    นับ counter และอ่าน gauge แล้วเปิดให้ดูผ่าน HTTP แบบ Prometheus text
+
+    ถ้า enabled=False ทุกเมธอดเป็น no-op (stage() คืน context เปล่าตัวเดียวกันทุกครั้ง)
+    gauge ที่ส่งเป็นฟังก์ชันจะถูกอ่านตอนมีคนขอดูเท่านั้น ไม่เพิ่มงานในลูป
+    """
+
+    def __init__(self, name="detector", enabled=True, window=1000):
+        self.name = name
+        self.enabled = enabled
+        self.window = window
+        self.stages = {}
+        self.counters = {}
+        self.gauges = {}
+        self.frame_times = deque(maxlen=120)
+        self.started = time.time()
+        self.server = None
+
+    def stage(self, name):
+        if not self.enabled:
+            return _NULL_TIMER
+        timer = self.stages.get(name)
+        if timer is None:
+            timer = self.stages[name] = _StageTimer(self.window)
+        return timer
+
+    def inc(self, name, n=1):
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def set_gauge(self, name, value):
+        """value เป็นตัวเลข หรือฟังก์ชันที่ไม่รับอาร์กิวเมนต์ (อ่านตอน scrape)"""
+        if self.enabled:
+            self.gauges[name] = value
+
+    def frame_done(self):
+        if self.enabled:
+            self.frame_times.append(time.perf_counter())
+            self.inc("frames_total")
+
+    def fps(self):
+        if len(self.frame_times) < 2:
+            return 0.0
+        span = self.frame_times[-1] - self.frame_times[0]
+        return (len(self.frame_times) - 1) / span if span > 0 else 0.0
+
+    def _gauge_values(self):
+        values = {}
+        for name, value in list(self.gauges.items()):
+            try:
+                values[name] = float(value() if callable(value) else value)
+            except Exception:
+                continue  # gauge ที่อ่านไม่ได้ (เช่น ปิดไปแล้ว) ข้ามไป
+        values["fps"] = self.fps()
+        return values
+
+    def snapshot(self):
+        return {
+            "name": self.name,
+            "uptime": time.time() - self.started,
+            "stages": {name: {"count": t.count, "sum": t.total,
+                              **{f"p{int(q * 100)}": v for q, v in t.quantiles().items()}}
+                       for name, t in list(self.stages.items())},
+            "counters": dict(self.counters),
+            "gauges": self._gauge_values(),
+        }
+
+    def prometheus_text(self):
+        prefix = self.name.replace("-", "_")
+        lines = [f"# HELP {prefix}_stage_seconds per-frame stage latency (rolling window quantiles)",
+                 f"# TYPE {prefix}_stage_seconds summary"]
+        for name, t in list(self.stages.items()):
+            for q, v in t.quantiles().items():
+                lines.append(f'{prefix}_stage_seconds{{stage="{name}",quantile="{q}"}} {v:.6f}')
+            lines.append(f'{prefix}_stage_seconds_sum{{stage="{name}"}} {t.total:.6f}')
+            lines.append(f'{prefix}_stage_seconds_count{{stage="{name}"}} {t.count}')
+        for name, value in list(self.counters.items()):
+            lines.append(f"# TYPE {prefix}_{name} counter")
+            lines.append(f"{prefix}_{name} {value}")
+        for name, value in self._gauge_values().items():
+            lines.append(f"# TYPE {prefix}_{name} gauge")
+            lines.append(f"{prefix}_{name} {value:g}")
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port=9100, host="127.0.0.1"):
+        """เปิด HTTP ในเธรดแยก: /metrics (Prometheus text) และ /metrics.json"""
+        if not self.enabled or not port:
+            return None
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.startswith("/metrics.json"):
+                    body = json.dumps(metrics.snapshot()).encode()
+                    ctype = "application/json"
+                elif self.path.startswith("/metrics"):
+                    body = metrics.prometheus_text().encode()
+                    ctype = "text/plain; version=0.0.4"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", ctype)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass  # ไม่พิมพ์ log ทุก request
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        print(f"📈 metrics: http://{host}:{port}/metrics")
+        return self.server
+
+    def draw_overlay(self, frame, origin=(20, None)):
+        """วาด FPS และเวลา p50 ของแต่ละขั้นที่มุมล่างซ้ายของภาพ"""
+        if not self.enabled:
+            return frame
+        lines = [f"FPS: {self.fps():.1f}"]
+        for name, t in list(self.stages.items()):
+            p50 = t.quantiles((0.5,))[0.5]
+            lines.append(f"{name}: {p50 * 1000:.1f} ms")
+        x = origin[0]
+        y = origin[1] if origin[1] is not None else frame.shape[0] - 20 * len(lines)
+        for line in lines:
+            cv2.putText(frame, line, (x, y), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 0), 1)
+            y += 20
+        return frame
+
+    def close(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server = None
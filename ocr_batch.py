@@ -0,0 +1,247 @@
+"""
+ocr_batch.py
+OCR ภาษาไทยทีละหลายพันไฟล์แบบ headless ด้วย Tesseract หลาย process
+
+- รับโฟลเดอร์ / glob / ไฟล์ ได้หลายรายการ
+- ใช้ process pool ขนาดเท่าจำนวน core (แต่ละ process ให้ Tesseract ใช้ 1 thread)
+- แต่ละ process โหลด Tesseract ค้างไว้ครั้งเดียว (tesserocr / libtesseract ดู ocr_engine.py)
+- เขียนผลลง JSONL ทันทีที่แต่ละไฟล์เสร็จ (และไฟล์ .txt ถ้าระบุ --text-dir)
+- รันซ้ำแล้วข้ามไฟล์ที่ทำสำเร็จไปแล้วใน JSONL เดิม (resume ได้)
+- --layout: preprocess (ปรับ DPI / แก้เอียง / ขาวดำ) แล้วแบ่งหน้าเป็นบล็อก OCR ทีละบล็อก
+  เวลาของแต่ละบล็อกถูกบันทึกใน JSONL (คีย์ timings)
+- cache ผลตาม hash ของเนื้อหาภาพ (.ocr_cache.db) ไฟล์ที่ย้าย/เปลี่ยนชื่อแต่ภาพเดิมไม่ต้อง OCR ใหม่
+
+  python ocr_batch.py scans/ "archive/**/*.png" --out results.jsonl --text-dir texts/
+  python ocr_batch.py scans/ --cache /data/ocr_cache.db --cache-size 2048
+  python ocr_batch.py scans/ --layout --dpi 200 --binarize adaptive
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from ocr_cache import OcrCache, content_hash
+from ocr_engine import ENGINES, open_engine
+from ocr_preprocess import Preprocess, ocr_page
+
+IMAGE_EXTS = (".jpg", ".jpeg", ".png", ".tif", ".tiff", ".bmp", ".webp")
+WINDOWS_TESSERACT = "C:/Program Files/Tesseract-OCR/tesseract.exe"
+
+# พารามิเตอร์ preprocessing ที่มีผลต่อข้อความ (เป็นส่วนหนึ่งของ key ใน cache)
+PREPROCESS = {"gray": True}
+
+
+def tesseract_cmd():
+    """ตำแหน่ง tesseract: ตัวแปร TESSERACT_CMD > path ติดตั้งปกติบน Windows > PATH"""
+    cmd = os.environ.get("TESSERACT_CMD")
+    if cmd:
+        return cmd
+    if os.path.isfile(WINDOWS_TESSERACT):
+        return WINDOWS_TESSERACT
+    return "tesseract"
+
+
+def expand_inputs(inputs):
+    """แปลงโฟลเดอร์ / glob / ไฟล์ เป็นรายการไฟล์ภาพ (เรียงตามชื่อ ไม่ซ้ำ)"""
+    found = []
+    for item in inputs:
+        if os.path.isdir(item):
+            for root, _, files in os.walk(item):
+                found.extend(os.path.join(root, f) for f in files if f.lower().endswith(IMAGE_EXTS))
+        elif os.path.isfile(item):
+            found.append(item)
+        else:
+            found.extend(p for p in glob.glob(item, recursive=True)
+                         if os.path.isfile(p) and p.lower().endswith(IMAGE_EXTS))
+    return sorted(set(os.path.normpath(p) for p in found))
+
+
+def load_done(out_path):
+    """ไฟล์ที่ OCR สำเร็จแล้วจากการรันครั้งก่อน (บรรทัดที่มี error จะถูกทำใหม่)"""
+    done = set()
+    if not os.path.exists(out_path):
+        return done
+    with open(out_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                row = json.loads(line)
+            except ValueError:
+                continue  # บรรทัดสุดท้ายอาจเขียนไม่ครบตอนโปรแกรมถูกปิด
+            if "error" not in row:
+                done.add(row["path"])
+    return done
+
+
+def read_bytes(path):
+    # cv2.imread อ่าน path ภาษาไทยบน Windows ไม่ได้ จึงอ่าน bytes แล้ว decode เอง
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def decode_image(data):
+    import cv2
+    import numpy as np
+
+    image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        raise ValueError("cannot decode image")
+    return image
+
+
+def read_image(path):
+    return decode_image(read_bytes(path))
+
+
+# ----------------------------- #
+# ส่วนที่รันใน process ลูก
+# ----------------------------- #
+_lang = "tha"
+_engine = None
+_cache = None
+_pre = None
+_block_workers = 1
+
+
+def _init_worker(lang, cmd, cache_path=None, cache_bytes=0, layout=None, block_workers=1, engine="auto"):
+    global _lang, _engine, _cache, _pre, _block_workers
+
+    os.environ["OMP_THREAD_LIMIT"] = "1"  # process ละ 1 thread ไม่แย่ง core กันเอง (ต้องตั้งก่อนโหลด engine)
+    _lang = lang
+    _engine = open_engine(lang, engine, size=block_workers if layout is not None else 1, cmd=cmd)
+    _cache = OcrCache(cache_path, max_bytes=cache_bytes) if cache_path else None
+    _pre = Preprocess(**layout) if layout is not None else None
+    _block_workers = block_workers
+
+
+def ocr_file(path):
+    t0 = time.time()
+    try:
+        data = read_bytes(path)
+        key = None
+        if _cache is not None:
+            # hit แล้วไม่ต้อง decode ภาพเลย
+            params = {"layout": True, **_pre.params()} if _pre is not None else PREPROCESS
+            key = OcrCache.make_key(content_hash(data), params, _lang, _engine.version)
+            text = _cache.get(key)
+            if text is not None:
+                return {"path": path, "text": text, "seconds": round(time.time() - t0, 3), "cached": True}
+
+        image = decode_image(data)
+        row = {"path": path}
+        if _pre is not None:
+            text, row["timings"] = ocr_page(image, _engine.ocr, _pre, workers=_block_workers)
+        else:
+            text = _engine.ocr(image)
+        if key is not None:
+            _cache.put(key, text)
+        row["text"] = text
+        row["seconds"] = round(time.time() - t0, 3)
+        return row
+    except Exception as e:
+        return {"path": path, "error": str(e), "seconds": round(time.time() - t0, 3)}
+
+
+def write_text(text_dir, path, text, base):
+    rel = os.path.relpath(path, base) if base else os.path.basename(path)
+    if rel.startswith(".."):
+        rel = os.path.basename(path)
+    target = os.path.join(text_dir, os.path.splitext(rel)[0] + ".txt")
+    os.makedirs(os.path.dirname(target) or ".", exist_ok=True)
+    with open(target, "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch Thai OCR with a Tesseract process pool")
+    parser.add_argument("inputs", nargs="+", help="image files, directories or glob patterns")
+    parser.add_argument("--out", default="ocr_results.jsonl", help="JSONL output (also used to resume)")
+    parser.add_argument("--text-dir", help="also write one .txt per image into this folder")
+    parser.add_argument("--lang", default="tha")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--engine", choices=ENGINES, default="auto",
+                        help="tesserocr / capi keep Tesseract loaded; cli spawns tesseract per image")
+    parser.add_argument("--cache", default=".ocr_cache.db", help="OCR result cache (SQLite, shared by workers)")
+    parser.add_argument("--cache-size", type=int, default=512, help="cache size limit in MB (LRU eviction)")
+    parser.add_argument("--no-cache", action="store_true", help="always run Tesseract")
+    parser.add_argument("--layout", action="store_true",
+                        help="preprocess (rescale, deskew, binarize) and OCR text blocks separately")
+    parser.add_argument("--dpi", type=int, help="source scan DPI (default: estimate from text height)")
+    parser.add_argument("--target-dpi", type=int, default=300)
+    parser.add_argument("--binarize", choices=["otsu", "adaptive", "none"], default="otsu")
+    parser.add_argument("--no-deskew", action="store_true")
+    parser.add_argument("--block-workers", type=int, default=1,
+                        help="parallel Tesseract calls per page (keep 1 when --workers uses all cores)")
+    args = parser.parse_args()
+
+    files = expand_inputs(args.inputs)
+    done = load_done(args.out)
+    todo = [p for p in files if p not in done]
+    print(f"พบ {len(files)} ไฟล์, ทำไปแล้ว {len(files) - len(todo)}, เหลือ {len(todo)}")
+    if not todo:
+        return
+
+    # เปิด engine หนึ่งครั้งใน process หลักก่อน ถ้าไม่มี Tesseract เลยจะได้ข้อความชัด ๆ
+    # แทน BrokenProcessPool จาก initializer ของ process ลูก
+    try:
+        open_engine(args.lang, args.engine, cmd=tesseract_cmd()).close()
+    except (ImportError, OSError, RuntimeError) as e:
+        sys.exit(f"❌ เปิด OCR engine '{args.engine}' ไม่ได้: {e}\n"
+                 "ติดตั้ง tesserocr, libtesseract หรือโปรแกรม tesseract (หรือระบุ path ด้วย TESSERACT_CMD)")
+
+    base = os.path.commonpath([os.path.abspath(p) for p in files]) if len(files) > 1 else None
+    workers = max(1, args.workers)
+    cache_path = None if args.no_cache else args.cache
+    layout = None
+    if args.layout:
+        layout = {"dpi": args.dpi, "target_dpi": args.target_dpi, "deskew": not args.no_deskew,
+                  "binarize": None if args.binarize == "none" else args.binarize}
+    ok = failed = cached = 0
+    t0 = time.time()
+    with open(args.out, "a", encoding="utf-8") as out, \
+            ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                initargs=(args.lang, tesseract_cmd(), cache_path, args.cache_size * 2**20,
+                                          layout, args.block_workers, args.engine)) as pool:
+        # ส่งงานทีละไม่เกิน workers * 4 ชิ้น แล้วเขียนผลตามลำดับที่เสร็จจริง
+        queue = iter(todo)
+        pending = set()
+        while True:
+            while len(pending) < workers * 4:
+                path = next(queue, None)
+                if path is None:
+                    break
+                pending.add(pool.submit(ocr_file, path))
+            if not pending:
+                break
+
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in finished:
+                row = fut.result()
+                out.write(json.dumps(row, ensure_ascii=False) + "\n")
+                out.flush()
+                if "error" in row:
+                    failed += 1
+                    print(f"❌ {row['path']}: {row['error']}", file=sys.stderr)
+                else:
+                    ok += 1
+                    cached += bool(row.get("cached"))
+                    if args.text_dir:
+                        write_text(args.text_dir, os.path.abspath(row["path"]), row["text"], base)
+                n = ok + failed
+                if n % 50 == 0 or n == len(todo):
+                    rate = n / (time.time() - t0)
+                    print(f"{n}/{len(todo)} ({rate:.1f} ไฟล์/วินาที)")
+
+    if cache_path:
+        # ตัดขนาด cache อีกครั้งหลังทุก worker เขียนเสร็จ
+        cache = OcrCache(cache_path, max_bytes=args.cache_size * 2**20)
+        cache.evict()
+        cache.close()
+    print(f"เสร็จ: สำเร็จ {ok} (จาก cache {cached}), ผิดพลาด {failed} → {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+
+def content_hash(data):
+    """sha256 ของ bytes ไฟล์ภาพ (ไม่ต้อง decode ภาพก่อน)"""
+    return hashlib.sha256(data).hexdigest()
+
+
+# ----------------------------- #
+# cache ผล OCR บนดิสก์
+# ----------------------------- #
+class OcrCache:
+    """cache ผล OCR ใน SQLite ใช้ร่วมกันได้หลาย process
+
+    key = hash(เนื้อหาภาพ + พารามิเตอร์ preprocessing + ภาษา + เวอร์ชัน tesseract)
+    ภาพเดิมที่ตั้งค่าเดิมจึงไม่ต้อง OCR ซ้ำ แต่ถ้าเปลี่ยนการตั้งค่าหรืออัปเกรด tesseract จะทำใหม่
+
+    ขนาดรวมไม่เกิน max_bytes: ลบรายการที่ไม่ได้ใช้นานที่สุดก่อน (LRU)
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS ocr_cache (
+            key TEXT PRIMARY KEY,
+            text TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            last_access REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_ocr_cache_access ON ocr_cache (last_access);
+    """
+
+    def __init__(self, path=".ocr_cache.db", max_bytes=512 * 2**20, evict_every=200):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.evict_every = evict_every
+        self.hits = 0
+        self.misses = 0
+        self._puts = 0
+        self._conn = None
+        self._pid = None
+
+    @property
+    def conn(self):
+        # connection ของ sqlite ใช้ข้าม fork ไม่ได้ จึงเปิดใหม่ในแต่ละ process
+        if self._conn is None or self._pid != os.getpid():
+            folder = os.path.dirname(self.path)
+            if folder:
+                os.makedirs(folder, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, timeout=30.0, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(self.SCHEMA)
+            self._pid = os.getpid()
+        return self._conn
+
+    @staticmethod
+    def make_key(image_hash, params, lang, version):
+        blob = json.dumps({"image": image_hash, "params": params, "lang": lang, "tesseract": version},
+                          sort_keys=True)
+        return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        row = self.conn.execute("SELECT text FROM ocr_cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.conn.execute("UPDATE ocr_cache SET last_access = ? WHERE key = ?", (time.time(), key))
+        return row[0]
+
+    def put(self, key, text):
+        size = len(text.encode("utf-8")) + len(key)
+        self.conn.execute("INSERT OR REPLACE INTO ocr_cache (key, text, size, last_access) VALUES (?, ?, ?, ?)",
+                          (key, text, size, time.time()))
+        self._puts += 1
+        if self._puts % self.evict_every == 0:
+            self.evict()
+
+    def total_bytes(self):
+        return self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM ocr_cache").fetchone()[0]
+
+    def evict(self):
+        """ลบรายการเก่าจนขนาดรวมเหลือไม่เกิน 90% ของ max_bytes คืนจำนวนที่ลบ"""
+        if self.total_bytes() <= self.max_bytes:
+            return 0
+        target = int(self.max_bytes * 0.9)
+        cur = self.conn.execute("""
+            DELETE FROM ocr_cache WHERE key IN (
+                SELECT key FROM (
+                    SELECT key, SUM(size) OVER (ORDER BY last_access DESC, key) AS running FROM ocr_cache
+                ) WHERE running > ?
+            )""", (target,))
+        return cur.rowcount
+
+    def close(self):
+        if self._conn is not None and self._pid == os.getpid():
+            self._conn.close()
+        self._conn = None
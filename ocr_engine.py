@@ -0,0 +1,282 @@
+"""
+ocr_engine.py
+Tesseract แบบโหลดค้างไว้ (ไม่ต้องเปิด process และโหลด tha.traineddata ใหม่ทุกภาพ)
+
+  from ocr_engine import open_engine
+  with open_engine("tha") as engine:
+      text = engine.ocr(gray_image)
+
+เทียบความเร็วแต่ละ engine กับภาพเล็ก ๆ:
+  python ocr_engine.py crop.png --engines cli capi tesserocr --repeat 50
+"""
+
+import abc
+import ctypes
+import ctypes.util
+import glob
+import os
+import queue
+import subprocess
+import threading
+from contextlib import contextmanager
+
+import cv2
+import numpy as np
+
+ENGINES = ("auto", "tesserocr", "capi", "cli")
+
+
+def _as_gray(image):
+    if image.ndim == 3:
+        image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    return np.ascontiguousarray(image, dtype=np.uint8)
+
+
+# ----------------------------- #
+# ตัวกลางของ OCR engine
+# ----------------------------- #
+class OcrEngine(abc.ABC):
+    """ถือ Tesseract ที่โหลด traineddata ไว้แล้ว size ตัว ใช้ซ้ำได้ทุกภาพ
+
+    แต่ละตัวใช้ได้ทีละ thread จึงยืมผ่านคิว: ocr() จาก size thread พร้อมกันได้โดยไม่ต้องล็อกอะไรเพิ่ม
+    """
+
+    name = "base"
+
+    def __init__(self, lang="tha", psm=3, size=1):
+        self.lang = lang
+        self.psm = psm
+        self.size = max(1, size)
+        self.version = "unknown"
+        self._pool = queue.Queue()
+
+    @abc.abstractmethod
+    def _create(self):
+        """สร้าง Tesseract หนึ่งตัว (ขึ้น RuntimeError ถ้าโหลด traineddata ไม่ได้)"""
+
+    def _destroy(self, api):
+        pass
+
+    @abc.abstractmethod
+    def _recognize(self, api, gray):
+        """OCR ภาพเทาหนึ่งภาพด้วย api ที่ยืมมา คืนข้อความ"""
+
+    def _fill(self):
+        try:
+            for _ in range(self.size):
+                self._pool.put(self._create())
+        except Exception:
+            self.close()  # คืนตัวที่สร้างไปแล้ว ก่อนให้ผู้เรียกลอง engine ถัดไป
+            raise
+
+    @contextmanager
+    def _checkout(self):
+        api = self._pool.get()
+        try:
+            yield api
+        finally:
+            self._pool.put(api)
+
+    def ocr(self, image):
+        """image: numpy BGR หรือเทา คืนข้อความ (ส่งภาพผ่านหน่วยความจำ ไม่เขียนไฟล์ชั่วคราว)"""
+        gray = _as_gray(image)
+        with self._checkout() as api:
+            return self._recognize(api, gray)
+
+    def close(self):
+        while True:
+            try:
+                self._destroy(self._pool.get_nowait())
+            except queue.Empty:
+                break
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+class TesserocrEngine(OcrEngine):
+    """ผ่าน tesserocr (pip install tesserocr) ปล่อย GIL ระหว่าง OCR"""
+
+    name = "tesserocr"
+
+    def __init__(self, lang="tha", psm=3, size=1, tessdata=None):
+        import tesserocr
+
+        super().__init__(lang, psm, size)
+        self._tesserocr = tesserocr
+        self.tessdata = tessdata
+        self.version = tesserocr.tesseract_version().split()[1]
+        self._fill()
+
+    def _create(self):
+        kwargs = {"lang": self.lang, "psm": self.psm}
+        if self.tessdata:
+            kwargs["path"] = self.tessdata
+        return self._tesserocr.PyTessBaseAPI(**kwargs)
+
+    def _destroy(self, api):
+        api.End()
+
+    def _recognize(self, api, gray):
+        h, w = gray.shape
+        api.SetImageBytes(gray.tobytes(), w, h, 1, w)
+        api.SetSourceResolution(300)
+        return api.GetUTF8Text()
+
+
+class CApiEngine(OcrEngine):
+    """เรียก libtesseract ตรง ๆ ด้วย ctypes (ไม่ต้องติดตั้งแพ็กเกจเพิ่ม แค่มีไลบรารีของ Tesseract)"""
+
+    name = "capi"
+
+    def __init__(self, lang="tha", psm=3, size=1, tessdata=None, library=None):
+        super().__init__(lang, psm, size)
+        self.tessdata = tessdata
+        path = library or find_libtesseract()
+        if not path:
+            raise OSError("libtesseract not found")
+        if os.name == "nt" and os.path.dirname(path):
+            os.add_dll_directory(os.path.dirname(path))  # leptonica และ dll อื่นอยู่โฟลเดอร์เดียวกัน
+        lib = ctypes.CDLL(path)
+        lib.TessVersion.restype = ctypes.c_char_p
+        lib.TessBaseAPICreate.restype = ctypes.c_void_p
+        lib.TessBaseAPIInit3.argtypes = [ctypes.c_void_p, ctypes.c_char_p, ctypes.c_char_p]
+        lib.TessBaseAPISetPageSegMode.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        lib.TessBaseAPISetImage.argtypes = [ctypes.c_void_p, ctypes.c_void_p, ctypes.c_int, ctypes.c_int,
+                                            ctypes.c_int, ctypes.c_int]
+        lib.TessBaseAPISetSourceResolution.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        lib.TessBaseAPIGetUTF8Text.argtypes = [ctypes.c_void_p]
+        lib.TessBaseAPIGetUTF8Text.restype = ctypes.c_void_p  # ต้องคืนให้ TessDeleteText เอง
+        lib.TessDeleteText.argtypes = [ctypes.c_void_p]
+        lib.TessBaseAPIEnd.argtypes = [ctypes.c_void_p]
+        lib.TessBaseAPIDelete.argtypes = [ctypes.c_void_p]
+        self._lib = lib
+        self.version = lib.TessVersion().decode()
+        self._fill()
+
+    def _create(self):
+        handle = self._lib.TessBaseAPICreate()
+        datapath = self.tessdata.encode() if self.tessdata else None
+        if self._lib.TessBaseAPIInit3(handle, datapath, self.lang.encode()) != 0:
+            self._lib.TessBaseAPIDelete(handle)
+            raise RuntimeError(f"cannot load traineddata for '{self.lang}'")
+        self._lib.TessBaseAPISetPageSegMode(handle, self.psm)
+        return handle
+
+    def _destroy(self, handle):
+        self._lib.TessBaseAPIEnd(handle)
+        self._lib.TessBaseAPIDelete(handle)
+
+    def _recognize(self, handle, gray):
+        h, w = gray.shape
+        # ctypes ปล่อย GIL ระหว่างเรียก C จึง OCR หลาย thread พร้อมกันได้จริง
+        self._lib.TessBaseAPISetImage(handle, gray.ctypes.data, w, h, 1, gray.strides[0])
+        self._lib.TessBaseAPISetSourceResolution(handle, 300)
+        ptr = self._lib.TessBaseAPIGetUTF8Text(handle)
+        if not ptr:
+            return ""
+        try:
+            return ctypes.string_at(ptr).decode("utf-8", errors="replace")
+        finally:
+            self._lib.TessDeleteText(ptr)
+
+
+class CliEngine(OcrEngine):
+    """สำรองเมื่อไม่มีไลบรารี: ยังเปิด process ใหม่ทุกภาพ แต่ส่งภาพทาง stdin ไม่เขียนไฟล์ชั่วคราว"""
+
+    name = "cli"
+
+    def __init__(self, lang="tha", psm=3, size=1, cmd="tesseract"):
+        super().__init__(lang, psm, size)
+        self.cmd = cmd
+        out = subprocess.run([cmd, "--version"], capture_output=True, text=True)
+        first = (out.stdout or out.stderr).split("\n", 1)[0].split()
+        self.version = first[-1] if first else "unknown"
+        self._fill()
+
+    def _create(self):
+        return threading.Lock()  # ไม่มีสถานะ แค่จำกัดจำนวน process พร้อมกันไม่เกิน size
+
+    def _recognize(self, _, gray):
+        ok, buf = cv2.imencode(".png", gray, [cv2.IMWRITE_PNG_COMPRESSION, 1])
+        if not ok:
+            raise ValueError("cannot encode image")
+        out = subprocess.run([self.cmd, "stdin", "stdout", "-l", self.lang, "--psm", str(self.psm), "--dpi", "300"],
+                             input=buf.tobytes(), capture_output=True)
+        if out.returncode != 0:
+            raise RuntimeError(out.stderr.decode("utf-8", errors="replace").strip())
+        return out.stdout.decode("utf-8", errors="replace")
+
+
+def find_libtesseract(cmd=None):
+    """หา libtesseract: ตัวแปร TESSERACT_LIB > โฟลเดอร์เดียวกับ tesseract.exe > path ของระบบ"""
+    path = os.environ.get("TESSERACT_LIB")
+    if path:
+        return path
+    if cmd and os.path.dirname(cmd):
+        found = sorted(glob.glob(os.path.join(os.path.dirname(cmd), "libtesseract*.dll")))
+        if found:
+            return found[-1]
+    return ctypes.util.find_library("tesseract") or ctypes.util.find_library("libtesseract-5")
+
+
+def open_engine(lang="tha", engine="auto", psm=3, size=1, cmd="tesseract", tessdata=None):
+    """เลือก engine: tesserocr > libtesseract (ctypes) > เรียก tesseract ทีละ process
+
+    โหมด auto ข้ามไป engine ถัดไปทั้งเมื่อไม่มีไลบรารี และเมื่อไลบรารีโหลด traineddata ไม่ได้ (RuntimeError)
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"engine must be one of {ENGINES}")
+    if engine in ("auto", "tesserocr"):
+        try:
+            return TesserocrEngine(lang, psm, size, tessdata=tessdata)
+        except (ImportError, RuntimeError):
+            if engine == "tesserocr":
+                raise
+    if engine in ("auto", "capi"):
+        try:
+            return CApiEngine(lang, psm, size, tessdata=tessdata, library=find_libtesseract(cmd))
+        except (OSError, RuntimeError):
+            if engine == "capi":
+                raise
+    return CliEngine(lang, psm, size, cmd=cmd)
+
+
+def main():
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Compare per-image latency of the OCR engines")
+    parser.add_argument("image")
+    parser.add_argument("--engines", nargs="+", default=["cli", "capi", "tesserocr"], choices=ENGINES[1:])
+    parser.add_argument("--lang", default="tha")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--cmd", default=os.environ.get("TESSERACT_CMD", "tesseract"))
+    args = parser.parse_args()
+
+    image = cv2.imdecode(np.fromfile(args.image, dtype=np.uint8), cv2.IMREAD_GRAYSCALE)
+    if image is None:
+        raise SystemExit(f"cannot read {args.image}")
+    for name in args.engines:
+        try:
+            t0 = time.perf_counter()
+            engine = open_engine(args.lang, name, cmd=args.cmd)
+            load = time.perf_counter() - t0
+        except Exception as e:
+            print(f"{name:10s} unavailable: {e}")
+            continue
+        with engine:
+            engine.ocr(image)  # warmup
+            t0 = time.perf_counter()
+            for _ in range(args.repeat):
+                engine.ocr(image)
+            per_image = (time.perf_counter() - t0) / args.repeat
+        print(f"{name:10s} tesseract {engine.version}: load {load * 1000:.0f} ms, {per_image * 1000:.1f} ms/image")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+
+# ----------------------------- #
+# เตรียมภาพก่อน OCR
+# ----------------------------- #
+class Preprocess:
+    """ปรับภาพให้เหมาะกับ Tesseract: ย่อ/ขยายให้ได้ DPI เป้าหมาย, แก้ภาพเอียง, ทำเป็นขาวดำ
+
+    dpi: DPI ของภาพต้นฉบับ ถ้าไม่รู้ให้เป็น None แล้วประมาณจากความสูงตัวอักษร
+    text_height: ความสูงตัวอักษร (พิกเซล) ที่ต้องการเมื่อไม่รู้ DPI
+    binarize: "otsu" | "adaptive" (แสงไม่สม่ำเสมอ) | None
+    """
+
+    def __init__(self, target_dpi=300, dpi=None, text_height=30, binarize="otsu", deskew=True,
+                 max_angle=10.0, denoise=True):
+        self.target_dpi = target_dpi
+        self.dpi = dpi
+        self.text_height = text_height
+        self.binarize = binarize
+        self.deskew = deskew
+        self.max_angle = max_angle
+        self.denoise = denoise
+
+    def params(self):
+        """ค่าที่มีผลต่อข้อความที่ได้ (ใช้เป็นส่วนหนึ่งของ key ใน OcrCache)"""
+        return {"target_dpi": self.target_dpi, "dpi": self.dpi, "text_height": self.text_height,
+                "binarize": self.binarize, "deskew": self.deskew, "max_angle": self.max_angle,
+                "denoise": self.denoise}
+
+    def scale_for(self, ink):
+        if self.dpi:
+            return self.target_dpi / float(self.dpi)
+        height = median_text_height(ink)
+        if not height:
+            return 1.0
+        scale = self.text_height / height
+        if 0.85 <= scale <= 1.2:
+            return 1.0  # ใกล้พอแล้ว ไม่ต้อง resize
+        return float(np.clip(scale, 0.5, 3.0))
+
+    def apply(self, image):
+        """คืนภาพเทา/ขาวดำ (ตัวอักษรดำบนพื้นขาว) ที่พร้อมส่งเข้า Tesseract"""
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+        ink = ink_mask(gray)
+
+        scale = self.scale_for(ink)
+        if scale != 1.0:
+            interp = cv2.INTER_AREA if scale < 1.0 else cv2.INTER_CUBIC
+            gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=interp)
+            ink = ink_mask(gray)
+
+        if self.deskew:
+            angle = skew_angle(ink, self.max_angle)
+            if abs(angle) >= 0.1:
+                gray = rotate(gray, angle)
+
+        if self.denoise:
+            gray = cv2.medianBlur(gray, 3)
+        if self.binarize == "otsu":
+            _, gray = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        elif self.binarize == "adaptive":
+            gray = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+                                         cv2.THRESH_BINARY, 31, 15)
+        return gray
+
+
+def ink_mask(gray):
+    """พิกเซลตัวอักษรเป็น 255 พื้นหลังเป็น 0"""
+    _, mask = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    return mask
+
+
+def median_text_height(ink):
+    n, _, stats, _ = cv2.connectedComponentsWithStats(ink, connectivity=8)
+    heights = stats[1:, cv2.CC_STAT_HEIGHT]
+    areas = stats[1:, cv2.CC_STAT_AREA]
+    # ตัดจุด/สระลอย (เล็กมาก) และเส้นตาราง/รูป (ใหญ่มาก) ทิ้ง
+    keep = heights[(areas > 8) & (heights > 4) & (heights < ink.shape[0] // 4)]
+    if n < 2 or len(keep) < 10:
+        return None
+    return float(np.median(keep))
+
+
+def skew_angle(ink, max_angle=10.0, step=0.25, work_width=600):
+    """หามุมเอียง (องศา) ที่ทำให้ผลรวมแต่ละแถวต่างกันมากที่สุด (บรรทัดตรงแนวนอน)
+    ค้นหยาบทีละ 1 องศาก่อน แล้วค้นละเอียดทีละ step รอบมุมที่ดีที่สุด"""
+    h, w = ink.shape[:2]
+    if w > work_width:
+        ink = cv2.resize(ink, (work_width, max(1, int(h * work_width / w))), interpolation=cv2.INTER_AREA)
+
+    def score(angle):
+        return float(np.var(rotate(ink, angle, border=0).sum(axis=1, dtype=np.float64)))
+
+    coarse = max(np.arange(-max_angle, max_angle + 0.5, 1.0), key=score)
+    fine = np.arange(coarse - 1.0, coarse + 1.0 + step / 2, step)
+    return float(max(fine, key=score))
+
+
+def rotate(image, angle, border=255):
+    h, w = image.shape[:2]
+    matrix = cv2.getRotationMatrix2D((w / 2.0, h / 2.0), angle, 1.0)
+    return cv2.warpAffine(image, matrix, (w, h), flags=cv2.INTER_LINEAR,
+                          borderMode=cv2.BORDER_CONSTANT, borderValue=border)
+
+
+# ----------------------------- #
+# แบ่งหน้าเป็นบล็อกข้อความ
+# ----------------------------- #
+def detect_blocks(page, min_area=400, pad=6):
+    """หาบล็อกข้อความ (ย่อหน้า / คอลัมน์) จากภาพที่ผ่าน Preprocess แล้ว คืน [(x, y, w, h), ...]
+    เรียงตามลำดับการอ่าน"""
+    ink = ink_mask(page)
+    height = median_text_height(ink) or 20
+    # ขยายแนวนอนให้ตัวอักษรติดเป็นบรรทัด และแนวตั้งให้บรรทัดติดเป็นย่อหน้า
+    kx = max(3, int(height * 1.5))
+    ky = max(3, int(height * 1.8))
+    merged = cv2.dilate(ink, cv2.getStructuringElement(cv2.MORPH_RECT, (kx, ky)))
+    contours, _ = cv2.findContours(merged, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+    h, w = page.shape[:2]
+    rects = []
+    for c in contours:
+        x, y, bw, bh = cv2.boundingRect(c)
+        if bw * bh < min_area:
+            continue
+        x1, y1 = max(0, x - pad), max(0, y - pad)
+        x2, y2 = min(w, x + bw + pad), min(h, y + bh + pad)
+        rects.append((x1, y1, x2 - x1, y2 - y1))
+    return reading_order(rects)
+
+
+def reading_order(rects):
+    """เรียงบล็อกตามลำดับการอ่าน: คอลัมน์ซ้ายไปขวา ในแต่ละคอลัมน์บนลงล่าง
+    บล็อกที่กว้างคร่อมหลายคอลัมน์ (เช่น หัวเรื่อง) จะแบ่งหน้าเป็นช่วงบน/ล่างก่อน"""
+    if len(rects) <= 1:
+        return list(rects)
+    columns = _split(rects, 0)
+    if len(columns) > 1:
+        return [r for c in columns for r in reading_order(c)]
+    rows = _split(rects, 1)
+    if len(rows) == 1:
+        return sorted(rects, key=lambda r: (r[1], r[0]))
+    # รวมแถวที่ต่อกันเป็นช่วงเดียวถ้ายังแบ่งคอลัมน์ได้ (ย่อหน้าของสองคอลัมน์ที่บังเอิญเริ่มระดับเดียวกัน)
+    sections = [rows[0]]
+    for row in rows[1:]:
+        merged = sections[-1] + row
+        if len(_split(sections[-1], 0)) > 1 and len(_split(merged, 0)) > 1:
+            sections[-1] = merged
+        else:
+            sections.append(row)
+    return [r for s in sections for r in reading_order(s)]
+
+
+def _split(rects, axis):
+    """แบ่งกลุ่มตามช่องว่างบนแกน axis (0 = x, 1 = y) ที่ไม่มีบล็อกใดคร่อม"""
+    groups, current, end = [], [], None
+    for r in sorted(rects, key=lambda r: r[axis]):
+        if current and r[axis] >= end:
+            groups.append(current)
+            current, end = [], None
+        current.append(r)
+        stop = r[axis] + r[axis + 2]
+        end = stop if end is None else max(end, stop)
+    groups.append(current)
+    return groups
+
+
+# ----------------------------- #
+# OCR ทั้งหน้าแบบแบ่งบล็อก
+# ----------------------------- #
+def ocr_page(image, ocr, pre=None, workers=4, layout=True):
+    """OCR หนึ่งหน้า: preprocess -> แบ่งบล็อก -> OCR แต่ละบล็อกพร้อมกัน -> ต่อข้อความตามลำดับการอ่าน
+
+    ocr: ฟังก์ชันรับภาพ (numpy) คืนข้อความ เช่น lambda img: pytesseract.image_to_string(img, lang="tha")
+    คืน (ข้อความ, timings) โดย timings = {"preprocess", "layout", "blocks": [{"box", "seconds"}, ...]}
+    """
+    pre = pre or Preprocess()
+    t0 = time.perf_counter()
+    page = pre.apply(image)
+    t1 = time.perf_counter()
+    h, w = page.shape[:2]
+    blocks = detect_blocks(page) if layout else []
+    if not blocks:
+        blocks = [(0, 0, w, h)]
+    t2 = time.perf_counter()
+
+    def run(box):
+        x, y, bw, bh = box
+        start = time.perf_counter()
+        text = ocr(page[y:y + bh, x:x + bw])
+        return text.strip(), time.perf_counter() - start
+
+    if workers > 1 and len(blocks) > 1:
+        # pytesseract รอ process ภายนอก จึงใช้ thread ได้โดยไม่ติด GIL
+        with ThreadPoolExecutor(max_workers=min(workers, len(blocks))) as pool:
+            results = list(pool.map(run, blocks))
+    else:
+        results = [run(b) for b in blocks]
+
+    timings = {
+        "preprocess": round(t1 - t0, 4),
+        "layout": round(t2 - t1, 4),
+        "blocks": [{"box": list(box), "seconds": round(sec, 4)} for box, (_, sec) in zip(blocks, results)],
+    }
+    text = "\n\n".join(t for t, _ in results if t)
+    return text, timings
@@ -0,0 +1,301 @@
+"""
+offline.py
+ประมวลผลไฟล์วิดีโอที่บันทึกไว้ (ไม่ต้องเปิดหน้าจอ) เพื่อทำรายงานนับคน/นับรถ
+
+- รับไฟล์หรือโฟลเดอร์ได้หลายรายการ
+- ตัดวิดีโอยาวเป็นช่วง ๆ แล้วประมวลผลพร้อมกันใน process pool
+- แต่ละช่วงเริ่มอ่านก่อนจุดเริ่มจริง overlap วินาที แล้วต่อ track ข้ามช่วงด้วย IoU
+  ของกล่องในช่วงที่ซ้อนกัน ทำให้จำนวนที่นับได้ตรงกับการรันทีละไฟล์รวดเดียว
+- เขียน event log ต่อไฟล์ (JSONL หรือ SQLite) ด้วย schema เดียวกับ event_sink
+
+ตัวอย่าง:
+  python offline.py recordings/ --mode vehicle --workers 8 --out reports/
+  python offline.py door_cam.mp4 --mode person --segment 600
+"""
+
+import argparse
+import os
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import cv2
+
+VIDEO_EXTS = (".mp4", ".avi", ".mkv", ".mov", ".m4v", ".ts", ".webm")
+MODE_CLASSES = {"vehicle": [2, 3, 5, 7], "person": [0]}
+
+
+def list_videos(paths):
+    """คืน [(path, name), ...] name คือ path เทียบกับโฟลเดอร์ที่ส่งมา (ไฟล์เดี่ยวใช้ชื่อไฟล์)
+    ไฟล์เดียวกันที่ถูกระบุซ้ำ (เช่น dir/ กับ dir/a.mp4) นับครั้งเดียว"""
+    videos, seen = [], set()
+
+    def add(path, name):
+        real = os.path.realpath(path)
+        if real not in seen:
+            seen.add(real)
+            videos.append((path, name))
+
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for f in sorted(files):
+                    if f.lower().endswith(VIDEO_EXTS):
+                        full = os.path.join(root, f)
+                        add(full, os.path.relpath(full, path))
+        elif os.path.isfile(path):
+            add(path, os.path.basename(path))
+        else:
+            print(f"⚠️ ไม่พบไฟล์: {path}")
+    return videos
+
+
+def report_name(name, fmt, used):
+    """ชื่อไฟล์รายงานที่ไม่ชนกัน: a/clip.mp4 -> a__clip.mp4.events.jsonl (ชื่อซ้ำเติม -2, -3, ...)"""
+    base = name.replace(os.sep, "__").replace("/", "__")
+    out, n = f"{base}.events.{fmt}", 1
+    while out in used:
+        n += 1
+        out = f"{base}-{n}.events.{fmt}"
+    used.add(out)
+    return out
+
+
+def video_info(path):
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        return None
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+    return fps, frames
+
+
+def plan_segments(frames, fps, segment_seconds):
+    """แบ่งช่วงเฟรม [start, end) คืน [(start, end), ...]"""
+    if frames <= 0:
+        return [(0, sys.maxsize)]  # ไม่รู้ความยาววิดีโอ ประมวลผลรวดเดียว
+    seg_len = max(1, int(segment_seconds * fps))
+    return [(start, min(start + seg_len, frames)) for start in range(0, frames, seg_len)]
+
+
+# ----------------------------- #
+# ส่วนที่รันใน process ลูก
+# ----------------------------- #
+_model = None
+
+
+def _init_worker(model_path, threads, backend, imgsz, int8):
+    """model_path: ผลของ export_cached() จาก process หลัก (ลูกไม่ export เอง)"""
+    global _model
+    import torch
+    from backends import load_model
+
+    torch.set_num_threads(threads)  # กัน process หลายตัวแย่ง core กันเอง
+    _model = load_model(model_path, backend, imgsz, int8, threads=threads)
+
+
+def process_segment(path, start, end, overlap, classes, fps, imgsz):
+    """รัน YOLO + tracker ใหม่บนเฟรม [start - overlap, end) คืนข้อมูล track ของช่วงนี้
+
+    เก็บกล่องเฉพาะช่วงหัว (warmup) และช่วงท้าย overlap เฟรมที่ซ้อนกับช่วงถัดไป
+    เพื่อใช้ต่อ track ใน process หลัก
+    """
+    from inference_service import apply_tracker, make_tracker
+
+    warmup_start = max(0, start - overlap)
+    tail_start = end - overlap
+    tracker = make_tracker(frame_rate=max(1, round(fps)))
+    cap = cv2.VideoCapture(path)
+    cap.set(cv2.CAP_PROP_POS_FRAMES, warmup_start)
+
+    tracks = {}
+    frame_no = warmup_start
+    t0 = time.time()
+    while frame_no < end:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        result = _model.predict(frame, classes=classes, imgsz=imgsz, verbose=False)[0]
+        result = apply_tracker(tracker, result)
+        boxes = result.boxes
+        if boxes.id is not None:
+            for tid, box, cls in zip(boxes.id.int().tolist(), boxes.xyxy.tolist(), boxes.cls.int().tolist()):
+                t = tracks.get(tid)
+                if t is None:
+                    t = tracks[tid] = {"first": frame_no, "last": frame_no, "cls": Counter(), "head": {}, "tail": {}}
+                t["last"] = frame_no
+                t["cls"][cls] += 1
+                if frame_no < start:
+                    t["head"][frame_no] = box
+                if frame_no >= tail_start:
+                    t["tail"][frame_no] = box
+        frame_no += 1
+    cap.release()
+
+    return {"path": path, "start": start, "end": end, "warmup_start": warmup_start,
+            "frames": frame_no - warmup_start, "seconds": time.time() - t0, "tracks": tracks}
+
+
+# ----------------------------- #
+# ต่อ track ข้ามช่วง
+# ----------------------------- #
+def iou(a, b):
+    x1, y1 = max(a[0], b[0]), max(a[1], b[1])
+    x2, y2 = min(a[2], b[2]), min(a[3], b[3])
+    inter = max(0.0, x2 - x1) * max(0.0, y2 - y1)
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+def _match_score(head, tail):
+    common = head.keys() & tail.keys()
+    if not common:
+        return 0.0
+    # เฉลี่ยเทียบกับจำนวนเฟรมของ head เพื่อไม่ให้เฟรมที่บังเอิญซ้อนกันเฟรมเดียวชนะ
+    return sum(iou(head[f], tail[f]) for f in common) / len(head)
+
+
+def stitch(segments, min_iou=0.5):
+    """รวม track ของทุกช่วง (เรียงตาม start) เป็น track ระดับไฟล์ คืน list ของ dict"""
+    merged = []
+    prev_map, prev_tracks = {}, {}
+    for seg in sorted(segments, key=lambda s: s["start"]):
+        cur_map = {}
+        pairs = []
+        for lid, t in seg["tracks"].items():
+            if not t["head"]:
+                continue
+            for plid, pt in prev_tracks.items():
+                score = _match_score(t["head"], pt["tail"])
+                if score >= min_iou:
+                    pairs.append((score, lid, plid))
+
+        # จับคู่แบบหนึ่งต่อหนึ่ง คะแนนสูงสุดก่อน
+        used_prev = set()
+        for score, lid, plid in sorted(pairs, reverse=True):
+            if lid in cur_map or plid in used_prev or plid not in prev_map:
+                continue  # plid ไม่อยู่ใน prev_map: track ที่เห็นแค่ในช่วง warmup ของช่วงก่อน ไม่ได้นับ
+            cur_map[lid] = prev_map[plid]
+            used_prev.add(plid)
+
+        for lid, t in seg["tracks"].items():
+            if lid in cur_map:
+                g = merged[cur_map[lid]]
+                g["last"] = max(g["last"], t["last"])
+                g["cls"].update(t["cls"])
+            elif t["last"] >= seg["start"]:
+                cur_map[lid] = len(merged)
+                merged.append({"first": max(t["first"], seg["start"]), "last": t["last"], "cls": Counter(t["cls"])})
+            # track ที่อยู่แต่ในช่วง warmup และจับคู่ไม่ได้ เป็นของช่วงก่อนหน้า ไม่นับซ้ำ
+
+        prev_map, prev_tracks = cur_map, seg["tracks"]
+
+    for gid, g in enumerate(merged):
+        g["id"] = gid + 1
+        g["cls"] = g["cls"].most_common(1)[0][0]
+    return merged
+
+
+def write_events(tracks, fps, mode, out_path, source):
+    from event_sink import open_sink, person_event, vehicle_event
+    from track_store import TrackRecord
+
+    if os.path.exists(out_path):
+        os.remove(out_path)
+    sink = open_sink(out_path, batch_size=1000, maxsize=0)  # ไม่ทิ้งเหตุการณ์ในโหมด offline
+    for t in tracks:
+        first, last = t["first"] / fps, t["last"] / fps
+        if mode == "person":
+            rec = TrackRecord(t["id"], first, last)
+            rec.exit = last
+            rec.stay = last - first
+            sink.emit(person_event(rec, source=source))
+        else:
+            sink.emit(vehicle_event({"type": "entered", "id": t["id"], "cls": t["cls"], "time": first}, source=source))
+            sink.emit(vehicle_event({"type": "left", "id": t["id"], "cls": t["cls"], "time": last,
+                                     "duration": last - first}, source=source))
+    sink.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless people/vehicle counting over recorded video")
+    parser.add_argument("paths", nargs="+", help="video files or directories")
+    parser.add_argument("--mode", choices=sorted(MODE_CLASSES), default="vehicle")
+    parser.add_argument("--model", default="yolov8n.pt")
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--backend", choices=["torch", "onnx", "openvino"], default="torch")
+    parser.add_argument("--int8", action="store_true")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--segment", type=float, default=300.0, help="segment length in seconds")
+    parser.add_argument("--overlap", type=float, default=2.0, help="warm-up overlap between segments in seconds")
+    parser.add_argument("--out", default="reports", help="folder for per-file event logs")
+    parser.add_argument("--format", choices=["jsonl", "db"], default="jsonl")
+    args = parser.parse_args()
+    if args.segment <= 2 * args.overlap:
+        # ช่วงต้องยาวกว่า warmup หัว + ช่วงท้ายที่ซ้อนกับช่วงถัดไป ไม่อย่างนั้นต่อ track ข้ามช่วงไม่ได้
+        parser.error(f"--segment ({args.segment:g}s) must be longer than twice --overlap ({args.overlap:g}s)")
+
+    videos = list_videos(args.paths)
+    if not videos:
+        parser.error("no video files found")
+    os.makedirs(args.out, exist_ok=True)
+
+    jobs = {}  # path -> (fps, จำนวนช่วงทั้งหมด, ไฟล์รายงาน)
+    tasks = []
+    used_names = set()
+    for path, name in videos:
+        info = video_info(path)
+        if info is None:
+            print(f"❌ เปิดไฟล์ไม่ได้: {path}")
+            continue
+        fps, frames = info
+        segments = plan_segments(frames, fps, args.segment)
+        jobs[path] = (fps, len(segments), os.path.join(args.out, report_name(name, args.format, used_names)))
+        tasks.extend((path, start, end, int(args.overlap * fps), fps) for start, end in segments)
+
+    workers = max(1, min(args.workers, len(tasks)))
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    # export ครั้งเดียวใน process หลัก แล้วให้ทุก worker โหลดไฟล์เดียวกันจาก cache
+    from backends import export_cached
+    model_path = export_cached(args.model, args.backend, args.imgsz, args.int8)
+    done = {path: [] for path in jobs}
+    failed = 0
+    t0 = time.time()
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(model_path, threads, args.backend, args.imgsz, args.int8)) as pool:
+        futures = {pool.submit(process_segment, path, start, end, overlap, MODE_CLASSES[args.mode], fps, args.imgsz):
+                   path for path, start, end, overlap, fps in tasks}
+        for fut in as_completed(futures):
+            path = futures[fut]
+            if path not in done:
+                continue  # ไฟล์นี้ล้มเหลวไปแล้วจากช่วงอื่น
+            try:
+                seg = fut.result()
+                done[path].append(seg)
+                fps, total, out_path = jobs[path]
+                if len(done[path]) < total:
+                    continue
+                tracks = stitch(done[path])
+                write_events(tracks, fps, args.mode, out_path, source=os.path.basename(path))
+            except Exception as e:
+                # ไฟล์เสีย / อ่านไม่ได้ ข้ามไปไฟล์อื่นต่อ ไม่ล้มทั้งชุด
+                print(f"❌ {path}: {e}")
+                failed += 1
+                del done[path]
+                continue
+            frames = sum(s["frames"] for s in done[path])
+            seconds = sum(s["seconds"] for s in done[path])
+            print(f"✅ {path}: {len(tracks)} {args.mode}(s), {frames} frames "
+                  f"({frames / seconds if seconds else 0:.1f} fps/worker) → {out_path}")
+            del done[path]
+
+    print(f"เสร็จทั้งหมด {len(jobs) - failed} ไฟล์ ใน {time.time() - t0:.1f} วินาที" +
+          (f" (ล้มเหลว {failed} ไฟล์)" if failed else ""))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,116 +1,218 @@
+import argparse
+import functools
 import cv2
+import numpy as np
 import time
 from datetime import datetime
 from pytz import timezone
-from ultralytics import YOLO
+from backends import load_model
+from frame_grabber import FrameGrabber
+from track_store import TrackStore
+from event_sink import open_sink, person_event
+from metrics import Metrics
 
 class PeopleCounter:
-    def __init__(self, model_path="yolov8n.pt"):
-        self.model = YOLO(model_path)
-        self.people_data = {}  # {id: {"entry": datetime, "exit": datetime, "stay": float}}
-        self.total_count = 0
+    def __init__(self, model_path="yolov8n.pt", exit_ttl=60.0, sink=None, headless=False,
+                 backend="torch", imgsz=640, int8=False):
+        # model_path=None ใช้เมื่อผลการ track มาจากภายนอก (เช่น InferenceService)
+        self.model = load_model(model_path, backend, imgsz, int8) if model_path else None
+        self.headless = headless  # ไม่วาดผลบนภาพเลย (เซิร์ฟเวอร์ที่ไม่มีคนดูจอ)
+        self.header = TextOverlay()
+        self.recent = TextOverlay()
+        # คนที่ออกไปนานกว่า exit_ttl วินาทีจะถูกส่งให้ sink แล้วลบออกจากหน่วยความจำ
+        self.tracks = TrackStore(ttl=exit_ttl, recent_size=5, sink=sink)
+
+    @property
+    def total_count(self):
+        return self.tracks.total_count
+
+    def track_people(self, frame, annotate=None):
+        # ตรวจจับเฉพาะคน (class 0)
+        results = self.model.track(frame, persist=True, classes=[0], verbose=False)
+        return self.update(results[0], annotate)
+
+    def update(self, result, annotate=None):
+        """อัปเดตข้อมูลเข้า/ออกจากผล track หนึ่งเฟรม แล้วคืนภาพที่วาดผลแล้ว
+
+        annotate=False (หรือ headless) จะไม่วาดอะไรเลยและคืนภาพต้นฉบับ
+        """
+        now_th = self.record(result)
+
+        if annotate is None:
+            annotate = not self.headless
+        if not annotate:
+            return result.orig_img
+        return self.annotate(result, now_th)
 
-    def track_people(self, frame):
+    def record(self, result):
+        """อัปเดตข้อมูลเข้า/ออกอย่างเดียว คืนเวลาไทยของเฟรมนี้"""
         tz = timezone("Asia/Bangkok")
         now_th = datetime.now(tz)
         current_time = time.time()
 
-        # ตรวจจับเฉพาะคน (class 0)
-        results = self.model.track(frame, persist=True, classes=[0])
-        annotated_frame = results[0].plot()
-
         ids = []
-        if results[0].boxes.id is not None:
-            ids = results[0].boxes.id.cpu().numpy()
-
-            for pid in ids:
-                if pid not in self.people_data:
-                    # คนใหม่เข้าเฟรม
-                    self.people_data[pid] = {
-                        "entry": now_th,
-                        "exit": None,
-                        "stay": 0.0,
-                        "last_seen": current_time
-                    }
-                    self.total_count += 1
-                else:
-                    # คนเดิมยังอยู่ในเฟรม
-                    stay_time = current_time - self.people_data[pid]["last_seen"]
-                    self.people_data[pid]["stay"] += stay_time
-                    self.people_data[pid]["last_seen"] = current_time
-                    self.people_data[pid]["exit"] = None  # ยังไม่ออก
-
-        # ตรวจสอบว่าคนไหนออกจากเฟรมแล้ว
-        existing_ids = set(ids)
-        for pid in list(self.people_data.keys()):
-            if pid not in existing_ids:
-                if self.people_data[pid]["exit"] is None:
-                    self.people_data[pid]["exit"] = now_th
+        if result.boxes.id is not None:
+            ids = result.boxes.id.int().tolist()
+
+        # คนใหม่ / คนเดิม / คนที่ออกจากเฟรม
+        self.tracks.update(ids, now_th, current_time)
+        return now_th
 
+    def annotate(self, result, now_th):
         # ----------------------------- #
         # ส่วนแสดงผลบนจอ
         # ----------------------------- #
-        cv2.putText(
-            annotated_frame,
-            f"Thailand Time: {now_th.strftime('%H:%M:%S')}",
-            (20, 30),
-            cv2.FONT_HERSHEY_SIMPLEX,
-            0.8,
-            (255, 255, 255),
-            2,
-        )
-
-        cv2.putText(
-            annotated_frame,
-            f"Total People Detected: {self.total_count}",
-            (20, 60),
-            cv2.FONT_HERSHEY_SIMPLEX,
-            0.8,
-            (0, 255, 255),
-            2,
-        )
+        annotated_frame = result.plot()
 
+        # นาฬิกาเปลี่ยนทุกวินาที ตัวนับเปลี่ยนเมื่อมีคนเข้า จึงวาดใหม่เฉพาะตอนค่าเปลี่ยน
+        self.header.draw(annotated_frame, (
+            (f"Thailand Time: {now_th.strftime('%H:%M:%S')}", (20, 30), 0.8, (255, 255, 255)),
+            (f"Total People Detected: {self.total_count}", (20, 60), 0.8, (0, 255, 255)),
+        ))
+
+        lines = []
+        live = []  # เวลาอยู่ของคนที่ยังอยู่ในเฟรมเปลี่ยนทุกเฟรม จึงวาดตรง ๆ ไม่เข้า cache
         y_offset = 100
-        for pid, data in list(self.people_data.items())[-5:]:  # แสดงแค่ 5 คนล่าสุด
-            entry_str = data["entry"].strftime("%H:%M:%S") if data["entry"] else "-"
-            exit_str = data["exit"].strftime("%H:%M:%S") if data["exit"] else "-"
-            stay_str = f"{data['stay']:.1f}s"
-
-            info = f"ID:{int(pid)} | In:{entry_str} | Out:{exit_str} | Stay:{stay_str}"
-            cv2.putText(
-                annotated_frame,
-                info,
-                (20, y_offset),
-                cv2.FONT_HERSHEY_SIMPLEX,
-                0.6,
-                (0, 255, 0),
-                2,
-            )
+        for rec in self.tracks.recent:  # แสดงแค่ 5 คนล่าสุด
+            entry_str = rec.entry.strftime("%H:%M:%S") if rec.entry else "-"
+            exit_str = rec.exit.strftime("%H:%M:%S") if rec.exit else "-"
+
+            info = f"ID:{rec.pid} | In:{entry_str} | Out:{exit_str} | Stay:"
+            if rec.exit:
+                info += f"{rec.stay:.1f}s"
+            else:
+                live.append((f"{rec.stay:.1f}s", (20 + _text_width(info, 0.6), y_offset)))
+            lines.append((info, (20, y_offset), 0.6, (0, 255, 0)))
             y_offset += 25
+        self.recent.draw(annotated_frame, tuple(lines))
+        for text, org in live:
+            cv2.putText(annotated_frame, text, org, cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
 
         return annotated_frame
 
 
+@functools.lru_cache(maxsize=256)
+def _text_width(text, scale):
+    return cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, scale, 2)[0][0]
+
+
+class TextOverlay:
+    """ข้อความบนจอที่ cache ไว้: putText ลงภาพดำครั้งเดียวต่อชุดข้อความ
+    แล้วคัดลอกเฉพาะพิกเซลของตัวอักษรลงเฟรม"""
+
+    def __init__(self):
+        self.lines = None
+        self.points = None  # (ys, xs) ของพิกเซลตัวอักษร
+        self.values = None
+        self.width = 0
+
+    def _render(self, lines, width):
+        height = max(y for _, (x, y), _, _ in lines) + 15
+        canvas = np.zeros((height, width, 3), dtype=np.uint8)
+        for text, org, scale, color in lines:
+            cv2.putText(canvas, text, org, cv2.FONT_HERSHEY_SIMPLEX, scale, color, 2)
+        self.points = np.nonzero(canvas.any(axis=2))
+        self.values = canvas[self.points]
+        self.lines = lines
+        self.width = width
+
+    def draw(self, frame, lines):
+        if not lines:
+            return frame
+        h, w = frame.shape[:2]
+        if lines != self.lines or w != self.width:
+            self._render(lines, w)
+        ys, xs = self.points
+        if len(ys) and ys[-1] >= h:
+            keep = ys < h  # ภาพเตี้ยกว่า overlay
+            frame[ys[keep], xs[keep]] = self.values[keep]
+        else:
+            frame[ys, xs] = self.values
+        return frame
+
+
 # ----------------------------- #
 # ใช้งานจริงกับกล้องเว็บแคม
 # ----------------------------- #
-def main():
-    cap = cv2.VideoCapture(0)
-    counter = PeopleCounter()
+EVENT_LOG = "people_events.db"  # .db = SQLite, .jsonl = ไฟล์ต่อท้าย, "" = ไม่บันทึก
 
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            break
-
-        frame = counter.track_people(frame)
-        cv2.imshow("People Counter & Time Tracker (Thailand)", frame)
-
-        if cv2.waitKey(1) & 0xFF == ord('q'):
-            break
+def main():
+    parser = argparse.ArgumentParser(description="People counter & time tracker")
+    parser.add_argument("--source", default="0", help="camera index, RTSP URL or video file")
+    parser.add_argument("--headless", action="store_true", help="no window and no annotation at all")
+    parser.add_argument("--display-every", type=int, default=1,
+                        help="annotate and show only every Nth frame (tracking still runs on all)")
+    parser.add_argument("--backend", choices=["torch", "onnx", "openvino"], default="torch")
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--int8", action="store_true", help="INT8 quantized export (onnx/openvino)")
+    parser.add_argument("--metrics-port", type=int, default=0,
+                        help="serve Prometheus metrics on 127.0.0.1:PORT (0 = off)")
+    parser.add_argument("--metrics-overlay", action="store_true", help="draw FPS / stage latency on the frame")
+    args = parser.parse_args()
+
+    metrics = Metrics("people", enabled=bool(args.metrics_port or args.metrics_overlay))
+    source = int(args.source) if args.source.isdigit() else args.source
+    cap = FrameGrabber(source)  # อ่านกล้องในเธรดแยก ให้ track_people ได้เฟรมล่าสุดเสมอ
+    sink = open_sink(EVENT_LOG) if EVENT_LOG else None
+
+    def on_evict(rec):
+        with metrics.stage("events"):
+            sink.emit(person_event(rec))
+        metrics.inc("events_total")
+
+    counter = PeopleCounter(sink=on_evict if sink else None,
+                            headless=args.headless, backend=args.backend, imgsz=args.imgsz, int8=args.int8)
+    display_every = max(1, args.display_every)
+
+    metrics.set_gauge("dropped_frames", lambda: cap.dropped)
+    metrics.set_gauge("active_tracks", lambda: len(counter.tracks.active))
+    metrics.set_gauge("stored_tracks", lambda: len(counter.tracks))
+    metrics.set_gauge("people_total", lambda: counter.total_count)
+    if sink is not None:
+        metrics.set_gauge("event_sink_queue_depth", sink.q.qsize)
+    metrics.serve(args.metrics_port)
+
+    frame_no = 0
+    try:
+        while True:
+            with metrics.stage("capture"):
+                ret, frame = cap.read()
+            if not ret:
+                break
+
+            # วาดผลเฉพาะเฟรมที่จะถูกแสดงจริง
+            show = not args.headless and frame_no % display_every == 0
+            with metrics.stage("inference"):
+                result = counter.model.track(frame, persist=True, classes=[0], verbose=False)[0]
+            with metrics.stage("tracking"):
+                now_th = counter.record(result)
+            frame_no += 1
+            if args.headless:
+                metrics.frame_done()
+                continue
+
+            if show:
+                with metrics.stage("annotation"):
+                    frame = counter.annotate(result, now_th)
+                    if args.metrics_overlay:
+                        metrics.draw_overlay(frame)
+            with metrics.stage("display"):
+                if show:
+                    cv2.imshow("People Counter & Time Tracker (Thailand)", frame)
+                key = cv2.waitKey(1) & 0xFF
+            metrics.frame_done()
+            if key == ord('q'):
+                break
+    except KeyboardInterrupt:
+        pass
 
     cap.release()
-    cv2.destroyAllWindows()
+    metrics.close()
+    if sink is not None:
+        counter.tracks.flush()  # บันทึกคนที่ยังค้างอยู่ก่อนปิด
+        sink.close()
+    if not args.headless:
+        cv2.destroyAllWindows()
 
 
 if __name__ == "__main__":
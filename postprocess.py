@@ -0,0 +1,180 @@
+import functools
+import os
+import shutil
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# codec ที่ใส่ลง container เป้าหมายได้เลย (stream copy) ดูจากส่วนหน้าของชื่อ codec ใน info ของ yt-dlp
+# เช่น "avc1.64001f" -> "avc1", "mp4a.40.2" -> "mp4a"
+# ชนิด -> (codec ที่ copy ได้, option สำหรับ encode ใหม่)
+# mp4 ใส่ VP9 / Opus ได้ (ซึ่ง YouTube ใช้กับ bestvideo+bestaudio เป็นส่วนใหญ่) จึง encode ใหม่เฉพาะ codec ที่ mp4 รับไม่ได้จริง
+TARGETS = {
+    ".mp4": {
+        "video": (("avc1", "h264", "hev1", "hvc1", "hevc", "av01", "mp4v", "vp09", "vp9", "vp8"),
+                  ["-c:v", "libx264", "-preset", "veryfast", "-crf", "20"]),
+        "audio": (("mp4a", "aac", "mp3", "ac-3", "ec-3", "opus", "flac"), ["-c:a", "aac", "-b:a", "192k"]),
+    },
+    ".mp3": {"audio": (("mp3",), ["-c:a", "libmp3lame", "-b:a", "192k"])},
+    ".m4a": {"audio": (("mp4a", "aac"), ["-c:a", "aac", "-b:a", "192k"])},
+}
+
+
+class Cancelled(Exception):
+    pass
+
+
+class FfmpegError(RuntimeError):
+    pass
+
+
+# ----------------------------- #
+# หา ffmpeg (ครั้งเดียว)
+# ----------------------------- #
+@functools.lru_cache(maxsize=None)
+def find_ffmpeg(path=""):
+    """path ของ ffmpeg หรือ None — ค้นดิสก์ / PATH ครั้งแรกครั้งเดียว ครั้งต่อไปคืนค่าที่จำไว้"""
+    if path and os.path.isfile(path):
+        return path
+    return shutil.which("ffmpeg")
+
+
+def _codec(name):
+    return (name or "").split(".")[0].lower()
+
+
+# ----------------------------- #
+# งานหนึ่งงาน: รวมภาพ + เสียง หรือแยกเสียง
+# ----------------------------- #
+class PostTask:
+    """inputs: [{"path", "vcodec", "acodec"}] ไฟล์ที่ดาวน์โหลดมา (codec ตาม info ของ yt-dlp, "none" = ไม่มี)
+    output: ไฟล์ปลายทาง นามสกุลบอกเป้าหมาย (.mp4 รวมภาพ+เสียง, .mp3 / .m4a เสียงอย่างเดียว)
+    ไฟล์ inputs ถูกลบเมื่อเสร็จหรือถูกยกเลิก ถ้า ffmpeg ล้มเหลวจะเก็บไว้ให้ลองใหม่โดยไม่ต้องดาวน์โหลดอีก
+    """
+
+    def __init__(self, inputs, output, cancel_event=None):
+        self.inputs = inputs
+        self.output = output
+        self.cancel_event = cancel_event or threading.Event()
+        ext = os.path.splitext(output)[1].lower()
+        if ext not in TARGETS:
+            raise ValueError(f"unsupported output type: {ext}")
+        self.target = TARGETS[ext]
+
+    def build_args(self, allow_copy=True):
+        """argument ของ ffmpeg (ไม่รวมไฟล์ปลายทาง) และ plan {"video": "copy" / encoder, ...}"""
+        args, plan = [], {}
+        for inp in self.inputs:
+            args += ["-i", inp["path"]]
+        for kind, key, flag in (("video", "vcodec", "v"), ("audio", "acodec", "a")):
+            if kind not in self.target:
+                continue
+            found = next((i for i, inp in enumerate(self.inputs) if inp.get(key) != "none"), None)
+            if found is None:
+                continue
+            codec = self.inputs[found].get(key)
+            accepted, encode = self.target[kind]
+            args += ["-map", f"{found}:{flag}:0?"]  # codec ที่ไม่รู้ (None) อาจไม่มี stream นั้นจริง
+            if allow_copy and _codec(codec) in accepted:
+                args += [f"-c:{flag}", "copy"]
+                plan[kind] = "copy"
+            else:
+                args += encode
+                plan[kind] = encode[1]
+        return args, plan
+
+    def discard(self):
+        for inp in self.inputs:
+            if inp["path"] != self.output:
+                _remove(inp["path"])
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def run_ffmpeg(cmd, cancel_event):
+    """รัน ffmpeg แล้วรอ ระหว่างรอตรวจ cancel_event ทุก 0.2 วินาที (ยกเลิกแล้ว kill ทันที)"""
+    proc = subprocess.Popen(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    while True:
+        try:
+            _, err = proc.communicate(timeout=0.2)
+            break
+        except subprocess.TimeoutExpired:
+            if cancel_event.is_set():
+                proc.kill()
+                proc.communicate()
+                raise Cancelled("cancelled by user")
+    if proc.returncode != 0:
+        lines = err.decode("utf-8", errors="replace").strip().splitlines()
+        raise FfmpegError(lines[-1] if lines else f"ffmpeg exited with {proc.returncode}")
+
+
+def process(task, ffmpeg="ffmpeg", threads=1):
+    """ทำ task หนึ่งงาน คืน plan ที่ใช้จริง
+
+    ใช้ stream copy กับ stream ที่ codec ตรงกับเป้าหมายอยู่แล้ว (ไม่ต้อง encode ใหม่ เร็วกว่าหลายสิบเท่า)
+    ถ้า copy แล้ว ffmpeg ไม่ยอม (เช่น codec ในไฟล์ไม่ตรงกับ info) ค่อย encode ใหม่ทั้งหมด
+    """
+    root, ext = os.path.splitext(task.output)
+    tmp = f"{root}.temp{ext}"  # เขียนไฟล์ชั่วคราวก่อน ไฟล์ปลายทางจึงไม่เคยเป็นไฟล์ครึ่ง ๆ
+    base = [ffmpeg, "-y", "-nostdin", "-hide_banner", "-loglevel", "error"]
+    try:
+        if task.cancel_event.is_set():
+            raise Cancelled("cancelled by user")
+        args, plan = task.build_args()
+        try:
+            run_ffmpeg(base + args + ["-threads", str(threads), tmp], task.cancel_event)
+        except FfmpegError:
+            if "copy" not in plan.values():
+                raise
+            args, plan = task.build_args(allow_copy=False)
+            run_ffmpeg(base + args + ["-threads", str(threads), tmp], task.cancel_event)
+        os.replace(tmp, task.output)
+    except Cancelled:
+        _remove(tmp)
+        task.discard()
+        raise
+    except BaseException:
+        _remove(tmp)
+        raise
+    task.discard()
+    return plan
+
+
+# ----------------------------- #
+# pool ของ ffmpeg แยกจากตัวดาวน์โหลด
+# ----------------------------- #
+class PostProcessPool:
+    """รัน PostTask บน thread ของตัวเอง (workers = จำนวนคอร์) thread ที่ดาวน์โหลดส่งงานเข้ามาแล้วไปดาวน์โหลดงานถัดไปได้เลย
+    ดาวน์โหลด (รอ network) กับ encode (ใช้ CPU) จึงทำซ้อนกันได้
+
+    แต่ละ ffmpeg ใช้ cpu_count // workers thread (ค่าเริ่มต้น 1) ไม่ให้หลายงานแย่งคอร์กันเอง
+    """
+
+    def __init__(self, ffmpeg, workers=None):
+        self.ffmpeg = ffmpeg
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.threads = max(1, (os.cpu_count() or 1) // self.workers)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="ffmpeg")
+
+    def submit(self, task, on_start=None, on_done=None):
+        """on_start(task) เมื่อเริ่ม, on_done(task, plan, error) เมื่อจบ (error = None ถ้าสำเร็จ) เรียกจาก thread ของ pool"""
+        def run():
+            plan, error = None, None
+            try:
+                if on_start is not None:
+                    on_start(task)
+                plan = process(task, self.ffmpeg, self.threads)
+            except Exception as e:
+                error = e
+            if on_done is not None:
+                on_done(task, plan, error)
+
+        return self._executor.submit(run)
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait, cancel_futures=not wait)
@@ -1,47 +1,82 @@
-from ultralytics import YOLO
 import cv2
+from backends import load_model
+from frame_grabber import FrameGrabber
+from inference_gate import InferenceGate
+from metrics import Metrics
+from roi import RegionOfInterest
+from vehicle_detector import VehicleDetector
+from vehicle_events import VehicleEventTracker
+
+# ------------------------
+# ตั้งค่าการข้ามเฟรม: "off", "every_n", "motion", "adaptive"
+# ------------------------
+GATE_MODE = "motion"
+EVERY_N = 5            # ใช้กับโหมด every_n
+MOTION_METHOD = "diff"  # "diff" = frame differencing, "mog2" = background subtraction
+
+# เส้นนับรถ เช่น ((0, 300), (640, 300)), None = นับทุกคันที่เห็น
+COUNT_LINE = None
+
+# พื้นที่ถนนที่จะส่งให้ YOLO: สี่เหลี่ยม (x1, y1, x2, y2) หรือ polygon [(x, y), ...]
+# เช่น [(0, 240, 640, 480)] หรือ [[(0, 480), (200, 250), (440, 250), (640, 480)]], [] = ทั้งภาพ
+ROIS = []
 
 # โหลดโมเดล YOLO (coco dataset)
-model = YOLO("yolov8n.pt")
+# BACKEND: "torch" (เดิม), "onnx" หรือ "openvino" (export ครั้งแรกแล้ว cache ไว้ใน .model_cache)
+BACKEND = "torch"
+IMGSZ = 640
+INT8 = False
+model = load_model("yolov8n.pt", BACKEND, IMGSZ, INT8)
 
-# เปิดกล้อง
-cap = cv2.VideoCapture(0)
+# เปิดกล้อง (อ่านเฟรมในเธรดแยก เก็บเฉพาะเฟรมล่าสุด)
+cap = FrameGrabber(0)
 
 if not cap.isOpened():
     print("❌ ไม่สามารถเปิดกล้องได้")
     exit()
 
-while True:
-    ret, frame = cap.read()
-    if not ret:
-        break
-
-    # รัน YOLO ตรวจจับวัตถุ
-    results = model(frame, stream=True)
+gate = InferenceGate(GATE_MODE, every_n=EVERY_N, motion_method=MOTION_METHOD)
+events = VehicleEventTracker(line=COUNT_LINE)
+roi = RegionOfInterest(ROIS) if ROIS else None
 
-    for r in results:
-        for box in r.boxes:
-            cls = int(box.cls[0])  # คลาสวัตถุ
-            conf = float(box.conf[0])  # ความมั่นใจ (%)
+# ------------------------
+# สถิติการทำงาน: METRICS_PORT เช่น 9100 → http://127.0.0.1:9100/metrics, 0 = ปิด
+# ------------------------
+METRICS_PORT = 0
+METRICS_OVERLAY = False  # แสดง FPS / เวลาแต่ละขั้นบนภาพ
+metrics = Metrics("reitime", enabled=bool(METRICS_PORT or METRICS_OVERLAY))
+metrics.set_gauge("dropped_frames", lambda: cap.dropped)
+metrics.set_gauge("active_tracks", lambda: len(events.active))
+metrics.set_gauge("vehicles_total", lambda: events.total_entered)
+metrics.serve(METRICS_PORT)
 
-            # เฉพาะคลาสรถ
-            if cls in [2, 3, 5, 7]:  
-                # 2 = Car, 3 = Motorcycle, 5 = Bus, 7 = Truck
+# gate -> ROI -> YOLO -> เหตุการณ์ -> วาดผล (ดู vehicle_detector.py)
+detector = VehicleDetector(model, gate=gate, roi=roi, events=events, metrics=metrics)
 
-                x1, y1, x2, y2 = box.xyxy[0]
+while True:
+    with metrics.stage("capture"):
+        ret, frame = cap.read()
+    if not ret:
+        break
 
-                cv2.rectangle(frame, (int(x1), int(y1)), (int(x2), int(y2)),
-                              (0, 255, 0), 2)
+    for ev in detector.step(frame):
+        print(f"[{ev['type']}] {model.names[ev['cls']]} ID {ev['id']}")
 
-                cv2.putText(frame, f"{model.names[cls]} {conf:.2f}",
-                            (int(x1), int(y1) - 10),
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.6,
-                            (0, 255, 0), 2)
+    with metrics.stage("annotation"):
+        detector.draw(frame)
+        cv2.putText(frame, f"Vehicles: {events.total_entered}", (20, 30),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 255), 2)
+        if METRICS_OVERLAY:
+            metrics.draw_overlay(frame)
 
-    cv2.imshow("YOLO Real-Time Car Detection", frame)
+    with metrics.stage("display"):
+        cv2.imshow("YOLO Real-Time Car Detection", frame)
+        key = cv2.waitKey(1) & 0xFF
+    metrics.frame_done()
 
-    if cv2.waitKey(1) & 0xFF == ord("q"):
+    if key == ord("q"):
         break
 
 cap.release()
+metrics.close()
 cv2.destroyAllWindows()
@@ -0,0 +1,112 @@
+import cv2
+import numpy as np
+
+
+def _as_polygon(region):
+    """รับสี่เหลี่ยม (x1, y1, x2, y2) หรือ polygon [(x, y), ...] คืน numpy array ของจุด"""
+    if len(region) == 4 and all(np.isscalar(v) for v in region):
+        x1, y1, x2, y2 = region
+        return np.array([(x1, y1), (x2, y1), (x2, y2), (x1, y2)], dtype=np.int32)
+    return np.array(region, dtype=np.int32).reshape(-1, 2)
+
+
+# ----------------------------- #
+# พื้นที่สนใจ (ROI) สำหรับตรวจจับรถ
+# ----------------------------- #
+class RegionOfInterest:
+    """ตัดเฉพาะพื้นที่ถนนไปให้ YOLO แล้วแปลงพิกัดกลับเป็นพิกัดของภาพเต็ม
+
+    regions: รายการสี่เหลี่ยม (x1, y1, x2, y2) หรือ polygon [(x, y), ...] ในพิกัดภาพเต็ม
+    mask_outside: ทาสีดำพื้นที่นอก polygon ที่อยู่ในกรอบ crop (ทางเท้า / ที่จอดรถ)
+    """
+
+    def __init__(self, regions, mask_outside=True, pad=8):
+        if not regions:
+            raise ValueError("at least one region is required")
+        self.polygons = [_as_polygon(r) for r in regions]
+        self.mask_outside = mask_outside
+        self.pad = pad
+        self._shape = None
+        self._rect = None
+        self._mask = None
+        self._rects = None
+
+    def _prepare(self, shape):
+        if shape[:2] == self._shape:
+            return
+        h, w = shape[:2]
+        self._shape = shape[:2]
+
+        # กรอบ crop ของแต่ละ region (ใช้กับ crops()) และกรอบรวม (ใช้กับ crop())
+        self._rects = []
+        for poly in self.polygons:
+            x, y, rw, rh = cv2.boundingRect(poly)
+            self._rects.append((max(0, x - self.pad), max(0, y - self.pad),
+                                min(w, x + rw + self.pad), min(h, y + rh + self.pad)))
+        x1 = min(r[0] for r in self._rects)
+        y1 = min(r[1] for r in self._rects)
+        x2 = max(r[2] for r in self._rects)
+        y2 = max(r[3] for r in self._rects)
+        self._rect = (x1, y1, x2, y2)
+
+        self._mask = None
+        if self.mask_outside:
+            mask = np.zeros((y2 - y1, x2 - x1), dtype=np.uint8)
+            cv2.fillPoly(mask, [p - (x1, y1) for p in self.polygons], 255)
+            if cv2.countNonZero(mask) < mask.size:
+                self._mask = mask
+
+    def union_rect(self, shape):
+        self._prepare(shape)
+        return self._rect
+
+    def pixel_ratio(self, shape):
+        """สัดส่วนพิกเซลที่ส่งเข้าโมเดลเทียบกับภาพเต็ม"""
+        x1, y1, x2, y2 = self.union_rect(shape)
+        return (x2 - x1) * (y2 - y1) / float(shape[0] * shape[1])
+
+    def crop(self, frame):
+        """ตัดกรอบรวมของทุก region คืน (ภาพที่ตัด, (offset_x, offset_y))
+
+        กรอบคงที่ทุกเฟรม จึงใช้กับ model.track(..., persist=True) ได้
+        """
+        self._prepare(frame.shape)
+        x1, y1, x2, y2 = self._rect
+        img = frame[y1:y2, x1:x2]
+        if self._mask is not None:
+            img = cv2.bitwise_and(img, img, mask=self._mask)
+        return img, (x1, y1)
+
+    def crops(self, frame):
+        """ตัดทีละ region (สำหรับ predict แบบ batch ไม่ใช้ tracker) คืน [(ภาพ, offset), ...]"""
+        self._prepare(frame.shape)
+        return [(frame[y1:y2, x1:x2], (x1, y1)) for x1, y1, x2, y2 in self._rects]
+
+    def contains(self, x, y):
+        return any(cv2.pointPolygonTest(p, (float(x), float(y)), False) >= 0 for p in self.polygons)
+
+    def to_frame(self, boxes, offset):
+        """เลื่อนกล่อง (x1, y1, x2, y2, ...) จากพิกัด crop กลับเป็นพิกัดภาพเต็ม
+        และทิ้งกล่องที่จุดกึ่งกลางขอบล่างอยู่นอกทุก region"""
+        ox, oy = offset
+        out = []
+        for box in boxes:
+            x1, y1, x2, y2 = box[0] + ox, box[1] + oy, box[2] + ox, box[3] + oy
+            if self.contains((x1 + x2) / 2.0, y2):
+                out.append((x1, y1, x2, y2, *box[4:]))
+        return out
+
+    def detect(self, model, frame, **kwargs):
+        """predict ทุก region ในการเรียกครั้งเดียว คืนกล่อง (x1, y1, x2, y2, cls, conf) ในพิกัดภาพเต็ม"""
+        crops = self.crops(frame)
+        results = model.predict([img for img, _ in crops], verbose=False, **kwargs)
+        boxes = []
+        for (_, offset), r in zip(crops, results):
+            raw = [(*b, c, s) for b, c, s in zip(r.boxes.xyxy.tolist(), r.boxes.cls.int().tolist(),
+                                                 r.boxes.conf.tolist())]
+            boxes.extend(self.to_frame(raw, offset))
+        return boxes
+
+    def draw(self, frame, color=(255, 128, 0)):
+        cv2.polylines(frame, self.polygons, True, color, 1)
+        return frame
@@ -1,21 +1,26 @@
 # pip install opencv-python
-# pip install pytesseract
+# pip install tesserocr  (ถ้าติดตั้งไม่ได้ จะเรียก libtesseract หรือ tesseract.exe แทน)
 
 import cv2
-import pytesseract
 
-pytesseract.pytesseract.tesseract_cmd = \
-     "C:/Program Files/Tesseract-OCR/tesseract.exe"
+from ocr_engine import open_engine
+from ocr_preprocess import Preprocess, ocr_page
+
+engine = open_engine("tha", size=4, cmd="C:/Program Files/Tesseract-OCR/tesseract.exe")
      
 image_filename = "i1.jpg"
 image = cv2.imread(image_filename)
 
-
-gray_image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-
-text = pytesseract.image_to_string(gray_image, lang='tha')
+# ปรับ DPI / แก้ภาพเอียง / ทำขาวดำ แล้วแบ่งเป็นบล็อกข้อความ OCR พร้อมกันหลายบล็อก
+pre = Preprocess()
+text, timings = ocr_page(image, engine.ocr, pre, workers=engine.size)
 print(text)
 
+print(f"preprocess {timings['preprocess'] * 1000:.0f} ms, layout {timings['layout'] * 1000:.0f} ms")
+for i, block in enumerate(timings["blocks"]):
+    print(f"block {i} {block['box']}: {block['seconds'] * 1000:.0f} ms")
+engine.close()
+
 cv2.imshow("image", image)
 cv2.waitKey(0) 
 cv2.destroyAllWindows
@@ -0,0 +1,101 @@
+import importlib
+import sys
+import types
+
+import numpy as np
+import pytest
+
+
+class FakeSession:
+    """แทน onnxruntime.InferenceSession: จำ options ที่ได้รับและนับจำนวนครั้งที่ถูก run"""
+
+    def __init__(self, path, options=None, providers=None):
+        self.path = path
+        self.options = options
+        self.providers = providers or ["CPUExecutionProvider"]
+        self.runs = 0
+
+    def get_providers(self):
+        return self.providers
+
+    def run(self, names, feed):
+        self.runs += 1
+        return [np.zeros(1)]
+
+
+class FakeOnnxBackend:
+    """เหมือน ultralytics.nn.backends.onnx.ONNXBackend: forward() ใช้ self.session"""
+
+    def __init__(self, path):
+        self.session = FakeSession(path)
+        self.use_io_binding = True
+        self.io = object()
+
+    def forward(self, im):
+        return self.session.run(None, {"images": im})
+
+
+class FakeAutoBackend:
+    """เหมือน AutoBackend ของ ultralytics 8.4: __getattr__ ส่งต่อแค่การอ่านไปที่ .backend"""
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    def __getattr__(self, name):
+        if "backend" in self.__dict__ and hasattr(self.backend, name):
+            return getattr(self.backend, name)
+        raise AttributeError(name)
+
+    def __call__(self, im):
+        return self.backend.forward(im)
+
+
+class FakeYOLO:
+    def __init__(self, path, task=None):
+        self.path = path
+        self.overrides = {}
+        self.predictor = None
+
+    def predict(self, source, **kwargs):
+        if self.predictor is None:
+            self.predictor = types.SimpleNamespace(model=FakeAutoBackend(FakeOnnxBackend(self.path)))
+        return self.predictor.model(source)
+
+
+@pytest.fixture
+def backends(monkeypatch):
+    ort = types.ModuleType("onnxruntime")
+    ort.SessionOptions = types.SimpleNamespace
+    ort.InferenceSession = FakeSession
+    monkeypatch.setitem(sys.modules, "onnxruntime", ort)
+    monkeypatch.setitem(sys.modules, "ultralytics", types.SimpleNamespace(YOLO=FakeYOLO))
+    monkeypatch.delitem(sys.modules, "backends", raising=False)
+    return importlib.import_module("backends")
+
+
+def test_limit_threads_replaces_session_used_for_inference(backends):
+    model = FakeYOLO("yolov8n.onnx", task="detect")
+    backends.limit_threads(model, "yolov8n.onnx", "onnx", threads=2, imgsz=32)
+
+    runner = model.predictor.model
+    session = runner.backend.session
+    assert "session" not in vars(runner)  # ไม่ได้สร้าง attribute ใหม่บนตัวห่อ
+    assert session.options.intra_op_num_threads == 2
+    assert session.options.inter_op_num_threads == 1
+    assert runner.backend.use_io_binding is False and runner.backend.io is None
+
+    runner(np.zeros((1, 3, 32, 32), dtype=np.float32))
+    assert session.runs == 1
+
+
+def test_export_cached_skips_loading_on_cache_hit(backends, tmp_path, monkeypatch):
+    weights = tmp_path / "yolov8n.pt"
+    weights.write_bytes(b"weights")
+    target = backends.cache_path(str(weights), "onnx", 640, False, cache_dir=str(tmp_path))
+    open(target, "wb").close()
+
+    def fail(*args, **kwargs):
+        raise AssertionError("YOLO() loaded on a cache hit")
+
+    monkeypatch.setattr(backends, "YOLO", fail)
+    assert backends.export_cached(str(weights), "onnx", 640, cache_dir=str(tmp_path)) == target
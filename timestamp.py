@@ -1,75 +1,135 @@
-from ultralytics import YOLO
 import cv2
-import pyttsx3
 from datetime import datetime
-import time
+from backends import load_model
+from frame_grabber import FrameGrabber
+from inference_gate import InferenceGate
+from metrics import Metrics
+from roi import RegionOfInterest
+from announcer import Announcer
+from vehicle_detector import VehicleDetector
+from vehicle_events import VehicleEventTracker
+from event_sink import open_sink
 
 # ------------------------
-# ระบบเสียง
+# ระบบเสียง (พูดในเธรดแยก ลูปตรวจจับไม่ต้องรอ)
 # ------------------------
-engine = pyttsx3.init('sapi5')  # ใช้ SAPI5 สำหรับ Windows
-engine.setProperty('rate', 150)  # ปรับความเร็วพูด
-
-last_speak_time = 0  # เวลา last speak
+VOICE_ENABLED = True
 SPEAK_INTERVAL = 1  # วินาที หน่วงเวลาเพื่อไม่ให้เสียงซ้อน
+SPEAK_QUEUE_SIZE = 4  # คิวเต็มแล้วทิ้งข้อความเก่าสุด (เวลาเก่าไม่มีประโยชน์แล้ว)
+
+announcer = None
+if VOICE_ENABLED:
+    announcer = Announcer(driver='sapi5',  # ใช้ SAPI5 สำหรับ Windows
+                          rate=150,  # ปรับความเร็วพูด
+                          interval=SPEAK_INTERVAL,
+                          maxsize=SPEAK_QUEUE_SIZE,
+                          policy="drop_oldest")
 
-def speak_time():
-    global last_speak_time
-    now = time.time()
-    if now - last_speak_time < SPEAK_INTERVAL:
-        return  # ถ้าเพิ่งพูดไปแล้ว ให้ข้าม
-    last_speak_time = now
+def speak_time(key="vehicle"):
+    if announcer is None:
+        return
 
     current_time = datetime.now()
     text = f"รถผ่านเวลา {current_time.hour} นาฬิกา {current_time.minute} นาที {current_time.second} วินาที"
-    print(text)  # ดู log ใน console ด้วย
-    engine.say(text)
-    engine.runAndWait()
+    # เหตุการณ์ key เดียวกันที่ยังรอพูดจะถูกรวมเป็นเวลาล่าสุด (print ใน console ตอนพูดจริง)
+    announcer.announce(text, key=key)
 
 # ------------------------
 # โหลดโมเดล YOLO
 # ------------------------
-model = YOLO("yolov8n.pt")  # โหลด YOLOv8 Nano
-# model = YOLO("yolov8n.pt")  # ใช้โมเดลอื่นได้ตามต้องการ
+# BACKEND: "torch" (เดิม), "onnx" หรือ "openvino" (export ครั้งแรกแล้ว cache ไว้ใน .model_cache)
+BACKEND = "torch"
+IMGSZ = 640
+INT8 = False
+model = load_model("yolov8n.pt", BACKEND, IMGSZ, INT8)  # โหลด YOLOv8 Nano
+# model = load_model("yolov8s.pt", BACKEND, IMGSZ, INT8)  # ใช้โมเดลอื่นได้ตามต้องการ
+
+# ------------------------
+# ตั้งค่าการข้ามเฟรม: "off", "every_n", "motion", "adaptive"
+# ------------------------
+GATE_MODE = "motion"
+EVERY_N = 5            # ใช้กับโหมด every_n
+MOTION_METHOD = "diff"  # "diff" = frame differencing, "mog2" = background subtraction
+gate = InferenceGate(GATE_MODE, every_n=EVERY_N, motion_method=MOTION_METHOD)
+
+# ------------------------
+# เหตุการณ์รายคัน: entered / left ครั้งเดียวต่อ track id
+# ------------------------
+COUNT_LINE = None  # เช่น ((0, 300), (640, 300)) นับเฉพาะรถที่ข้ามเส้นนี้, None = นับทุกคันที่เห็น
+events = VehicleEventTracker(line=COUNT_LINE)
+
+# พื้นที่ถนนที่จะส่งให้ YOLO: สี่เหลี่ยม (x1, y1, x2, y2) หรือ polygon [(x, y), ...], [] = ทั้งภาพ
+ROIS = []
+roi = RegionOfInterest(ROIS) if ROIS else None
+
+EVENT_LOG = "vehicle_events.db"  # .db = SQLite, .jsonl = ไฟล์ต่อท้าย, "" = ไม่บันทึก
+sink = open_sink(EVENT_LOG) if EVENT_LOG else None
 
 # ------------------------
 # เปิดกล้อง
 # ------------------------
-cap = cv2.VideoCapture(0)  # 0 = กล้องคอมพิวเตอร์
-# cap = cv2.VideoCapture("video.mp4")  # ใช้คลิปวิดีโอจากไฟล์ก็ได้
+cap = FrameGrabber(0)  # 0 = กล้องคอมพิวเตอร์ (อ่านเฟรมในเธรดแยก เก็บเฉพาะเฟรมล่าสุด)
+# cap = FrameGrabber("video.mp4")  # ใช้คลิปวิดีโอจากไฟล์ก็ได้ (ไฟล์จะส่งครบทุกเฟรม ไม่ข้ามเฟรม)
 
 if not cap.isOpened():
     print("❌ ไม่สามารถเปิดกล้องหรือไฟล์วิดีโอได้")
     exit()
 
 # ------------------------
-# วนลูปตรวจจับรถ
+# สถิติการทำงาน: METRICS_PORT เช่น 9100 → http://127.0.0.1:9100/metrics, 0 = ปิด
 # ------------------------
+METRICS_PORT = 0
+METRICS_OVERLAY = False  # แสดง FPS / เวลาแต่ละขั้นบนภาพ
+metrics = Metrics("timestamp", enabled=bool(METRICS_PORT or METRICS_OVERLAY))
+metrics.set_gauge("dropped_frames", lambda: cap.dropped)
+metrics.set_gauge("active_tracks", lambda: len(events.active))
+if announcer is not None:
+    metrics.set_gauge("announcer_queue_depth", announcer.depth)
+if sink is not None:
+    metrics.set_gauge("event_sink_queue_depth", sink.q.qsize)
+metrics.serve(METRICS_PORT)
+
+# ------------------------
+# วนลูปตรวจจับรถ (gate -> ROI -> YOLO -> เหตุการณ์ -> sink / เสียง ดู vehicle_detector.py)
+# ------------------------
+detector = VehicleDetector(model, gate=gate, roi=roi, events=events, sink=sink,
+                           announce=lambda ev: speak_time(key=f"vehicle-{ev['id']}"),  # พูดครั้งเดียวต่อคัน
+                           metrics=metrics, label=lambda tid, cls, conf: f"Car #{tid}")
+
+
+def print_event(ev):
+    print(f"[{ev['type']}] รถ ID {ev['id']} เวลา {datetime.fromtimestamp(ev['time']).strftime('%H:%M:%S')}")
+
+
 while True:
-    ret, frame = cap.read()
+    with metrics.stage("capture"):
+        ret, frame = cap.read()
     if not ret:
         break
 
-    results = model(frame, stream=True)
-
-    for r in results:
-        for box in r.boxes:
-            cls = int(box.cls[0])
-            if cls in [2,3,5,7]:  # รถทุกประเภท: car, motorcycle, bus, truck
-                x1, y1, x2, y2 = [int(v) for v in box.xyxy[0]]
+    for ev in detector.step(frame):
+        print_event(ev)
 
-                # วาดกรอบรถ
-                cv2.rectangle(frame, (x1, y1), (x2, y2), (0,255,0), 2)
-                cv2.putText(frame, "Car", (x1, y1-10),
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0,255,0), 2)
+    with metrics.stage("annotation"):
+        detector.draw(frame)
+        if METRICS_OVERLAY:
+            metrics.draw_overlay(frame)
 
-                # พูดเวลา
-                speak_time()
+    with metrics.stage("display"):
+        cv2.imshow("Real-Time Car Detection with Voice", frame)
+        key = cv2.waitKey(1) & 0xFF
+    metrics.frame_done()
 
-    cv2.imshow("Real-Time Car Detection with Voice", frame)
-
-    if cv2.waitKey(1) & 0xFF == ord("q"):
+    if key == ord("q"):
         break
 
+for ev in detector.close():
+    print_event(ev)
+
 cap.release()
+metrics.close()
+if sink is not None:
+    sink.close()
+if announcer is not None:
+    announcer.stop()
 cv2.destroyAllWindows()
@@ -0,0 +1,95 @@
+from collections import OrderedDict, deque
+
+
+class TrackRecord:
+    __slots__ = ("pid", "entry", "exit", "stay", "last_seen")
+
+    def __init__(self, pid, entry, last_seen):
+        self.pid = pid
+        self.entry = entry          # datetime ตอนเข้าเฟรม
+        self.exit = None            # datetime ตอนออกจากเฟรม (None = ยังอยู่)
+        self.stay = 0.0             # เวลาที่อยู่ในเฟรม (วินาที)
+        self.last_seen = last_seen  # time.time() ครั้งล่าสุดที่เห็น
+
+    def as_dict(self):
+        return {"id": self.pid, "entry": self.entry, "exit": self.exit, "stay": self.stay}
+
+
+# ----------------------------- #
+# ที่เก็บสถานะ track แบบจำกัดขนาด
+# ----------------------------- #
+class TrackStore:
+    """เก็บข้อมูลเข้า/ออกของแต่ละ track id โดยไม่โตขึ้นเรื่อย ๆ
+
+    - active: คนที่อยู่ในเฟรม งานต่อเฟรมเป็น O(จำนวนคนในเฟรม)
+    - exited: คนที่ออกไปแล้ว เรียงตามเวลาออก ถ้าหายไปนานกว่า ttl วินาที
+      จะถูกลบออกและส่งให้ sink (เช่น บันทึกลงฐานข้อมูล)
+    - recent: K คนล่าสุดที่เข้ามา สำหรับแสดงบนจอ (O(1))
+    """
+
+    def __init__(self, ttl=60.0, recent_size=5, sink=None):
+        self.ttl = ttl
+        self.sink = sink  # sink(record) เรียกเมื่อ record ถูกลบออกจากหน่วยความจำ
+        self.active = {}
+        self.exited = OrderedDict()
+        self.recent = deque(maxlen=recent_size)
+        self.total_count = 0
+        self.evicted = 0
+
+    def __len__(self):
+        return len(self.active) + len(self.exited)
+
+    def get(self, pid):
+        return self.active.get(pid) or self.exited.get(pid)
+
+    def update(self, ids, now_th, current_time):
+        """อัปเดตด้วย track id ที่เห็นในเฟรมนี้ คืนรายการ record ที่เพิ่งออกจากเฟรม"""
+        seen = set()
+        for pid in ids:
+            pid = int(pid)
+            seen.add(pid)
+            rec = self.active.get(pid)
+            if rec is None:
+                rec = self.exited.pop(pid, None)
+                if rec is None:
+                    # คนใหม่เข้าเฟรม
+                    rec = TrackRecord(pid, now_th, current_time)
+                    self.recent.append(rec)
+                    self.total_count += 1
+                self.active[pid] = rec
+
+            # คนเดิมยังอยู่ในเฟรม
+            rec.stay += current_time - rec.last_seen
+            rec.last_seen = current_time
+            rec.exit = None  # ยังไม่ออก
+
+        # ตรวจสอบว่าคนไหนออกจากเฟรมแล้ว (วนเฉพาะคนที่ยัง active)
+        departed = []
+        if len(seen) != len(self.active):
+            for pid in [p for p in self.active if p not in seen]:
+                rec = self.active.pop(pid)
+                rec.exit = now_th
+                self.exited[pid] = rec
+                departed.append(rec)
+
+        self.evict(current_time)
+        return departed
+
+    def evict(self, current_time):
+        """ลบ record ที่ออกไปนานกว่า ttl (ตัวเก่าสุดอยู่หน้าสุดเสมอ)"""
+        while self.exited:
+            pid, rec = next(iter(self.exited.items()))
+            if current_time - rec.last_seen < self.ttl:
+                break
+            del self.exited[pid]
+            self.evicted += 1
+            if self.sink is not None:
+                self.sink(rec)
+
+    def flush(self):
+        """ส่งทุก record ที่เหลือให้ sink (ใช้ตอนปิดโปรแกรม)"""
+        for store in (self.exited, self.active):
+            for rec in store.values():
+                if self.sink is not None:
+                    self.sink(rec)
+            store.clear()
@@ -0,0 +1,96 @@
+import time
+
+import cv2
+
+from event_sink import vehicle_event
+from inference_gate import InferenceGate
+from metrics import Metrics
+from vehicle_events import VehicleEventTracker
+
+VEHICLE_CLASSES = [2, 3, 5, 7]  # car, motorcycle, bus, truck (COCO)
+
+
+# ----------------------------- #
+# งานต่อเฟรมของ reitime.py / timestamp.py
+# ----------------------------- #
+class VehicleDetector:
+    """gate -> ROI -> YOLO track -> เหตุการณ์รายคัน -> sink / เสียง -> วาดผล
+
+    reitime.py, timestamp.py และ bench.py ใช้คลาสนี้ตัวเดียวกัน bench จึงวัดโค้ดที่รันจริง
+    sink: event sink จาก open_sink() หรือ None
+    announce: ฟังก์ชัน(event) เรียกเมื่อมีรถเข้า (เช่น ส่งข้อความให้ Announcer) หรือ None
+    label: ฟังก์ชัน(tid, cls, conf) -> ข้อความบนกรอบรถ
+    """
+
+    def __init__(self, model, gate=None, roi=None, events=None, sink=None, announce=None,
+                 metrics=None, label=None):
+        self.model = model
+        self.gate = gate or InferenceGate("off")
+        self.roi = roi
+        self.events = events or VehicleEventTracker()
+        self.sink = sink
+        self.announce = announce
+        self.metrics = metrics or Metrics(enabled=False)
+        self.label = label or (lambda tid, cls, conf: f"{model.names[cls]} #{tid} {conf:.2f}")
+        self.last_boxes = []  # (tid, x1, y1, x2, y2, cls, conf) จากการรัน YOLO ครั้งล่าสุด ใช้วาดซ้ำในเฟรมที่ข้าม
+
+    def infer(self, frame):
+        """รัน YOLO เฉพาะพื้นที่ถนน คืน (result, offset) หรือ None ถ้า gate ให้ข้ามเฟรมนี้"""
+        img, offset = self.roi.crop(frame) if self.roi else (frame, (0, 0))
+        if not self.gate.should_run(img):
+            self.metrics.inc("skipped_frames_total")
+            return None
+        t0 = time.time()
+        with self.metrics.stage("inference"):
+            result = self.model.track(img, persist=True, classes=VEHICLE_CLASSES, verbose=False)[0]
+        self.gate.record(time.time() - t0)
+        return result, offset
+
+    def postprocess(self, inferred):
+        """กล่องของเฟรมนี้ -> เหตุการณ์ entered / left (ส่งเข้า sink และ announce แล้ว) คืนเหตุการณ์ใหม่"""
+        if inferred is None:
+            return []
+        result, offset = inferred
+        with self.metrics.stage("tracking"):
+            boxes = result.boxes
+            dets = []
+            if boxes.id is not None:
+                dets = [(*box, tid, cls, conf) for box, tid, cls, conf in zip(
+                    boxes.xyxy.tolist(), boxes.id.int().tolist(), boxes.cls.int().tolist(), boxes.conf.tolist())]
+                if self.roi:
+                    dets = self.roi.to_frame(dets, offset)  # พิกัดภาพเต็ม และตัดกล่องนอกพื้นที่ถนน
+            self.last_boxes = [(tid, int(x1), int(y1), int(x2), int(y2), cls, conf)
+                               for x1, y1, x2, y2, tid, cls, conf in dets]
+            new_events = self.events.update([b[0] for b in self.last_boxes], [b[1:5] for b in self.last_boxes],
+                                            [b[5] for b in self.last_boxes])
+        with self.metrics.stage("events"):
+            self.emit(new_events)
+        return new_events
+
+    def step(self, frame):
+        return self.postprocess(self.infer(frame))
+
+    def emit(self, events):
+        for ev in events:
+            if self.sink is not None:
+                self.sink.emit(vehicle_event(ev))  # เขียนลงดิสก์ในเธรดแยก
+            if self.announce is not None and ev["type"] == "entered":
+                self.announce(ev)
+        self.metrics.inc("events_total", len(events))
+
+    def draw(self, frame):
+        for tid, x1, y1, x2, y2, cls, conf in self.last_boxes:
+            cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
+            cv2.putText(frame, self.label(tid, cls, conf), (x1, y1 - 10),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
+        if self.events.line:
+            cv2.line(frame, self.events.line[0], self.events.line[1], (0, 255, 255), 2)
+        if self.roi:
+            self.roi.draw(frame)
+        return frame
+
+    def close(self):
+        """ปิดทุก track ที่ค้างอยู่ (ส่ง left เข้า sink ด้วย) คืนเหตุการณ์เหล่านั้น"""
+        events = self.events.flush()
+        self.emit(events)
+        return events
@@ -0,0 +1,96 @@
+import time
+
+
+def _side(line, point):
+    """ฝั่งของจุดเทียบกับเส้น (บวก/ลบ/ศูนย์) จาก cross product"""
+    (x1, y1), (x2, y2) = line
+    px, py = point
+    d = (x2 - x1) * (py - y1) - (y2 - y1) * (px - x1)
+    return (d > 0) - (d < 0)
+
+
+class _Track:
+    __slots__ = ("tid", "cls", "first_seen", "last_seen", "last_update", "side", "entered")
+
+    def __init__(self, tid, cls, now, update_no, side):
+        self.tid = tid
+        self.cls = cls
+        self.first_seen = now
+        self.last_seen = now
+        self.last_update = update_no
+        self.side = side
+        self.entered = False
+
+
+# ----------------------------- #
+# แปลงผล track รายเฟรม เป็นเหตุการณ์รายคัน
+# ----------------------------- #
+class VehicleEventTracker:
+    """ให้รถแต่ละ track id เกิดเหตุการณ์ "entered" หนึ่งครั้ง และ "left" หนึ่งครั้ง
+
+    ถ้าไม่กำหนด line: entered เมื่อเห็น id ครั้งแรก, left เมื่อ id หายไปเกิน lost_after รอบ
+    (เวลาของ left คือครั้งสุดท้ายที่เห็นรถ ไม่ใช่ตอนที่ครบ lost_after ซึ่งอาจช้ากว่ามากเมื่อ gate ข้ามเฟรม)
+    ถ้ากำหนด line ((x1, y1), (x2, y2)): entered เมื่อจุดกึ่งกลางล่างของกล่องข้ามเส้น
+    (นับเฉพาะรถที่ข้ามเส้น) และ left เมื่อรถคันนั้นหายไป
+
+    งานต่อรอบเป็น O(จำนวนรถที่กำลังติดตาม) ไม่ขึ้นกับว่ารถอยู่ในภาพนานแค่ไหน
+    """
+
+    def __init__(self, line=None, lost_after=30):
+        self.line = line
+        self.lost_after = lost_after  # จำนวนรอบ update ที่ไม่เห็น id ก่อนถือว่าออกไปแล้ว
+        self.active = {}  # track id -> _Track
+        self.updates = 0
+        self.total_entered = 0
+
+    def _anchor(self, box):
+        x1, y1, x2, y2 = box[:4]
+        return ((x1 + x2) / 2.0, y2)  # จุดกึ่งกลางขอบล่าง (ล้อรถ)
+
+    def _event(self, kind, track, now, **extra):
+        event = {"type": kind, "id": track.tid, "cls": track.cls, "time": now}
+        if kind == "left":
+            event["duration"] = track.last_seen - track.first_seen
+        event.update(extra)
+        return event
+
+    def update(self, ids, boxes, classes, now=None):
+        """รับ track id, กล่อง (x1, y1, x2, y2) และคลาสของเฟรมนี้ คืนรายการเหตุการณ์ใหม่"""
+        now = time.time() if now is None else now
+        self.updates += 1
+        events = []
+
+        for tid, box, cls in zip(ids, boxes, classes):
+            tid = int(tid)
+            side = _side(self.line, self._anchor(box)) if self.line else 0
+            track = self.active.get(tid)
+            if track is None:
+                track = _Track(tid, int(cls), now, self.updates, side)
+                self.active[tid] = track
+                if self.line is None:
+                    track.entered = True
+                    self.total_entered += 1
+                    events.append(self._event("entered", track, now))
+                continue
+
+            track.last_seen = now
+            track.last_update = self.updates
+            if self.line and not track.entered and side != 0 and track.side != 0 and side != track.side:
+                track.entered = True
+                self.total_entered += 1
+                events.append(self._event("entered", track, now, direction=side))
+            if side != 0:
+                track.side = side
+
+        # รถที่หายไปนานเกินกำหนด
+        for tid in [t for t, tr in self.active.items() if self.updates - tr.last_update > self.lost_after]:
+            track = self.active.pop(tid)
+            if track.entered:
+                events.append(self._event("left", track, track.last_seen))
+        return events
+
+    def flush(self):
+        """ปิดทุก track ที่ยังค้างอยู่ (เช่น ตอนจบวิดีโอ) แล้วคืนเหตุการณ์ left"""
+        events = [self._event("left", tr, tr.last_seen) for tr in self.active.values() if tr.entered]
+        self.active.clear()
+        return events
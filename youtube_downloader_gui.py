@@ -2,48 +2,89 @@
 youtube_downloader_dark.py
 Modern Dark UI (black-white theme) for downloading YouTube via yt-dlp.
 Features:
- - MP4 / MP3
+ - MP4 / MP3 / M4A
  - Quality select (360p/720p/1080p/best)
- - FFmpeg auto-detection (or set FFMPEG_PATH)
- - Progress bar with realtime updates
+ - FFmpeg auto-detection, done once (or set FFMPEG_PATH)
+ - Progress bar with realtime updates (coalesced per job, at most PROGRESS_INTERVAL apart)
+ - Download queue: many URLs, N concurrent workers, one status row per job
+ - Playlist / channel links are expanded into one job per video (with title filter)
+ - Video metadata cached on disk (METADATA_CACHE) so retries skip extraction
+ - Cancel aborts the transfer and deletes partial files; interrupted downloads resume
+   from .part files; DOWNLOAD_ARCHIVE skips videos that were already downloaded
+ - Concurrent fragments per job, video+audio fetched in parallel, and a global
+   speed / connection cap shared by all jobs (see bandwidth.py, download_bench.py)
+ - Merging and audio conversion run in a separate ffmpeg pool (one worker per CPU core),
+   so the next download starts while the previous one converts; streams whose codec
+   already fits the target are copied instead of re-encoded (see postprocess.py)
  - Non-blocking (uses threading)
 Requirements:
  - pip install yt-dlp
  - ffmpeg (recommended for mp3 or merging high-res mp4)
 """
 
+import copy
+import glob
+import itertools
 import os
-import shutil
 import threading
+import time
 import queue
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 import yt_dlp
+from yt_dlp.utils import make_archive_id, prepend_extension
+
+from bandwidth import BandwidthScheduler
+from postprocess import Cancelled, PostProcessPool, PostTask, find_ffmpeg
+from yt_metadata import MetadataCache, expand
 
 # ---------- USER CONFIG ----------
 # If ffmpeg is NOT in PATH, set full path here (windows example):
 FFMPEG_PATH = r"C:\ffmpeg\bin\ffmpeg.exe"  # <--- edit if needed, or set to "" to rely on PATH
+# number of downloads running at the same time (can be changed in the UI)
+DEFAULT_WORKERS = 3
+# video metadata cache (title / formats / chosen format); YouTube format URLs expire after ~6h
+METADATA_CACHE = ".yt_metadata.db"
+METADATA_TTL = 5 * 3600
+# list of finished video IDs, kept in each save folder (set to "" to disable)
+DOWNLOAD_ARCHIVE = "download_archive.txt"
+# minimum seconds between two progress updates of the same job
+PROGRESS_INTERVAL = 0.25
+# transfer settings (all can be changed in the UI)
+DEFAULT_FRAGMENTS = 4      # DASH/HLS fragments downloaded at once per stream
+MAX_CONNECTIONS = 16       # connections across all jobs
+RATE_LIMIT_MBPS = 0        # MB/s across all jobs, 0 = unlimited
+PARALLEL_STREAMS = True    # fetch video and audio of merged formats at the same time
+# ffmpeg merges / conversions running at the same time, 0 = one per CPU core
+POST_WORKERS = 0
 # ---------------------------------
 
 # If user provided explicit path, inform yt-dlp about it:
 if FFMPEG_PATH and os.path.isfile(FFMPEG_PATH):
     yt_dlp.utils.DEFAULT_FFMPEG_LOCATION = FFMPEG_PATH
 
-# helper to detect ffmpeg availability
+# helper to detect ffmpeg availability (looked up once, then remembered)
 def ffmpeg_available():
-    if FFMPEG_PATH and os.path.isfile(FFMPEG_PATH):
-        return True
-    return shutil.which("ffmpeg") is not None
-
-# queue for progress updates from background thread to UI thread
-progress_q = queue.Queue()
+    return find_ffmpeg(FFMPEG_PATH) is not None
 
-# global control for cancellation
-_cancel_download = threading.Event()
+# audio-only formats and the file extension they are converted to
+AUDIO_EXT = {'MP3': '.mp3', 'M4A': '.m4a'}
 
 # ---------- Download logic ----------
-def make_ydl_opts(save_folder, fmt, quality):
-    opts = {'outtmpl': os.path.join(save_folder, '%(title)s.%(ext)s')}
+def make_ydl_opts(save_folder, fmt, quality, job, scheduler=None, fragments=1):
+    """job: the DownloadJob; the hook reports progress with job.stream_progress()
+    and aborts the transfer once job.cancel_event is set.
+    scheduler: shared BandwidthScheduler; the hook waits there when all jobs together exceed the cap"""
+    opts = {
+        'outtmpl': os.path.join(save_folder, '%(title)s.%(ext)s'),
+        # resume from .part files left by an interrupted run, and retry dropped connections
+        'continuedl': True,
+        'retries': 10,
+        'fragment_retries': 10,
+        'concurrent_fragment_downloads': max(1, fragments),
+    }
+    if DOWNLOAD_ARCHIVE:
+        opts['download_archive'] = os.path.join(save_folder, DOWNLOAD_ARCHIVE)
     # ensure yt-dlp uses ffmpeg location (if provided)
     if FFMPEG_PATH and os.path.isfile(FFMPEG_PATH):
         opts['ffmpeg_location'] = FFMPEG_PATH
@@ -51,36 +92,41 @@ def make_ydl_opts(save_folder, fmt, quality):
     # add progress hook to report to UI
     def progress_hook(d):
         # d is dict with fields: status, total_bytes, downloaded_bytes, etc.
-        # put minimal info into queue
-        try:
-            # status can be "downloading", "finished", "error"
-            status = d.get('status')
-            if status == 'downloading':
-                # prefer percent if available
-                percent = None
-                if d.get('downloaded_bytes') and d.get('total_bytes'):
-                    try:
-                        percent = d['downloaded_bytes'] / d['total_bytes'] * 100.0
-                    except Exception:
-                        percent = None
-                # sometimes 'progress' key exists with 'pct' -- but not always
-                progress_q.put(('downloading', percent, d))
-            elif status == 'finished':
-                progress_q.put(('finished', 100.0, d))
-            elif status == 'error':
-                progress_q.put(('error', 0.0, d))
-        except Exception as ex:
-            progress_q.put(('error', 0.0, {'error': str(ex)}))
+        if d.get('tmpfilename'):
+            job.partial_files[d['tmpfilename']] = d.get('filename')
+        if job.cancel_event.is_set():
+            # raised inside the download loop: yt-dlp stops reading and re-raises it to download_worker
+            raise yt_dlp.utils.DownloadCancelled('cancelled by user')
+        # called for every chunk (from several threads when streams / fragments run in parallel):
+        # keep only a few numbers per stream; errors are reported by download_worker when yt-dlp raises
+        status = d.get('status')
+        stream = (d.get('info_dict') or {}).get('format_id') or d.get('filename')
+        if status == 'downloading':
+            received = job.stream_progress(stream, d.get('downloaded_bytes') or 0,
+                                           d.get('total_bytes') or d.get('total_bytes_estimate'),
+                                           d.get('speed'), d.get('eta'))
+            if scheduler is not None:
+                scheduler.consume(received)
+        elif status == 'finished':
+            # one stream is done (video and audio are separate streams before merging)
+            size = d.get('total_bytes') or d.get('downloaded_bytes') or 0
+            job.stream_progress(stream, size, size, None, None, finished=True)
+
+    def postprocessor_hook(d):
+        # ffmpeg itself cannot be interrupted, but stop before the next step
+        if job.cancel_event.is_set():
+            raise yt_dlp.utils.DownloadCancelled('cancelled by user')
 
     opts['progress_hooks'] = [progress_hook]
+    opts['postprocessor_hooks'] = [postprocessor_hook]
 
-    if fmt == 'MP3':
-        # convert to mp3 using ffmpeg (requires ffmpeg)
+    if fmt in AUDIO_EXT:
+        # convert to mp3 / m4a using ffmpeg (requires ffmpeg); m4a sources need no re-encoding for M4A
         opts.update({
-            'format': 'bestaudio/best',
+            'format': 'bestaudio[ext=m4a]/bestaudio/best' if fmt == 'M4A' else 'bestaudio/best',
             'postprocessors': [{
                 'key': 'FFmpegExtractAudio',
-                'preferredcodec': 'mp3',
+                'preferredcodec': fmt.lower(),
                 'preferredquality': '192',
             }],
             # prefer ffmpeg if set
@@ -102,7 +148,7 @@ def make_ydl_opts(save_folder, fmt, quality):
     # Safety: if ffmpeg not available and user requested merged formats, tell yt-dlp to avoid merging
     if not ffmpeg_available():
         # For MP3 -> cannot convert without ffmpeg; we will fallback to downloading best audio and rename (may be .webm/.m4a)
-        if fmt == 'MP3':
+        if fmt in AUDIO_EXT:
             # do not include postprocessor if no ffmpeg; user will get source audio (m4a/webm)
             # but to keep consistent, keep postprocessor but yt-dlp will fail; so better to remove
             opts.pop('postprocessors', None)
@@ -123,30 +169,424 @@ def make_ydl_opts(save_folder, fmt, quality):
                 opts['format'] = 'best[ext=mp4]'
     return opts
 
-def download_worker(url, save_folder, fmt, quality):
-    """background thread target: perform download and push progress updates to queue"""
-    _cancel_download.clear()
+class DownloadJob:
+    """one URL in the download queue, with its own progress channel and cancel token"""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, url, save_folder, fmt, quality, title=None, video_id=None, ie_key=None):
+        self.id = next(self._ids)
+        self.url = url
+        self.title = title or url
+        self.video_id = video_id
+        self.ie_key = ie_key  # extractor of video_id (e.g. 'Youtube'), for the download archive
+        self.save_folder = save_folder
+        self.fmt = fmt
+        self.quality = quality
+        # latest progress only (written by the worker, read by the UI)
+        self.status = 'queued'  # queued / downloading / finished / processing / complete / error / cancelled
+        self.downloaded = 0
+        self.total = None
+        self.speed = None
+        self.eta = None
+        self.message = ''
+        self.on_change = None  # set by DownloadManager: marks the job for the next UI refresh
+        self._streams = {}  # format id -> (downloaded, total, speed, eta, finished)
+        self._last_report = 0.0
+        self._lock = threading.Lock()
+        self.cancel_event = threading.Event()
+        self.partial_files = {}  # .part file -> final file name, for files written by this job (deleted on cancel)
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def report(self, status, downloaded=None, total=None, speed=None, eta=None, message=''):
+        """overwrite the job's progress; the UI only ever sees the latest state"""
+        with self._lock:
+            self.status = status
+            if downloaded is not None:
+                self.downloaded = downloaded
+            if total is not None:
+                self.total = total
+            self.speed = speed
+            self.eta = eta
+            self.message = message
+            self._last_report = time.monotonic()
+        if self.on_change is not None:
+            self.on_change(self)
+
+    def stream_progress(self, stream, downloaded, total, speed, eta, finished=False):
+        """record one stream's progress (video / audio may run at the same time) and publish the
+        sum at most every PROGRESS_INTERVAL; returns the bytes received since the previous call"""
+        with self._lock:
+            prev = self._streams.get(stream)
+            received = downloaded - prev[0] if prev else 0  # first call may include resumed bytes
+            self._streams[stream] = (downloaded, total, 0 if finished else speed, eta, finished)
+            streams = list(self._streams.values())
+            self.downloaded = sum(st[0] for st in streams)
+            self.total = sum(st[1] for st in streams) if all(st[1] for st in streams) else None
+            self.speed = sum(st[2] or 0 for st in streams)
+            etas = [st[3] for st in streams if st[3] is not None and not st[4]]
+            self.eta = max(etas) if etas else None
+            self.status = 'finished' if all(st[4] for st in streams) else 'downloading'
+            self.message = ''
+            now = time.monotonic()
+            due = finished or now - self._last_report >= PROGRESS_INTERVAL
+            if due:
+                self._last_report = now
+        if due and self.on_change is not None:
+            self.on_change(self)
+        return max(0, received)
+
+    def snapshot(self):
+        with self._lock:
+            return self.status, self.downloaded, self.total, self.speed, self.eta, self.message
+
+    @property
+    def percent(self):
+        if self.status in ('complete', 'finished', 'processing'):
+            return 100.0
+        if not self.total:
+            return 0.0
+        return min(100.0, self.downloaded * 100.0 / self.total)
+
+    def remove_partial_files(self):
+        for tmp, filename in self.partial_files.items():
+            # the .part file, fragments of DASH/HLS downloads and the resume state, which
+            # yt-dlp names after the final file (x.mp4.ytdl, not x.mp4.part.ytdl)
+            filename = filename or os.path.splitext(tmp)[0]
+            for path in [tmp, filename + '.ytdl'] + glob.glob(glob.escape(tmp) + '-Frag*'):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+        self.partial_files.clear()
+
+    @property
+    def done(self):
+        return self.status in ('complete', 'error', 'cancelled')
+
+
+def extract_video(ydl, job, cache):
+    """raw (unprocessed) info for the job's video: from the cache if fresh, else from the extractor"""
+    info = cache.get(job.video_id) if (cache is not None and job.video_id) else None
+    if info is not None:
+        return info, True
+    info = ydl.extract_info(job.url, download=False, process=False)
+    if info.get('_type', 'video') == 'video' and info.get('id'):
+        job.video_id = info['id']
+        job.ie_key = info.get('extractor_key') or job.ie_key
+        if cache is not None:
+            cache.put(info['id'], ydl.sanitize_info(info, remove_private_keys=True))
+    return info, False
+
+
+def pin_format(ydl, cache, job, spec):
+    """on a cache hit, select the format id this spec resolved to last time (the same streams
+    an earlier, interrupted attempt left .part files for); falls back to spec if that id is gone"""
+    chosen = cache.chosen(job.video_id, spec) if (cache is not None and job.video_id) else None
+    if chosen and chosen != spec:
+        ydl.format_selector = ydl.build_format_selector(f"{chosen}/{spec}")
+
+
+def download_streams(ydl, resolved, parallel=True):
+    """download every requested format of a resolved info dict, without merging or converting;
+    returns [{'path', 'vcodec', 'acodec'}] for the post-processing step
+
+    files get the names yt-dlp itself would use (title.f137.mp4, title.f140.m4a), so a
+    process_ie_result call that follows finds them already downloaded and only merges.
+    A single format is named the same way, so it never collides with the converted output
+    (title.f140.m4a -> title.m4a)
+    """
+    root = os.path.splitext(ydl.prepare_filename(resolved))[0]
+    items = []
+    for f in resolved.get('requested_formats') or [resolved]:
+        stream_info = dict(resolved)
+        stream_info.pop('requested_formats', None)
+        stream_info.update(f)
+        items.append((prepend_extension(f"{root}.{f['ext']}", f"f{f['format_id']}", f['ext']), stream_info))
+    if parallel and len(items) > 1:
+        errors = []
+
+        def fetch(fname, stream_info):
+            try:
+                ydl.dl(fname, stream_info)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=fetch, args=item, daemon=True) for item in items]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        if errors:
+            raise errors[0]
+    else:
+        for fname, stream_info in items:
+            ydl.dl(fname, stream_info)
+    return [{'path': fname, 'vcodec': stream_info.get('vcodec'), 'acodec': stream_info.get('acodec')}
+            for fname, stream_info in items]
+
+
+def fetch_streams(ydl, info):
+    """download the video and audio streams of a merged format at the same time"""
+    resolved = ydl.process_ie_result(info, download=False)
+    if len(resolved.get('requested_formats') or []) < 2 or os.path.exists(ydl.prepare_filename(resolved)):
+        return
+    download_streams(ydl, resolved)
+
+
+def fetch_video(ydl, info, job, parallel_streams=False, deferred=False):
+    """download one video; returns (result info, PostTask or None)
+
+    deferred: leave yt-dlp's ffmpeg step (merge / audio conversion) out and return it as a
+    PostTask for the post-processing pool; None when nothing is left for ffmpeg to do
+    (a single progressive MP4, or the output file exists already)
+    """
+    if not deferred:
+        if parallel_streams:
+            fetch_streams(ydl, copy.deepcopy(info))
+        return ydl.process_ie_result(info, download=True), None
+    resolved = ydl.process_ie_result(copy.deepcopy(info), download=False)
+    if job.fmt in AUDIO_EXT:
+        output = os.path.splitext(ydl.prepare_filename(resolved))[0] + AUDIO_EXT[job.fmt]
+    elif len(resolved.get('requested_formats') or []) >= 2:
+        output = ydl.prepare_filename(resolved)
+    else:
+        return ydl.process_ie_result(info, download=True), None
+    if os.path.exists(output):
+        record_archive(job.save_folder, resolved)  # as yt-dlp does for "has already been downloaded"
+        return resolved, None
+    inputs = download_streams(ydl, resolved, parallel_streams)
+    return resolved, PostTask(inputs, output, job.cancel_event)
+
+
+_archive_lock = threading.Lock()
+
+
+def record_archive(save_folder, info):
+    """what yt-dlp does after a download, for videos finished by the post-processing pool"""
+    if not DOWNLOAD_ARCHIVE or not info.get('id') or not info.get('extractor_key'):
+        return
+    with _archive_lock, open(os.path.join(save_folder, DOWNLOAD_ARCHIVE), 'a', encoding='utf-8') as f:
+        f.write(make_archive_id(info['extractor_key'], info['id']) + '\n')
+
+
+def submit_postprocess(post, job, task, info):
+    """hand the job's ffmpeg step to the pool; the pool reports the job's final status"""
+    def started(task):
+        job.report('processing', message='Merging...' if job.fmt == 'MP4' else f'Converting to {job.fmt}...')
+
+    def done(task, plan, error):
+        if isinstance(error, Cancelled) or (error is not None and job.cancel_event.is_set()):
+            job.report('cancelled', message='Cancelled')
+        elif error is not None:
+            # downloaded streams are kept, so a retry only runs ffmpeg again
+            job.report('error', message=f'ffmpeg: {error}')
+        else:
+            record_archive(job.save_folder, info)
+            steps = ', '.join(f'{kind} {how}' for kind, how in plan.items())
+            job.report('complete', message=f'Complete ✅ ({steps})' if steps else 'Complete ✅')
+
+    job.report('processing', message='Waiting for ffmpeg...')
+    post.submit(task, on_start=started, on_done=done)
+
+
+def download_worker(job, cache=None, scheduler=None, post=None):
+    """run one job on the calling worker thread and report progress into the job
+
+    post: PostProcessPool; when given, merging / audio conversion is queued there and
+    this thread is free for the next download as soon as the transfer is done"""
+    if job.cancel_event.is_set():
+        job.report('cancelled', message='Cancelled')
+        return
+    # connections this job would like: fragments per stream x streams (video + audio)
+    parallel = bool(scheduler is not None and scheduler.parallel_streams and job.fmt == 'MP4'
+                    and ffmpeg_available())
+    streams = 2 if parallel else 1
+    want = streams * (scheduler.fragments if scheduler is not None else 1)
+    if scheduler is not None:
+        job.report('queued', message='Waiting for a connection...')
+        granted = scheduler.acquire(want, job.cancel_event)
+    else:
+        granted = want
     try:
-        ydl_opts = make_ydl_opts(save_folder, fmt, quality)
-
-        # Info: yt_dlp may call progress hooks from same thread; those hooks push to progress_q
+        if job.cancel_event.is_set():
+            raise yt_dlp.utils.DownloadCancelled('cancelled by user')
+        job.report('downloading', message='Starting download...')
+        ydl_opts = make_ydl_opts(job.save_folder, job.fmt, job.quality, job, scheduler,
+                                 fragments=max(1, granted // streams))
+        deferred = post is not None and ffmpeg_available()
+        if deferred:
+            ydl_opts.pop('postprocessors', None)  # converted by the pool instead
+
+        # Info: yt_dlp calls progress hooks from this thread; those hooks call job.stream_progress
         with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            ydl.download([url])
-
+            if job.video_id and job.ie_key and ydl.in_download_archive({'id': job.video_id, 'ie_key': job.ie_key}):
+                # already in the archive: no extraction, no request at all
+                job.report('complete', message='Already downloaded ✅')
+                return
+            info, cached = extract_video(ydl, job, cache)
+            if cached:
+                pin_format(ydl, cache, job, ydl_opts['format'])
+            try:
+                result, task = fetch_video(ydl, info, job, parallel, deferred)
+            except yt_dlp.utils.DownloadError:
+                if not cached:
+                    raise
+                # cached format URLs may have expired: extract again once
+                cache.invalidate(job.video_id)
+                ydl.format_selector = ydl.build_format_selector(ydl_opts['format'])
+                info, _ = extract_video(ydl, job, cache)
+                result, task = fetch_video(ydl, info, job, parallel, deferred)
+            if cache is not None and job.video_id and result:
+                cache.set_chosen(job.video_id, ydl_opts['format'], result.get('format_id'))
+
+        if task is not None:
+            submit_postprocess(post, job, task, result)
+            return
         # finished (ensure final update)
-        progress_q.put(('complete', 100.0, {'msg': 'done'}))
+        job.report('complete', message='Complete ✅')
+    except yt_dlp.utils.DownloadCancelled:
+        job.remove_partial_files()
+        job.report('cancelled', message='Cancelled')
     except Exception as e:
-        progress_q.put(('error', 0.0, {'error': str(e)}))
+        if job.cancel_event.is_set():
+            # cancelled while yt-dlp was wrapping another error
+            job.remove_partial_files()
+            job.report('cancelled', message='Cancelled')
+        else:
+            # keep .part files so the next attempt resumes where this one stopped
+            job.report('error', message=str(e))
+    finally:
+        if scheduler is not None and granted:
+            scheduler.release(granted)
+
+
+class DownloadManager:
+    """queue of DownloadJob run by a pool of worker threads (size can change while running)
+
+    add() expands playlists / channels in a background thread; new jobs are announced
+    on self.events as ('added', job) or ('expand_error', url, message).
+    Jobs whose progress changed are collected in a set; take_changed() hands them to the UI,
+    so many updates of one job between two refreshes cost a single row update.
+    Finished downloads that need ffmpeg are handed to post (a PostProcessPool) and no longer hold a worker.
+    """
+
+    def __init__(self, workers=DEFAULT_WORKERS, cache=None, scheduler=None, post=None):
+        self.cache = cache
+        self.scheduler = scheduler
+        self.post = post
+        self.events = queue.Queue()
+        self.expanding = 0  # links still being read
+        self.jobs = []  # every submitted job, in submit order
+        self._pending = queue.Queue()
+        self._lock = threading.Lock()
+        self._threads = []
+        self._target = 0
+        self._changed = set()
+        self._changed_lock = threading.Lock()
+        self.resize(workers)
+
+    def _mark_changed(self, job):
+        with self._changed_lock:
+            self._changed.add(job)
+
+    def take_changed(self):
+        with self._changed_lock:
+            changed, self._changed = self._changed, set()
+        return changed
+
+    def throughput(self):
+        """total bytes/s of all jobs currently downloading"""
+        return sum(job.speed or 0 for job in list(self.jobs) if job.status == 'downloading')
+
+    def submit(self, url, save_folder, fmt, quality, title=None, video_id=None, ie_key=None):
+        job = DownloadJob(url, save_folder, fmt, quality, title=title, video_id=video_id, ie_key=ie_key)
+        job.on_change = self._mark_changed
+        self.jobs.append(job)
+        self.events.put(('added', job))  # before the job can start, so its row exists first
+        self._pending.put(job)
+        return job
+
+    def add(self, url, save_folder, fmt, quality, title_filter=""):
+        """expand url (video / playlist / channel) and submit one job per matching video"""
+        threading.Thread(target=self._expand, args=(url, save_folder, fmt, quality, title_filter),
+                         daemon=True).start()
+
+    def _expand(self, url, save_folder, fmt, quality, title_filter):
+        needle = title_filter.strip().lower()
+        with self._lock:
+            self.expanding += 1
+        try:
+            with yt_dlp.YoutubeDL({'quiet': True, 'no_warnings': True}) as ydl:
+                entries = expand(ydl, url, self.cache)
+            for entry in entries:
+                if needle and needle not in (entry['title'] or '').lower():
+                    continue
+                self.submit(entry['url'], save_folder, fmt, quality, title=entry['title'], video_id=entry['id'],
+                            ie_key=entry['ie_key'])
+        except Exception as e:
+            self.events.put(('expand_error', url, str(e)))
+        finally:
+            with self._lock:
+                self.expanding -= 1
+
+    def cancel(self, job_id):
+        for job in self.jobs:
+            if job.id == job_id and not job.done:
+                job.cancel()
+
+    def cancel_all(self):
+        for job in self.jobs:
+            if not job.done:
+                job.cancel()
+
+    def resize(self, workers):
+        """grow immediately; extra workers exit after finishing their current job"""
+        with self._lock:
+            self._target = max(1, int(workers))
+            self._threads = [t for t in self._threads if t.is_alive()]
+            while len(self._threads) < self._target:
+                t = threading.Thread(target=self._run, daemon=True)
+                self._threads.append(t)
+                t.start()
+
+    def _run(self):
+        me = threading.current_thread()
+        while True:
+            with self._lock:
+                if len(self._threads) > self._target:
+                    self._threads.remove(me)
+                    return
+            try:
+                job = self._pending.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            download_worker(job, self.cache, self.scheduler, self.post)
+
+def fmt_bytes(n):
+    n = float(n or 0)
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if n < 1024 or unit == 'GB':
+            return f"{n:.0f} {unit}" if unit == 'B' else f"{n:.1f} {unit}"
+        n /= 1024
+
 
 # ---------- UI ----------
 class DarkApp(tk.Tk):
     def __init__(self):
         super().__init__()
         self.title("YouTube Downloader — Dark (Black/White theme)")
-        self.geometry("620x360")
+        self.geometry("760x600")
         self.configure(bg="#0f0f10")  # dark background
-        self.resizable(False, False)
-        self._worker = None
+        self.minsize(620, 480)
+        self.scheduler = BandwidthScheduler(rate_limit=RATE_LIMIT_MBPS * 2**20, max_connections=MAX_CONNECTIONS,
+                                            fragments=DEFAULT_FRAGMENTS, parallel_streams=PARALLEL_STREAMS)
+        ffmpeg = find_ffmpeg(FFMPEG_PATH)
+        self.post = PostProcessPool(ffmpeg, POST_WORKERS or None) if ffmpeg else None
+        self.manager = DownloadManager(DEFAULT_WORKERS, MetadataCache(METADATA_CACHE, ttl=METADATA_TTL),
+                                       self.scheduler, self.post)
 
         self.style = ttk.Style(self)
         # set ttk theme default and customizations
@@ -162,6 +602,10 @@ class DarkApp(tk.Tk):
         self.style.map("TButton",
                        background=[('active', '#f2f2f2'), ('!disabled', '#ffffff')],
                        foreground=[('active', '#111111'), ('!disabled', '#111111')])
+        self.style.configure("Treeview", background="#1b1b1b", fieldbackground="#1b1b1b",
+                             foreground="#e6e6e6", rowheight=22, font=("Segoe UI", 9))
+        self.style.configure("Treeview.Heading", font=("Segoe UI", 9, "bold"))
+        self.style.configure("TCheckbutton", background="#0f0f10", foreground="#e6e6e6", font=("Segoe UI", 10))
 
         # top frame (header)
         header = tk.Frame(self, bg="#0f0f10")
@@ -174,15 +618,16 @@ class DarkApp(tk.Tk):
 
         # main card
         card = tk.Frame(self, bg="#151515", bd=0, relief="flat")
-        card.pack(padx=18, pady=8, fill="both", expand=False)
+        card.pack(padx=18, pady=8, fill="both", expand=True)
 
         # input row
         row1 = tk.Frame(card, bg="#151515")
         row1.pack(fill="x", padx=14, pady=(14,8))
 
-        lbl = ttk.Label(row1, text="Link (YouTube):")
+        lbl = ttk.Label(row1, text="Links (YouTube videos, playlists or channels, one per line):")
         lbl.pack(anchor="w")
-        self.url_entry = ttk.Entry(row1, width=72)
+        self.url_entry = tk.Text(row1, height=4, width=72, bg="#1b1b1b", fg="#e6e6e6",
+                                 insertbackground="#e6e6e6", relief="flat", font=("Segoe UI", 10))
         self.url_entry.pack(fill="x", pady=6)
         self.url_entry.focus()
 
@@ -193,7 +638,7 @@ class DarkApp(tk.Tk):
         # format
         fmt_lbl = ttk.Label(row2, text="Format:")
         fmt_lbl.grid(row=0, column=0, sticky="w")
-        self.format_cb = ttk.Combobox(row2, values=["MP4", "MP3"], width=8, state="readonly")
+        self.format_cb = ttk.Combobox(row2, values=["MP4", "MP3", "M4A"], width=8, state="readonly")
         self.format_cb.set("MP4")
         self.format_cb.grid(row=1, column=0, padx=(0,6), pady=6, sticky="w")
 
@@ -213,16 +658,70 @@ class DarkApp(tk.Tk):
         self.browse_btn = ttk.Button(row2, text="Browse", command=self.select_folder)
         self.browse_btn.grid(row=1, column=3, padx=(8,6), sticky="w")
 
+        # concurrent downloads
+        workers_lbl = ttk.Label(row2, text="Parallel:")
+        workers_lbl.grid(row=0, column=4, sticky="w", padx=(12,0))
+        self.workers_var = tk.IntVar(value=DEFAULT_WORKERS)
+        self.workers_sb = ttk.Spinbox(row2, from_=1, to=16, width=4, textvariable=self.workers_var,
+                                      command=self.apply_workers)
+        self.workers_sb.grid(row=1, column=4, padx=(12,0), pady=6, sticky="w")
+
+        # playlist filter: only queue videos whose title contains this text
+        filter_lbl = ttk.Label(row2, text="Only titles containing:")
+        filter_lbl.grid(row=2, column=0, columnspan=2, sticky="w")
+        self.filter_var = tk.StringVar(value="")
+        self.filter_entry = ttk.Entry(row2, textvariable=self.filter_var, width=36)
+        self.filter_entry.grid(row=2, column=2, padx=(18,0), pady=(0,6), sticky="w")
+
+        # transfer settings (shared by all jobs, applied immediately)
+        row_net = tk.Frame(card, bg="#151515")
+        row_net.pack(fill="x", padx=14, pady=(0,8))
+        ttk.Label(row_net, text="Fragments/job:").pack(side="left")
+        self.fragments_var = tk.IntVar(value=DEFAULT_FRAGMENTS)
+        ttk.Spinbox(row_net, from_=1, to=32, width=4, textvariable=self.fragments_var,
+                    command=self.apply_transfer_settings).pack(side="left", padx=(4,12))
+        ttk.Label(row_net, text="Max connections:").pack(side="left")
+        self.connections_var = tk.IntVar(value=MAX_CONNECTIONS)
+        ttk.Spinbox(row_net, from_=1, to=128, width=4, textvariable=self.connections_var,
+                    command=self.apply_transfer_settings).pack(side="left", padx=(4,12))
+        ttk.Label(row_net, text="Speed limit MB/s (0 = none):").pack(side="left")
+        self.rate_var = tk.DoubleVar(value=RATE_LIMIT_MBPS)
+        ttk.Spinbox(row_net, from_=0, to=1000, increment=1, width=6, textvariable=self.rate_var,
+                    command=self.apply_transfer_settings).pack(side="left", padx=(4,12))
+        self.parallel_var = tk.BooleanVar(value=PARALLEL_STREAMS)
+        ttk.Checkbutton(row_net, text="Video+audio in parallel", variable=self.parallel_var,
+                        command=self.apply_transfer_settings).pack(side="left")
+
         # buttons row
         row3 = tk.Frame(card, bg="#151515")
         row3.pack(fill="x", padx=14, pady=(4,10))
 
-        self.download_btn = ttk.Button(row3, text="⬇️ Download", command=self.start_download)
+        self.download_btn = ttk.Button(row3, text="⬇️ Add to queue", command=self.start_download)
         self.download_btn.pack(side="left", padx=(0,8))
-        self.cancel_btn = ttk.Button(row3, text="✖ Cancel", command=self.cancel_download, state="disabled")
-        self.cancel_btn.pack(side="left")
-
-        # status and progress
+        self.cancel_btn = ttk.Button(row3, text="✖ Cancel selected", command=self.cancel_download)
+        self.cancel_btn.pack(side="left", padx=(0,8))
+        self.cancel_all_btn = ttk.Button(row3, text="✖ Cancel all", command=self.cancel_all)
+        self.cancel_all_btn.pack(side="left", padx=(0,8))
+        self.clear_btn = ttk.Button(row3, text="Clear finished", command=self.clear_finished)
+        self.clear_btn.pack(side="left")
+
+        # one row per job
+        jobs_frame = tk.Frame(card, bg="#151515")
+        jobs_frame.pack(fill="both", expand=True, padx=14, pady=(4,4))
+        self.jobs_view = ttk.Treeview(jobs_frame, columns=("url", "status", "progress"), show="headings", height=8)
+        self.jobs_view.heading("url", text="Title")
+        self.jobs_view.heading("status", text="Status")
+        self.jobs_view.heading("progress", text="%")
+        self.jobs_view.column("url", width=380)
+        self.jobs_view.column("status", width=180)
+        self.jobs_view.column("progress", width=60, anchor="e")
+        jobs_scroll = ttk.Scrollbar(jobs_frame, orient="vertical", command=self.jobs_view.yview)
+        self.jobs_view.configure(yscrollcommand=jobs_scroll.set)
+        self.jobs_view.pack(side="left", fill="both", expand=True)
+        jobs_scroll.pack(side="right", fill="y")
+        self.jobs_view.bind("<Double-1>", self.show_job_error)
+
+        # status and overall progress
         status_frame = tk.Frame(card, bg="#151515")
         status_frame.pack(fill="x", padx=14, pady=(6,14))
 
@@ -231,10 +730,11 @@ class DarkApp(tk.Tk):
 
         self.progress_var = tk.DoubleVar(value=0.0)
         self.progress = ttk.Progressbar(status_frame, orient="horizontal", length=520, mode="determinate", variable=self.progress_var, maximum=100)
-        self.progress.pack(pady=8)
+        self.progress.pack(fill="x", pady=8)
+        self._errors = {}  # job id -> error message (shown on double-click)
 
         # helper hint
-        hint = ttk.Label(self, text="Note: For MP3 or high-res MP4 merging, ffmpeg is required. If ffmpeg missing, will fallback to progressive MP4 (<=720p).", style="Small.TLabel")
+        hint = ttk.Label(self, text="Note: For MP3/M4A or high-res MP4 merging, ffmpeg is required. If ffmpeg missing, will fallback to progressive MP4 (<=720p).", style="Small.TLabel")
         hint.pack(padx=18, pady=(6,10))
 
         # start polling queue
@@ -246,8 +746,8 @@ class DarkApp(tk.Tk):
             self.folder_var.set(folder)
 
     def start_download(self):
-        url = self.url_entry.get().strip()
-        if not url:
+        urls = [u.strip() for u in self.url_entry.get("1.0", "end").splitlines() if u.strip()]
+        if not urls:
             messagebox.showwarning("Warning", "Please enter a YouTube URL.")
             return
 
@@ -259,53 +759,117 @@ class DarkApp(tk.Tk):
         fmt = self.format_cb.get()
         quality = self.quality_cb.get()
 
-        # disable UI controls while downloading
-        self.download_btn.config(state="disabled")
-        self.cancel_btn.config(state="normal")
-        self.status_label.config(text="Starting download...")
-        self.progress_var.set(0.0)
-        self.update_idletasks()
+        self.apply_workers()
+        self.apply_transfer_settings()
+        for url in urls:
+            # rows appear as soon as each link is expanded (see process_queue)
+            self.manager.add(url, save_path, fmt, quality, self.filter_var.get())
+        self.url_entry.delete("1.0", "end")
 
-        # start background thread
-        self._worker = threading.Thread(target=download_worker, args=(url, save_path, fmt, quality), daemon=True)
-        self._worker.start()
+    def apply_transfer_settings(self):
+        try:
+            self.scheduler.configure(fragments=max(1, self.fragments_var.get()),
+                                     max_connections=max(1, self.connections_var.get()),
+                                     rate_limit=max(0.0, self.rate_var.get()) * 2**20,
+                                     parallel_streams=self.parallel_var.get())
+        except (tk.TclError, ValueError):
+            pass  # spinbox is being edited / not a number yet
+
+    def apply_workers(self):
+        try:
+            self.manager.resize(self.workers_var.get())
+        except (tk.TclError, ValueError):
+            pass  # spinbox is being edited / not a number yet
 
     def cancel_download(self):
-        # yt-dlp doesn't expose a direct cancel; we can set a flag and rely on it in long ops.
-        # Simple approach: set cancel flag and notify user. (yt-dlp may not respond immediately)
-        _cancel_download.set()
-        self.status_label.config(text="Cancel requested... (may take a moment)")
-        self.cancel_btn.config(state="disabled")
+        # cancel every selected row; queued jobs are dropped before they start,
+        # running ones stop at the next chunk and delete their partial files
+        for iid in self.jobs_view.selection():
+            self.manager.cancel(int(iid))
+            job = self._job(int(iid))
+            if job is not None and not job.done:
+                self.jobs_view.set(iid, "status", "Cancel requested...")
+
+    def cancel_all(self):
+        self.manager.cancel_all()
+        self.status_label.config(text="Cancel requested for all jobs... (may take a moment)")
+
+    def clear_finished(self):
+        for job in [j for j in self.manager.jobs if j.done]:
+            self.manager.jobs.remove(job)
+            self._errors.pop(job.id, None)
+            if self.jobs_view.exists(str(job.id)):
+                self.jobs_view.delete(str(job.id))
+        self.update_summary()
+
+    def show_job_error(self, event):
+        iid = self.jobs_view.identify_row(event.y)
+        if iid and int(iid) in self._errors:
+            messagebox.showerror("Error", self._errors[int(iid)])
+
+    def _job(self, job_id):
+        for job in self.manager.jobs:
+            if job.id == job_id:
+                return job
+        return None
+
+    def update_job(self, job):
+        status, downloaded, total, speed, eta, message = job.snapshot()
+        if status == 'downloading' and not message:
+            text = f"{fmt_bytes(downloaded)}"
+            if total:
+                text += f" / {fmt_bytes(total)}"
+            if speed:
+                text += f" • {fmt_bytes(speed)}/s"
+            if eta is not None:
+                text += f" • ETA {int(eta) // 60}:{int(eta) % 60:02d}"
+        elif status == 'finished':
+            text = "Merging / finalizing..."
+        elif status == 'error':
+            self._errors[job.id] = message
+            text = "Error ❌ (double-click)"
+        else:
+            text = message or status.capitalize()
+        iid = str(job.id)
+        if self.jobs_view.exists(iid):
+            self.jobs_view.item(iid, values=(job.title, text, f"{job.percent:.1f}"))
+
+    def update_summary(self):
+        jobs = self.manager.jobs
+        reading = f", reading {self.manager.expanding} link(s)" if self.manager.expanding else ""
+        if not jobs:
+            self.status_label.config(text=f"Reading {self.manager.expanding} link(s)..." if reading else "Ready")
+            self.progress_var.set(0.0)
+            return
+        counts = {}
+        for job in jobs:
+            counts[job.status] = counts.get(job.status, 0) + 1
+        running = counts.get('downloading', 0) + counts.get('finished', 0)
+        self.status_label.config(
+            text=f"{running} running ({fmt_bytes(self.manager.throughput())}/s), {counts.get('queued', 0)} queued, "
+                 f"{counts.get('processing', 0)} in ffmpeg, "
+                 f"{counts.get('complete', 0)} done, {counts.get('error', 0)} failed, "
+                 f"{counts.get('cancelled', 0)} cancelled{reading}")
+        # overall bar: cancelled/failed jobs count as finished so the bar can reach 100%
+        total = sum(100.0 if job.status in ('error', 'cancelled') else job.percent for job in jobs)
+        self.progress_var.set(total / len(jobs))
 
     def process_queue(self):
-        """Poll the progress queue and update UI"""
+        """Add rows for new jobs and refresh only the rows whose job changed since the last poll"""
         try:
-            while not progress_q.empty():
-                item = progress_q.get_nowait()
-                status, percent, data = item
-                if status == 'downloading':
-                    if percent is None:
-                        # unknown percent — show spinner-like
-                        self.status_label.config(text=f"Downloading... {data.get('filename', '')}")
-                        # we cannot set percent, so just pulse
-                        self.progress.step(2)
-                    else:
-                        self.progress_var.set(min(max(percent, 0.0), 100.0))
-                        self.status_label.config(text=f"Downloading... {percent:.1f}% - {data.get('filename','')}")
-                elif status == 'finished':
-                    self.progress_var.set(100.0)
-                    self.status_label.config(text="Merging / finalizing...")
-                elif status == 'complete':
-                    self.progress_var.set(100.0)
-                    self.status_label.config(text="Download complete ✅")
-                    messagebox.showinfo("Done", "Download finished successfully.")
-                    self.download_btn.config(state="normal")
-                    self.cancel_btn.config(state="disabled")
-                elif status == 'error':
-                    self.status_label.config(text="Error during download ❌")
-                    messagebox.showerror("Error", data.get('error') or str(data))
-                    self.download_btn.config(state="normal")
-                    self.cancel_btn.config(state="disabled")
+            while True:
+                try:
+                    event = self.manager.events.get_nowait()
+                except queue.Empty:
+                    break
+                if event[0] == 'added':
+                    job = event[1]
+                    self.jobs_view.insert("", "end", iid=str(job.id), values=(job.title, "Queued", ""))
+                else:  # expand_error
+                    messagebox.showerror("Error", f"Cannot read {event[1]}:\n{event[2]}")
+            for job in self.manager.take_changed():
+                self.update_job(job)
+            self.update_summary()
         except Exception as e:
             # queue processing error
             print("Queue processing error:", e)
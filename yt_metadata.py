@@ -0,0 +1,133 @@
+import json
+import sqlite3
+import threading
+import time
+
+WATCH_URL = "https://www.youtube.com/watch?v={}"
+
+
+# ----------------------------- #
+# cache ข้อมูลวิดีโอ (metadata) บนดิสก์
+# ----------------------------- #
+class MetadataCache:
+    """เก็บผล extract_info ของแต่ละวิดีโอ (ชื่อ, formats, format ที่เลือกไป) ตาม video ID
+
+    ttl: อายุข้อมูล (วินาที) — URL ของ format บน YouTube หมดอายุในราว 6 ชั่วโมง จึงไม่ควรตั้งนานกว่านั้น
+    ใช้จากหลาย thread ได้ (connection เดียว คุมด้วย lock)
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS videos (
+            video_id TEXT PRIMARY KEY,
+            title TEXT,
+            info TEXT NOT NULL,
+            chosen TEXT NOT NULL DEFAULT '{}',
+            fetched_at REAL NOT NULL
+        );
+    """
+
+    def __init__(self, path=".yt_metadata.db", ttl=5 * 3600):
+        self.path = path
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30.0, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(self.SCHEMA)
+
+    def get(self, video_id):
+        """info dict ที่ยังไม่หมดอายุ หรือ None"""
+        with self._lock:
+            row = self._conn.execute("SELECT info, fetched_at FROM videos WHERE video_id = ?",
+                                     (video_id,)).fetchone()
+        if row is None or time.time() - row[1] > self.ttl:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, video_id, info):
+        """info ต้องผ่าน YoutubeDL.sanitize_info แล้ว (แปลงเป็น JSON ได้)"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO videos (video_id, title, info, fetched_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(video_id) DO UPDATE SET title = excluded.title, info = excluded.info, "
+                "fetched_at = excluded.fetched_at",
+                (video_id, info.get("title"), json.dumps(info), time.time()))
+
+    def invalidate(self, video_id):
+        with self._lock:
+            self._conn.execute("DELETE FROM videos WHERE video_id = ?", (video_id,))
+
+    def set_chosen(self, video_id, spec, format_id):
+        """จำว่า format spec นี้ (เช่น bestvideo[height<=720]+bestaudio/best) ได้ format ไหน"""
+        with self._lock:
+            row = self._conn.execute("SELECT chosen FROM videos WHERE video_id = ?", (video_id,)).fetchone()
+            if row is None:
+                return
+            chosen = json.loads(row[0])
+            chosen[spec] = format_id
+            self._conn.execute("UPDATE videos SET chosen = ? WHERE video_id = ?", (json.dumps(chosen), video_id))
+
+    def chosen(self, video_id, spec):
+        with self._lock:
+            row = self._conn.execute("SELECT chosen FROM videos WHERE video_id = ?", (video_id,)).fetchone()
+        return json.loads(row[0]).get(spec) if row else None
+
+    def title(self, video_id):
+        with self._lock:
+            row = self._conn.execute("SELECT title FROM videos WHERE video_id = ?", (video_id,)).fetchone()
+        return row[0] if row else None
+
+    def purge(self):
+        """ลบรายการที่หมดอายุแล้ว คืนจำนวนที่ลบ"""
+        with self._lock:
+            return self._conn.execute("DELETE FROM videos WHERE fetched_at < ?",
+                                      (time.time() - self.ttl,)).rowcount
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+# ----------------------------- #
+# แตก playlist / channel เป็นรายการวิดีโอ
+# ----------------------------- #
+def expand(ydl, url, cache=None, depth=3):
+    """คืนรายการ {"id", "url", "title", "duration", "ie_key"} ของทุกวิดีโอใน url (วิดีโอเดียวก็คืน 1 รายการ)
+
+    ใช้ extract_info(..., process=False): playlist ได้แค่รายการแบบ flat ไม่ต้องเปิดทีละวิดีโอ
+    ถ้า url เป็นวิดีโอเดียว ข้อมูลที่ได้มีครบ (รวม formats) จึงเก็บลง cache ไปเลย
+    """
+    info = ydl.extract_info(url, download=False, process=False)
+    return _entries(ydl, info, cache, depth)
+
+
+def _entries(ydl, info, cache, depth):
+    kind = info.get("_type", "video")
+    if kind == "video":
+        if cache is not None and info.get("formats"):
+            cache.put(info["id"], ydl.sanitize_info(info, remove_private_keys=True))
+        return [_summary(info)]
+    if depth <= 0:
+        return []
+    if kind in ("url", "url_transparent"):
+        if info.get("ie_key") == "Youtube" and info.get("id"):
+            return [_summary(info)]  # รายการ flat ของวิดีโอ ไม่ต้องเปิดต่อ
+        return expand(ydl, info["url"], cache, depth - 1)
+    entries = []
+    for entry in info.get("entries") or []:
+        if entry is None:
+            continue  # วิดีโอที่ถูกลบ / ส่วนตัว
+        entries.extend(_entries(ydl, entry, cache, depth - 1))
+    return entries
+
+
+def _summary(info):
+    video_id = info.get("id")
+    url = info.get("webpage_url") or info.get("url")
+    if not url or (video_id and not url.startswith("http")):
+        url = WATCH_URL.format(video_id)
+    return {"id": video_id, "url": url, "title": info.get("title") or url, "duration": info.get("duration"),
+            "ie_key": info.get("ie_key") or info.get("extractor_key")}  # ใช้ตรวจ download archive